@@ -3,14 +3,33 @@ NEXAI Data Processor Package
 High-performance parallel text reduction pipeline + compression utilities
 """
 
-from .reader import FileReader, read_file_chunks, read_file_lines
+from .reader import (
+    FileReader,
+    RecordReader,
+    read_file_chunks,
+    read_file_lines,
+    newline_aligned_ranges
+)
 from .reducer import TextReducer, reduce_text
 from .processor import ParallelProcessor, reduce_file, _worker_reduce
+from .autotune import autotune
+from .distributed import RangeCoordinator, WorkerAgent, run_local_cluster
+from .tokens import Vocabulary, TokenStreamWriter, read_token_stream
 from .writer import OutputWriter, Analytics, compare_files, print_comparison
+from .metrics import StageTimers, MetricsServer, format_prometheus
+from .tracing import TraceRecorder
+from .watchdog import MemoryWatchdog
+from .sketches import CorpusSketch, CountMinSketch, HyperLogLog
 from .compressor import (
     StreamingCompressor,
     ParallelCompressor,
+    ParallelDecompressor,
     CompressionConfig,
+    CompressionManifest,
+    SeekableZstdReader,
+    FileRecord,
+    iter_files,
+    scan_files,
     find_large_files
 )
 from .config import (
@@ -27,8 +46,10 @@ __author__ = 'NEXAI Team'
 __all__ = [
     # Reader
     'FileReader',
+    'RecordReader',
     'read_file_chunks',
     'read_file_lines',
+    'newline_aligned_ranges',
     
     # Reducer
     'TextReducer',
@@ -38,16 +59,47 @@ __all__ = [
     'ParallelProcessor',
     'reduce_file',
     
+    # Autotuning
+    'autotune',
+    
+    # Distributed
+    'RangeCoordinator',
+    'WorkerAgent',
+    'run_local_cluster',
+    
+    # Token output
+    'Vocabulary',
+    'TokenStreamWriter',
+    'read_token_stream',
+    
     # Writer
     'OutputWriter',
     'Analytics',
     'compare_files',
     'print_comparison',
     
+    # Metrics
+    'StageTimers',
+    'MetricsServer',
+    'format_prometheus',
+    'TraceRecorder',
+    'MemoryWatchdog',
+    
+    # Corpus statistics
+    'CorpusSketch',
+    'CountMinSketch',
+    'HyperLogLog',
+    
     # Compressor (NEW)
     'StreamingCompressor',
     'ParallelCompressor',
     'CompressionConfig',
+    'ParallelDecompressor',
+    'CompressionManifest',
+    'SeekableZstdReader',
+    'FileRecord',
+    'iter_files',
+    'scan_files',
     'find_large_files',
     
     # Config
@@ -0,0 +1,261 @@
+"""
+Worker Count / Chunk Size Autotuning
+Calibrates ParallelProcessor settings on sampled byte ranges of the real input
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics import process_rss_mb
+from .reader import newline_aligned_ranges
+from .processor import _init_worker, _worker_reduce
+from .config import AUTOTUNE_CACHE_FILE, AUTOTUNE_SAMPLE_BYTES, AUTOTUNE_MEMORY_FRACTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_CANDIDATES = (25, 50, 200)
+
+
+def physical_memory_mb() -> float:
+    """Total physical memory in MB (0.0 if unknown)"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 1024 / 1024
+    except (ValueError, OSError, AttributeError):
+        return 0.0
+
+
+def default_worker_candidates() -> List[int]:
+    """
+    Worker counts to try
+
+    Covers a quarter of the logical CPUs (for memory-bound spaCy modes)
+    up to all of them, including half (one per physical core on SMT
+    machines).
+    """
+    n = cpu_count()
+    return sorted({max(1, n // 4), max(1, n // 2), max(1, 3 * n // 4), n})
+
+
+def _calibrate_chunk(chunk: str) -> Tuple[int, int, float]:
+    """Calibration worker: reduce a chunk and report (pid, bytes_in, rss_mb)"""
+    record = _worker_reduce(chunk)
+    return os.getpid(), record.bytes_in, process_rss_mb()
+
+
+def _sample_lines(input_file: Path, sample_bytes: int, num_samples: int) -> List[str]:
+    """Read newline-aligned ranges spread evenly across the input"""
+    file_size = input_file.stat().st_size
+    if file_size <= sample_bytes:
+        with open(input_file, 'rb') as f:
+            data = f.read()
+        return [line for line in data.decode('utf-8', errors='replace').split('\n') if line.strip()]
+
+    range_size = max(1, sample_bytes // num_samples)
+    ranges = newline_aligned_ranges(str(input_file), max(range_size, file_size // num_samples))
+
+    lines = []
+    with open(input_file, 'rb') as f:
+        for offset, _ in ranges[:num_samples]:
+            f.seek(offset)
+            data = f.read(range_size)
+            # Drop the partial last line
+            data = data[:data.rfind(b'\n') + 1] or data
+            lines.extend(
+                line for line in data.decode('utf-8', errors='replace').split('\n') if line.strip()
+            )
+    return lines
+
+
+def _load_cache(cache_file: Path) -> Dict:
+    """Load the autotune cache (empty on any error)"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_file: Path, cache: Dict):
+    """Persist the autotune cache atomically"""
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, cache_file)
+
+
+def _cache_key(
+    nlp_mode: str,
+    custom_stop_words: Optional[Set[str]],
+    memory_budget_mb: float,
+    worker_candidates: List[int],
+    chunk_candidates: List[int]
+) -> str:
+    """Cache key: host and mode, plus a digest of everything the result depends on"""
+    inputs = json.dumps({
+        'budget_mb': None if memory_budget_mb == float('inf') else round(memory_budget_mb),
+        'stop_words': sorted(custom_stop_words or []),
+        'workers': worker_candidates,
+        'chunks': chunk_candidates
+    }, sort_keys=True)
+    digest = hashlib.sha1(inputs.encode('utf-8')).hexdigest()[:12]
+    return f"{socket.gethostname()}:{nlp_mode}:{digest}"
+
+
+def autotune(
+    input_file: str,
+    nlp_mode: str = 'basic',
+    custom_stop_words: Optional[Set[str]] = None,
+    memory_budget_mb: Optional[float] = None,
+    worker_candidates: Optional[Iterable[int]] = None,
+    chunk_candidates: Iterable[int] = DEFAULT_CHUNK_CANDIDATES,
+    sample_bytes: int = AUTOTUNE_SAMPLE_BYTES,
+    num_samples: int = 8,
+    use_cache: bool = True,
+    cache_file: Optional[str] = None
+) -> Dict:
+    """
+    Pick num_workers and max_lines_per_chunk by timing a calibration run
+
+    Every (workers, lines per chunk) combination reduces the same sample of
+    the input; the fastest one whose estimated memory (parent + peak RSS
+    of every worker) fits the budget wins. Results are cached per host,
+    NLP mode, stop words, budget and candidate lists so later runs skip
+    calibration; a cached result over the current budget is not reused.
+
+    Args:
+        input_file: Path to the real input
+        nlp_mode: Text reduction mode (spaCy modes are memory-bound)
+        custom_stop_words: Additional stop words
+        memory_budget_mb: Memory budget (default: half of physical RAM)
+        worker_candidates: Worker counts to try
+        chunk_candidates: Lines-per-chunk values to try
+        sample_bytes: Total input bytes sampled
+        num_samples: Number of byte ranges sampled across the file
+        use_cache: Reuse a cached result for the same host and settings
+        cache_file: Cache path (default: config.AUTOTUNE_CACHE_FILE)
+
+    Returns:
+        dict: {'num_workers', 'max_lines_per_chunk', 'throughput_mbps',
+               'memory_mb', 'trials', ...}
+    """
+    input_file = Path(input_file)
+    cache_path = Path(cache_file) if cache_file else AUTOTUNE_CACHE_FILE
+
+    if memory_budget_mb is None:
+        memory_budget_mb = physical_memory_mb() * AUTOTUNE_MEMORY_FRACTION or float('inf')
+    worker_candidates = sorted(set(worker_candidates or default_worker_candidates()))
+    chunk_candidates = sorted(set(chunk_candidates))
+    key = _cache_key(
+        nlp_mode, custom_stop_words, memory_budget_mb, worker_candidates, chunk_candidates
+    )
+
+    if use_cache:
+        cached = _load_cache(cache_path).get(key)
+        if cached and cached['memory_mb'] > memory_budget_mb:
+            logger.info(
+                f"Autotune cache entry {key} exceeds the {memory_budget_mb:.0f}MB budget, "
+                f"recalibrating"
+            )
+        elif cached:
+            logger.info(
+                f"Autotune cache hit ({key}): {cached['num_workers']} workers, "
+                f"{cached['max_lines_per_chunk']} lines/chunk"
+            )
+            return cached
+
+    lines = _sample_lines(input_file, sample_bytes, num_samples)
+    if not lines:
+        raise ValueError(f"No sample data in {input_file}")
+    # Bytes, not characters: throughput must match the byte-based run stats
+    sample_mb = sum(len(line.encode('utf-8')) + 1 for line in lines) / 1024 / 1024
+
+    logger.info(
+        f"Autotuning on {sample_mb:.2f}MB sample "
+        f"(budget {memory_budget_mb:.0f}MB, mode {nlp_mode})"
+    )
+
+    trials = []
+    parent_mb = process_rss_mb()
+
+    for workers in worker_candidates:
+        with Pool(
+            workers, initializer=_init_worker, initargs=(nlp_mode, custom_stop_words)
+        ) as pool:
+            # Warm-up so model loading is not timed
+            pool.map(_calibrate_chunk, lines[:workers], chunksize=1)
+
+            for lines_per_chunk in chunk_candidates:
+                chunks = [
+                    '\n'.join(lines[i:i + lines_per_chunk])
+                    for i in range(0, len(lines), lines_per_chunk)
+                ]
+                peak_rss: Dict[int, float] = {}
+
+                start = time.perf_counter()
+                for pid, _, rss in pool.imap_unordered(_calibrate_chunk, chunks):
+                    if rss > peak_rss.get(pid, 0.0):
+                        peak_rss[pid] = rss
+                elapsed = time.perf_counter() - start
+
+                # Workers that got no chunk count at the observed maximum
+                worker_mb = max(peak_rss.values(), default=0.0)
+                memory_mb = parent_mb + worker_mb * workers
+                trial = {
+                    'num_workers': workers,
+                    'max_lines_per_chunk': lines_per_chunk,
+                    'throughput_mbps': sample_mb / elapsed if elapsed > 0 else 0.0,
+                    'memory_mb': memory_mb,
+                    'within_budget': memory_mb <= memory_budget_mb
+                }
+                trials.append(trial)
+                logger.info(
+                    f"  {workers} workers x {lines_per_chunk} lines: "
+                    f"{trial['throughput_mbps']:.2f}MB/s, ~{memory_mb:.0f}MB"
+                )
+
+    eligible = [t for t in trials if t['within_budget']]
+    if not eligible:
+        logger.warning("No configuration fits the memory budget, using the smallest")
+        eligible = [min(trials, key=lambda t: t['memory_mb'])]
+
+    # Fastest wins; within 3% prefer fewer workers (less memory, less contention)
+    best_speed = max(t['throughput_mbps'] for t in eligible)
+    best = min(
+        (t for t in eligible if t['throughput_mbps'] >= best_speed * 0.97),
+        key=lambda t: (t['num_workers'], -t['throughput_mbps'])
+    )
+
+    result = {
+        'num_workers': best['num_workers'],
+        'max_lines_per_chunk': best['max_lines_per_chunk'],
+        'throughput_mbps': best['throughput_mbps'],
+        'memory_mb': best['memory_mb'],
+        'memory_budget_mb': memory_budget_mb if memory_budget_mb != float('inf') else None,
+        'nlp_mode': nlp_mode,
+        'host': socket.gethostname(),
+        'sample_mb': sample_mb,
+        'tuned_at': datetime.now().isoformat(),
+        'trials': trials
+    }
+
+    cache = _load_cache(cache_path)
+    cache[key] = result
+    try:
+        _save_cache(cache_path, cache)
+    except OSError as e:
+        logger.warning(f"Could not save autotune cache {cache_path}: {e}")
+
+    logger.info(
+        f"Autotune picked {result['num_workers']} workers, "
+        f"{result['max_lines_per_chunk']} lines/chunk ({result['throughput_mbps']:.2f}MB/s)"
+    )
+    return result
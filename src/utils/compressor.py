@@ -8,9 +8,10 @@ Compresses large files without loading them entirely into RAM.
 
 Features:
 - Streaming compression (constant RAM usage regardless of file size)
-- Multi-core parallel processing
+- Multi-core parallel processing (across files and across blocks of large files)
 - zstd (preferred) with gzip fallback
-- Integrity verification (xxhash/crc32)
+- Integrity verification (xxhash/crc32, hashed while compressing)
+- Optional seekable zstd output with random-access reader
 - Progress visualization with tqdm
 - Error resilient (logs errors, continues processing)
 
@@ -24,13 +25,19 @@ import logging
 import hashlib
 import argparse
 from pathlib import Path
-from typing import Optional, List, Tuple, Generator, Dict, Any
-from dataclasses import dataclass, field
+from typing import Optional, List, NamedTuple, Tuple, Generator, Iterator, Dict, Any
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from multiprocessing import cpu_count
 import time
 import json
+import io
+import math
+import random
+import sqlite3
+import struct
+from bisect import bisect_right
 
 # Progress bar
 try:
@@ -49,6 +56,7 @@ except ImportError:
     print("Warning: zstandard not installed. Using gzip fallback. Install with: pip install zstandard")
 
 import gzip
+import zlib  # crc32 fallback, probe without zstd
 
 # Fast hash (optional, falls back to crc32)
 try:
@@ -56,7 +64,18 @@ try:
     XXHASH_AVAILABLE = True
 except ImportError:
     XXHASH_AVAILABLE = False
-    import zlib  # For crc32 fallback
+
+# Live metrics endpoint (package import, or sibling module when run as a script)
+try:
+    from .metrics import MetricsServer, WorkerRegistry, progress_metrics, report_worker, worker_status
+except ImportError:
+    from metrics import MetricsServer, WorkerRegistry, progress_metrics, report_worker, worker_status
+
+# Block assembly (package import, or sibling module when run as a script)
+try:
+    from .fileops import concat_files
+except ImportError:
+    from fileops import concat_files
 
 # Configure logging
 logging.basicConfig(
@@ -107,6 +126,56 @@ class CompressionConfig:
     # Error log file
     error_log_file: str = 'compression_errors.log'
     
+    # Serve live metrics over HTTP on this local port (None = disabled, 0 = any)
+    metrics_port: Optional[int] = None
+    
+    # Threads scanning directories in parallel (helps on network filesystems)
+    scan_threads: int = 8
+    
+    # Compress files as the scan discovers them instead of listing the whole
+    # tree first (no largest-first order; memory independent of file count)
+    streaming: bool = False
+    
+    # Append each file result to this JSONL file instead of keeping it in memory
+    results_file: Optional[str] = None
+    
+    # Split files larger than their fair share of the run into independently
+    # compressed blocks of this size (zstd frames / gzip members; 0 = never)
+    block_size: int = 64 * 1024 * 1024
+    
+    # Seekable zstd output: independent frames of this many uncompressed
+    # bytes plus a seek table (zstd seekable format); ignored for gzip
+    seekable: bool = False
+    seekable_frame_size: int = 4 * 1024 * 1024
+    
+    # Dictionary mode for files below min_file_size (compress_small_files):
+    # dictionary size, files sampled for training, files per worker task
+    dictionary_size: int = 112 * 1024
+    dictionary_samples: int = 5000
+    small_file_batch: int = 256
+    
+    # Dictionary for restoring dictionary-compressed files (default: from the report)
+    dictionary_file: Optional[str] = None
+    
+    # Incremental runs: SQLite manifest of compressed files (None = always compress)
+    manifest_file: Optional[str] = None
+    
+    # Compressibility probe: trial-compress a few sampled blocks at level 1
+    # and, by the estimated compressed/original ratio, skip the file (>=
+    # probe_skip_ratio), store it (>= probe_store_ratio), compress it at
+    # level 1 (>= probe_fast_ratio) or at compression_level
+    probe: bool = False
+    probe_blocks: int = 4
+    probe_block_size: int = 64 * 1024
+    probe_skip_ratio: float = 0.98
+    probe_store_ratio: float = 0.92
+    probe_fast_ratio: float = 0.80
+    
+    # Adaptive level: steer the level per file / block towards a total
+    # throughput (MB/s) or towards finishing within a time budget
+    target_mbps: Optional[float] = None
+    time_budget_seconds: Optional[float] = None
+    
     def __post_init__(self):
         if self.num_workers is None:
             self.num_workers = cpu_count()
@@ -166,17 +235,10 @@ class StreamingCompressor:
         Returns:
             str: Hex checksum
         """
-        if XXHASH_AVAILABLE:
-            hasher = xxhash.xxh64()
-            for chunk in self._stream_chunks(filepath):
-                hasher.update(chunk)
-            return hasher.hexdigest()
-        else:
-            # Fallback to CRC32
-            checksum = 0
-            for chunk in self._stream_chunks(filepath):
-                checksum = zlib.crc32(chunk, checksum)
-            return format(checksum & 0xFFFFFFFF, '08x')
+        hasher = _new_hasher()
+        for chunk in self._stream_chunks(filepath):
+            hasher.update(chunk)
+        return hasher.hexdigest()
     
     def compress_file(self, input_path: Path, output_path: Optional[Path] = None) -> Dict[str, Any]:
         """
@@ -207,7 +269,8 @@ class StreamingCompressor:
             'throughput_mbps': 0.0,
             'error': None,
             'checksum_original': None,
-            'checksum_verified': False
+            'checksum_verified': False,
+            'compression_level': self.config.compression_level
         }
         
         try:
@@ -215,14 +278,42 @@ class StreamingCompressor:
             original_size = input_path.stat().st_size
             result['original_size'] = original_size
             
-            # Calculate original checksum (for verification)
-            if self.config.verify_integrity:
-                result['checksum_original'] = self._calculate_checksum(input_path)
+            if self.config.probe:
+                probe = probe_compressibility(input_path, original_size, self.config)
+                if probe['decision'] == 'skip':
+                    result.update(
+                        success=True,
+                        skipped=True,
+                        output_file=None,
+                        compressed_size=original_size,
+                        time_seconds=time.time() - start_time,
+                        probe=probe
+                    )
+                    return result
+                if probe['level'] != self.config.compression_level:
+                    # Same pipeline at the chosen level
+                    chosen = StreamingCompressor(replace(self.config, compression_level=probe['level'], probe=False))
+                    result = chosen.compress_file(input_path, output_path)
+                    result['probe'] = probe
+                    return result
+                result['probe'] = probe
+            
+            # Original checksum is computed in the same pass as compression
+            hasher = _new_hasher() if self.config.verify_integrity else None
             
             # Streaming compression
             bytes_written = 0
             
-            if self.use_zstd:
+            if self.use_zstd and self.config.seekable:
+                # Independent frames + seek table
+                with open(input_path, 'rb') as f_in:
+                    with open(output_path, 'wb') as f_out:
+                        frames = self._write_seekable_frames(f_in, f_out, None, hasher)
+                        write_seek_table(f_out, frames)
+                
+                result['seekable_frames'] = len(frames)
+                bytes_written = output_path.stat().st_size
+            elif self.use_zstd:
                 # ZSTD streaming compression
                 with open(input_path, 'rb') as f_in:
                     with open(output_path, 'wb') as f_out:
@@ -231,6 +322,8 @@ class StreamingCompressor:
                                 chunk = f_in.read(self.config.chunk_size)
                                 if not chunk:
                                     break
+                                if hasher is not None:
+                                    hasher.update(chunk)
                                 compressor.write(chunk)
                 
                 bytes_written = output_path.stat().st_size
@@ -242,10 +335,15 @@ class StreamingCompressor:
                             chunk = f_in.read(self.config.chunk_size)
                             if not chunk:
                                 break
+                            if hasher is not None:
+                                hasher.update(chunk)
                             f_out.write(chunk)
                 
                 bytes_written = output_path.stat().st_size
             
+            if hasher is not None:
+                result['checksum_original'] = hasher.hexdigest()
+            
             # Update statistics
             result['compressed_size'] = bytes_written
             result['compression_ratio'] = (1 - bytes_written / original_size) * 100 if original_size > 0 else 0
@@ -254,7 +352,7 @@ class StreamingCompressor:
             
             # Verify integrity
             if self.config.verify_integrity:
-                verified = self._verify_compressed_file(input_path, output_path)
+                verified = self._verify_compressed_file(output_path, result['checksum_original'])
                 result['checksum_verified'] = verified
                 if not verified:
                     result['error'] = "Integrity verification failed"
@@ -283,71 +381,404 @@ class StreamingCompressor:
             
             return result
     
-    def _verify_compressed_file(self, original_path: Path, compressed_path: Path) -> bool:
+    def _verify_compressed_file(self, compressed_path: Path, expected_checksum: str) -> bool:
         """
-        Verify compressed file by decompressing and comparing checksums
+        Verify compressed file by decompressing it against the stored checksum
+        
+        The original is not read again; its checksum was taken while it
+        was being compressed.
         
         Args:
-            original_path: Path to original file
             compressed_path: Path to compressed file
+            expected_checksum: Checksum of the original data
             
         Returns:
             bool: True if verification passed
         """
         try:
-            if XXHASH_AVAILABLE:
-                hasher = xxhash.xxh64()
-            else:
-                checksum = 0
+            hasher = _new_hasher()
             
             # Decompress and calculate checksum
             if self.use_zstd:
                 decompressor = zstd.ZstdDecompressor()
                 with open(compressed_path, 'rb') as f_in:
-                    with decompressor.stream_reader(f_in) as reader:
+                    # Block and seekable outputs hold several frames
+                    with decompressor.stream_reader(f_in, read_across_frames=True) as reader:
                         while True:
                             chunk = reader.read(self.config.chunk_size)
                             if not chunk:
                                 break
-                            if XXHASH_AVAILABLE:
-                                hasher.update(chunk)
-                            else:
-                                checksum = zlib.crc32(chunk, checksum)
+                            hasher.update(chunk)
             else:
                 with gzip.open(compressed_path, 'rb') as f_in:
                     while True:
                         chunk = f_in.read(self.config.chunk_size)
                         if not chunk:
                             break
-                        if XXHASH_AVAILABLE:
-                            hasher.update(chunk)
-                        else:
-                            checksum = zlib.crc32(chunk, checksum)
-            
-            # Compare checksums
-            if XXHASH_AVAILABLE:
-                decompressed_checksum = hasher.hexdigest()
-            else:
-                decompressed_checksum = format(checksum & 0xFFFFFFFF, '08x')
+                        hasher.update(chunk)
             
-            original_checksum = self._calculate_checksum(original_path)
-            
-            return decompressed_checksum == original_checksum
+            return hasher.hexdigest() == expected_checksum
             
         except Exception as e:
             logger.error(f"Verification failed: {e}")
             return False
 
+    
+    def compress_block(self, input_path: Path, offset: int, length: int, part_path: Path) -> Dict[str, Any]:
+        """
+        Compress one byte range of a file into its own zstd frame / gzip member
+        
+        Concatenated parts form a valid .zst / .gz file of the whole input.
+        
+        Args:
+            input_path: Path to input file
+            offset: First byte of the block
+            length: Block length in bytes
+            part_path: Output file for this block
+            
+        Returns:
+            dict: Block result (sizes, checksum, verification, error)
+        """
+        start_time = time.time()
+        result = {
+            'offset': offset,
+            'length': length,
+            'part_file': str(part_path),
+            'compressed_size': 0,
+            'time_seconds': 0.0,
+            'checksum': None,
+            'checksum_verified': False,
+            'error': None,
+            'compression_level': self.config.compression_level
+        }
+        
+        try:
+            hasher = _new_hasher()
+            with open(input_path, 'rb') as f_in:
+                f_in.seek(offset)
+                if self.use_zstd and self.config.seekable:
+                    # Seek table is appended once the parts are concatenated
+                    with open(part_path, 'wb') as f_out:
+                        result['frames'] = self._write_seekable_frames(f_in, f_out, length, hasher)
+                elif self.use_zstd:
+                    with open(part_path, 'wb') as f_out:
+                        with self.zstd_compressor.stream_writer(f_out) as compressor:
+                            self._copy_range(f_in, length, hasher, compressor)
+                else:
+                    with gzip.open(part_path, 'wb', compresslevel=min(9, self.config.compression_level)) as f_out:
+                        self._copy_range(f_in, length, hasher, f_out)
+            
+            result['checksum'] = hasher.hexdigest()
+            result['compressed_size'] = part_path.stat().st_size
+            if self.config.verify_integrity:
+                result['checksum_verified'] = self._verify_compressed_file(part_path, result['checksum'])
+                if not result['checksum_verified']:
+                    result['error'] = f"Integrity verification failed for block at {offset}"
+        
+        except Exception as e:
+            result['error'] = str(e)
+            logger.error(f"Block compression failed for {input_path} at {offset}: {e}")
+        
+        result['time_seconds'] = time.time() - start_time
+        return result
+    
+    def _write_seekable_frames(self, f_in, f_out, length: Optional[int], hasher) -> List[Tuple[int, int, int]]:
+        """
+        Compress input into independent zstd frames of seekable_frame_size bytes
+        
+        RAM usage is O(seekable_frame_size).
+        
+        Args:
+            f_in: Input file positioned at the first byte
+            f_out: Output file
+            length: Bytes to compress (None = until EOF)
+            hasher: Whole-input checksum to update (or None)
+            
+        Returns:
+            list: (compressed_size, decompressed_size, checksum) per frame
+        """
+        frame_size = min(self.config.seekable_frame_size, MAX_SEEKABLE_FRAME_SIZE)
+        frames = []
+        remaining = length
+        while remaining is None or remaining > 0:
+            data = f_in.read(frame_size if remaining is None else min(frame_size, remaining))
+            if not data:
+                if remaining is not None:
+                    raise IOError("File shrank during compression")
+                break
+            if hasher is not None:
+                hasher.update(data)
+            frame = self.zstd_compressor.compress(data)
+            f_out.write(frame)
+            frames.append((len(frame), len(data), _frame_checksum(data)))
+            if remaining is not None:
+                remaining -= len(data)
+        return frames
+    
+    def _copy_range(self, f_in, length: int, hasher, f_out):
+        """Stream `length` bytes from f_in to f_out, hashing them"""
+        remaining = length
+        while remaining > 0:
+            chunk = f_in.read(min(self.config.chunk_size, remaining))
+            if not chunk:
+                raise IOError("File shrank during compression")
+            hasher.update(chunk)
+            f_out.write(chunk)
+            remaining -= len(chunk)
+
+
+# Level for files that barely compress: zstd's negative (fast) levels do
+# little match finding, and any block that does not shrink is written as
+# a raw block, so output stays within a few bytes per block of the input.
+# gzip level 0 stores.
+STORE_LEVEL = -5 if ZSTD_AVAILABLE else 0
+
+
+def probe_compressibility(input_path: Path, size: int, config: CompressionConfig) -> Dict[str, Any]:
+    """
+    Estimate how well a file compresses from a few sampled blocks
+    
+    Reads probe_blocks blocks spread evenly over the file and
+    trial-compresses them at level 1, which costs a fraction of a
+    percent of compressing a large file.
+    
+    Args:
+        input_path: File to probe
+        size: File size in bytes
+        config: Compression configuration (probe thresholds)
+        
+    Returns:
+        dict: estimated_ratio (compressed / original of the samples),
+              decision ('skip', 'store', 'compress'), level, sampled_bytes
+    """
+    start_time = time.time()
+    block = config.probe_block_size
+    count = max(1, min(config.probe_blocks, -(-size // block)))
+    span = max(0, size - block)
+    
+    sampled = compressed = 0
+    trial = zstd.ZstdCompressor(level=1) if ZSTD_AVAILABLE else None
+    with open(input_path, 'rb') as f:
+        for i in range(count):
+            f.seek(span * i // max(1, count - 1))
+            data = f.read(block)
+            if not data:
+                continue
+            sampled += len(data)
+            compressed += len(trial.compress(data) if trial else zlib.compress(data, 1))
+    
+    ratio = compressed / sampled if sampled else 1.0
+    if ratio >= config.probe_skip_ratio:
+        decision, level = 'skip', None
+    elif ratio >= config.probe_store_ratio:
+        decision, level = 'store', STORE_LEVEL
+    elif ratio >= config.probe_fast_ratio:
+        decision, level = 'compress', min(1, config.compression_level)
+    else:
+        decision, level = 'compress', config.compression_level
+    
+    return {
+        'estimated_ratio': ratio,
+        'decision': decision,
+        'level': level,
+        'sampled_bytes': sampled,
+        'probe_seconds': time.time() - start_time
+    }
+
+
+class _Crc32:
+    """CRC32 with the hashlib-style update()/hexdigest() interface"""
+    
+    def __init__(self):
+        self.value = 0
+    
+    def update(self, data: bytes):
+        self.value = zlib.crc32(data, self.value)
+    
+    def hexdigest(self) -> str:
+        return format(self.value & 0xFFFFFFFF, '08x')
+
+
+def _new_hasher():
+    """Streaming checksum: xxh64 if available, else CRC32"""
+    return xxhash.xxh64() if XXHASH_AVAILABLE else _Crc32()
+
+
+def combine_block_checksums(checksums: List[str]) -> str:
+    """
+    Whole-file checksum of a block-compressed file
+    
+    Checksum of the newline-joined block checksums; recomputed on restore
+    by hashing the decompressed data in 'checksum_block_size' pieces. It
+    differs from a plain checksum of the same bytes, so results report it
+    as 'checksum_blocks' instead of 'checksum_original'.
+    
+    Args:
+        checksums: Block checksums in file order
+        
+    Returns:
+        str: Hex checksum
+    """
+    hasher = _new_hasher()
+    hasher.update('\n'.join(checksums).encode('ascii'))
+    return hasher.hexdigest()
+
 
 # ============================================
 # FILE WALKER
 # ============================================
 
+class FileRecord(NamedTuple):
+    """Compact scan result: one stat per file"""
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def _scan_directory(
+    directory: str,
+    min_size: int,
+    max_size: Optional[int],
+    include_extensions: Optional[List[str]],
+    exclude_extensions: List[str]
+) -> Tuple[List[FileRecord], List[str]]:
+    """
+    Scan one directory level
+    
+    Extension filters run on the name before any stat; the size comes
+    from DirEntry.stat() (a single stat per file, none on Windows).
+    
+    Returns:
+        tuple: (matching files, subdirectories)
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                    
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if include_extensions and ext not in include_extensions:
+                        continue
+                    if ext in exclude_extensions:
+                        continue
+                    
+                    st = entry.stat()
+                    if st.st_size < min_size:
+                        continue
+                    if max_size is not None and st.st_size >= max_size:
+                        continue
+                    files.append(FileRecord(entry.path, st.st_size, st.st_mtime_ns, st.st_ino))
+                    
+                except OSError as e:
+                    logger.warning(f"Cannot access file {entry.path}: {e}")
+    except OSError as e:
+        logger.warning(f"Cannot scan directory {directory}: {e}")
+    return files, subdirs
+
+
+def iter_files(
+    directory: Path,
+    min_size: int = 0,
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+    max_size: Optional[int] = None,
+    num_threads: int = 8
+) -> Generator[FileRecord, None, None]:
+    """
+    Yield matching files while the scan is still running
+    
+    Each directory is one os.scandir task on a thread pool (stat calls
+    release the GIL, so slow filesystems are scanned concurrently). At
+    most 2 * num_threads directories are scanned ahead of the consumer;
+    the rest wait as paths, so memory depends on the directory count,
+    not the file count. Directory symlinks are not followed, as with
+    os.walk.
+    
+    Args:
+        directory: Directory to scan
+        min_size: Minimum file size in bytes
+        include_extensions: Extensions to include (None = all)
+        exclude_extensions: Extensions to exclude
+        max_size: Only files smaller than this (None = no limit)
+        num_threads: Scanner threads
+        
+    Yields:
+        FileRecord: (path, size, mtime_ns, inode) in discovery order
+    """
+    args = (min_size, max_size, include_extensions, exclude_extensions or [])
+    ahead = 2 * max(1, num_threads)
+    waiting = [str(directory)]
+    pending = set()
+    
+    pool = ThreadPoolExecutor(max_workers=max(1, num_threads))
+    try:
+        while waiting or pending:
+            while waiting and len(pending) < ahead:
+                pending.add(pool.submit(_scan_directory, waiting.pop(), *args))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                waiting.extend(subdirs)
+                yield from files
+    finally:
+        # Consumer may stop early: drop directories not yet scanned
+        # (cancel_futures needs Python 3.9)
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def scan_files(
+    directory: Path,
+    min_size: int = 0,
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+    max_size: Optional[int] = None,
+    num_threads: int = 8
+) -> List[FileRecord]:
+    """
+    Find files by size and extension, scanning subtrees in parallel
+    
+    Args:
+        directory: Directory to scan
+        min_size: Minimum file size in bytes
+        include_extensions: Extensions to include (None = all)
+        exclude_extensions: Extensions to exclude
+        max_size: Only files smaller than this (None = no limit)
+        num_threads: Scanner threads
+        
+    Returns:
+        List[FileRecord]: (path, size, mtime_ns, inode), largest first
+    """
+    records = list(iter_files(
+        directory, min_size, include_extensions, exclude_extensions, max_size, num_threads
+    ))
+    
+    # Sort by size (largest first for better parallelism)
+    records.sort(key=lambda record: record.size, reverse=True)
+    return records
+
+
+def file_record(path: Path) -> FileRecord:
+    """Scan record of a single file (one stat)"""
+    st = os.stat(path)
+    return FileRecord(str(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
 def find_large_files(
     directory: Path,
     min_size: int,
     include_extensions: Optional[List[str]] = None,
-    exclude_extensions: Optional[List[str]] = None
+    exclude_extensions: Optional[List[str]] = None,
+    max_size: Optional[int] = None
 ) -> List[Path]:
     """
     Find files larger than min_size in directory
@@ -357,277 +788,2116 @@ def find_large_files(
         min_size: Minimum file size in bytes
         include_extensions: Extensions to include (None = all)
         exclude_extensions: Extensions to exclude
+        max_size: Only files smaller than this (None = no limit)
         
     Returns:
-        List[Path]: List of file paths
+        List[Path]: List of file paths (largest first)
     """
-    files = []
-    exclude_extensions = exclude_extensions or []
-    
-    for root, _, filenames in os.walk(directory):
-        for filename in filenames:
-            filepath = Path(root) / filename
-            
-            try:
-                # Check file size
-                file_size = filepath.stat().st_size
-                if file_size < min_size:
-                    continue
-                
-                # Check extension filters
-                ext = filepath.suffix.lower()
-                
-                if include_extensions and ext not in include_extensions:
-                    continue
-                
-                if ext in exclude_extensions:
-                    continue
-                
-                files.append(filepath)
-                
-            except (OSError, PermissionError) as e:
-                logger.warning(f"Cannot access file {filepath}: {e}")
-                continue
-    
-    # Sort by size (largest first for better parallelism)
-    files.sort(key=lambda f: f.stat().st_size, reverse=True)
-    
-    return files
+    return [
+        Path(record.path)
+        for record in scan_files(directory, min_size, include_extensions, exclude_extensions, max_size)
+    ]
 
 
 # ============================================
-# PARALLEL COMPRESSOR
+# SEEKABLE ZSTD FORMAT
 # ============================================
 
-def _compress_worker(args: Tuple[Path, CompressionConfig, Optional[Path]]) -> Dict[str, Any]:
+SKIPPABLE_FRAME_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_TABLE_FOOTER_SIZE = 9
+MAX_SEEKABLE_FRAME_SIZE = 0x40000000  # Entries are 32-bit; the spec caps frames at 1GB
+
+
+def _frame_checksum(data: bytes) -> int:
+    """Seek table checksum: low 32 bits of XXH64 (None without xxhash)"""
+    return xxhash.xxh64_intdigest(data) & 0xFFFFFFFF if XXHASH_AVAILABLE else None
+
+
+def write_seek_table(f_out, frames: List[Tuple[int, int, Optional[int]]]):
     """
-    Worker function for parallel compression
-    Runs in separate process
+    Append a zstd seekable-format seek table (a skippable frame)
+    
+    Layout: skippable frame header, one entry per frame (compressed size,
+    decompressed size[, checksum]), then the footer (frame count,
+    descriptor, seekable magic number). All integers are little-endian.
     
     Args:
-        args: Tuple of (input_path, config, output_path)
+        f_out: Output file positioned after the last frame
+        frames: (compressed_size, decompressed_size, checksum or None) per frame
+    """
+    with_checksum = bool(frames) and all(checksum is not None for _, _, checksum in frames)
+    entry = struct.Struct('<III' if with_checksum else '<II')
+    
+    table = bytearray()
+    for compressed_size, decompressed_size, checksum in frames:
+        if with_checksum:
+            table += entry.pack(compressed_size, decompressed_size, checksum)
+        else:
+            table += entry.pack(compressed_size, decompressed_size)
+    table += struct.pack('<IBI', len(frames), 0x80 if with_checksum else 0, SEEKABLE_MAGIC)
+    
+    f_out.write(struct.pack('<II', SKIPPABLE_FRAME_MAGIC, len(table)))
+    f_out.write(table)
+
+
+def read_seek_table(f_in) -> List[Tuple[int, int, Optional[int]]]:
+    """
+    Read the seek table at the end of a seekable zstd file
+    
+    Args:
+        f_in: Binary file object (seekable)
         
     Returns:
-        dict: Compression result
+        list: (compressed_size, decompressed_size, checksum or None) per frame
+        
+    Raises:
+        ValueError: If the file has no valid seek table
     """
-    input_path, config, output_path = args
-    compressor = StreamingCompressor(config)
-    return compressor.compress_file(input_path, output_path)
+    f_in.seek(0, os.SEEK_END)
+    file_size = f_in.tell()
+    if file_size < SEEK_TABLE_FOOTER_SIZE + 8:
+        raise ValueError("Not a seekable zstd file (too small)")
+    
+    f_in.seek(file_size - SEEK_TABLE_FOOTER_SIZE)
+    num_frames, descriptor, magic = struct.unpack('<IBI', f_in.read(SEEK_TABLE_FOOTER_SIZE))
+    if magic != SEEKABLE_MAGIC:
+        raise ValueError("Not a seekable zstd file (no seek table)")
+    if descriptor & 0x7C:
+        raise ValueError("Unsupported seek table descriptor")
+    
+    with_checksum = bool(descriptor & 0x80)
+    entry_size = 12 if with_checksum else 8
+    table_size = num_frames * entry_size + SEEK_TABLE_FOOTER_SIZE
+    
+    f_in.seek(file_size - table_size - 8)
+    header_magic, frame_size = struct.unpack('<II', f_in.read(8))
+    if header_magic != SKIPPABLE_FRAME_MAGIC or frame_size != table_size:
+        raise ValueError("Corrupt seek table")
+    
+    raw = f_in.read(num_frames * entry_size)
+    if with_checksum:
+        return list(struct.iter_unpack('<III', raw))
+    return [(c, d, None) for c, d in struct.iter_unpack('<II', raw)]
 
 
-class ParallelCompressor:
+class SeekableZstdReader(io.RawIOBase):
     """
-    Multi-process file compression orchestrator
+    Random access into seekable zstd files
     
-    Distributes files across CPU cores for maximum throughput.
-    """
+    Only the frames covering the requested range are decompressed (the
+    last one is cached), so reading the tail of a 50GB file costs one
+    frame. File-like: seek() / tell() / read(); wrap in io.BufferedReader
+    or io.TextIOWrapper for line access.
     
-    def __init__(self, config: CompressionConfig):
-        self.config = config
-        self.results: List[Dict[str, Any]] = []
-        self.errors: List[Dict[str, Any]] = []
-        
-        logger.info(f"Initialized ParallelCompressor with {config.num_workers} workers")
+    Example:
+        with SeekableZstdReader('app.log.zst') as f:
+            f.seek(-1024 * 1024, os.SEEK_END)
+            tail = f.read()
+    """
     
-    def compress_directory(self, directory: str) -> Dict[str, Any]:
+    def __init__(self, path: str, verify_checksums: bool = True):
         """
-        Compress all large files in directory using parallel processing
+        Open a seekable zstd file
         
         Args:
-            directory: Directory path to process
-            
-        Returns:
-            dict: Overall statistics
+            path: File written with CompressionConfig(seekable=True)
+            verify_checksums: Check each decompressed frame against the seek table
         """
-        start_time = time.time()
-        directory = Path(directory)
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read seekable zstd files")
+        super().__init__()
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self.frames = read_seek_table(self._file)
+        except Exception:
+            self._file.close()
+            raise
+        self.verify_checksums = verify_checksums and XXHASH_AVAILABLE
         
-        if not directory.exists():
-            raise FileNotFoundError(f"Directory not found: {directory}")
+        # Frame start offsets (compressed and decompressed)
+        self._compressed_offsets = [0]
+        self._offsets = [0]
+        for compressed_size, decompressed_size, _ in self.frames:
+            self._compressed_offsets.append(self._compressed_offsets[-1] + compressed_size)
+            self._offsets.append(self._offsets[-1] + decompressed_size)
+        self.size = self._offsets[-1]
         
-        # Find files to compress
-        files = find_large_files(
-            directory,
-            min_size=self.config.min_file_size,
-            include_extensions=self.config.include_extensions,
-            exclude_extensions=self.config.exclude_extensions
+        self._position = 0
+        self._decompressor = zstd.ZstdDecompressor()
+        self._cached_index = -1
+        self._cached_data = b''
+        self.frames_decompressed = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """Move to a position of the decompressed data"""
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+    
+    def _frame(self, index: int) -> bytes:
+        """Decompressed frame (cached)"""
+        if index != self._cached_index:
+            compressed_size, decompressed_size, checksum = self.frames[index]
+            self._file.seek(self._compressed_offsets[index])
+            data = self._decompressor.decompress(
+                self._file.read(compressed_size),
+                max_output_size=decompressed_size
+            )
+            if len(data) != decompressed_size:
+                raise IOError(f"Frame {index} decompressed to {len(data)} bytes, expected {decompressed_size}")
+            if self.verify_checksums and checksum is not None and _frame_checksum(data) != checksum:
+                raise IOError(f"Checksum mismatch in frame {index}")
+            self._cached_index = index
+            self._cached_data = data
+            self.frames_decompressed += 1
+        return self._cached_data
+    
+    def readinto(self, buffer) -> int:
+        """Fill buffer from the current position (at most up to the next frame end)"""
+        if self._position >= self.size or not len(buffer):
+            return 0
+        index = bisect_right(self._offsets, self._position) - 1
+        data = self._frame(index)
+        start = self._position - self._offsets[index]
+        count = min(len(buffer), len(data) - start)
+        buffer[:count] = data[start:start + count]
+        self._position += count
+        return count
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size decompressed bytes (all remaining if size < 0)"""
+        if size is None or size < 0:
+            size = max(0, self.size - self._position)
+        parts = []
+        while size > 0 and self._position < self.size:
+            index = bisect_right(self._offsets, self._position) - 1
+            start = self._position - self._offsets[index]
+            piece = self._frame(index)[start:start + size]
+            parts.append(piece)
+            self._position += len(piece)
+            size -= len(piece)
+        return b''.join(parts)
+    
+    def close(self):
+        if not self.closed:
+            self._file.close()
+            self._cached_data = b''
+        super().close()
+
+
+# ============================================
+# INCREMENTAL MANIFEST
+# ============================================
+
+class CompressionManifest:
+    """
+    Persistent record of compressed files for incremental runs
+    
+    One row per source file, keyed by its resolved path: size, mtime_ns,
+    inode, content checksum and resolved output path/size as of its last
+    successful compression. A file is skipped when its stat matches and
+    its output is still present with the recorded size where this run
+    would write it. If only the mtime changed (e.g. touched or restored),
+    the content checksum decides, which costs a read but no compression.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            checksum TEXT,
+            checksum_block_size INTEGER NOT NULL DEFAULT 0,
+            output_path TEXT NOT NULL,
+            output_size INTEGER NOT NULL,
+            compressed_at TEXT NOT NULL
         )
+    """
+    
+    def __init__(self, path: str, commit_every: int = 1000):
+        """
+        Open (or create) a manifest
         
-        if not files:
-            logger.warning(f"No files found larger than {self.config.min_file_size / 1024 / 1024:.1f}MB")
-            return self._generate_report(start_time)
+        Args:
+            path: SQLite database file
+            commit_every: Records per transaction
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(self.SCHEMA)
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.stats = {
+            'unchanged': 0,
+            'touched': 0,
+            'new': 0,
+            'modified': 0,
+            'stale_outputs': 0,
+            'recorded': 0
+        }
+    
+    def classify(self, record: FileRecord, output_path: Optional[Path] = None) -> str:
+        """
+        Decide whether a file needs compressing
         
-        total_size = sum(f.stat().st_size for f in files)
-        logger.info(f"Found {len(files)} files ({total_size / 1024 / 1024 / 1024:.2f}GB total)")
+        Args:
+            record: Scan record of the source file
+            output_path: Output this run would write (None = accept the
+                         recorded output wherever it is)
+            
+        Returns:
+            str: 'unchanged' / 'touched' (skip) or 'new' / 'modified' /
+                 'stale_outputs' (compress)
+        """
+        path = os.path.realpath(record.path)
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, inode, checksum, checksum_block_size, output_path, output_size '
+            'FROM files WHERE path = ?',
+            (path,)
+        ).fetchone()
+        
+        if row is None:
+            state = 'new'
+        else:
+            size, mtime_ns, inode, checksum, block_size, recorded_output, output_size = row
+            try:
+                output_ok = os.stat(recorded_output).st_size == output_size
+            except OSError:
+                output_ok = False
+            # An output under another output_dir does not count for this run
+            if output_path is not None and os.path.realpath(output_path) != recorded_output:
+                output_ok = False
+            
+            if record.size != size:
+                state = 'modified'
+            elif not output_ok:
+                state = 'stale_outputs'
+            elif record.mtime_ns == mtime_ns and record.inode == inode:
+                state = 'unchanged'
+            elif checksum and self._checksum(path, block_size) == checksum:
+                # Same content under a new mtime / inode: refresh the stat only
+                self.conn.execute(
+                    'UPDATE files SET mtime_ns = ?, inode = ? WHERE path = ?',
+                    (record.mtime_ns, record.inode, path)
+                )
+                self._count_write()
+                state = 'touched'
+            else:
+                state = 'modified'
+        
+        self.stats[state] += 1
+        return state
+    
+    @staticmethod
+    def _checksum(path: Path, block_size: int) -> Optional[str]:
+        """Content checksum as recorded by the compressor"""
+        hasher = _BlockHasher(block_size) if block_size else _new_hasher()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+        except OSError:
+            return None
+        return hasher.hexdigest()
+    
+    def record(self, result: Dict[str, Any], source: FileRecord):
+        """
+        Store a successfully compressed file
+        
+        Args:
+            result: Compression result
+            source: Scan record of the source taken before it was compressed
+        """
+        self.conn.execute(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                os.path.realpath(result['input_file']), source.size, source.mtime_ns, source.inode,
+                result.get('checksum_blocks') or result.get('checksum_original'),
+                result['checksum_block_size'] if result.get('checksum_blocks') else 0,
+                os.path.realpath(result['output_file']), result['compressed_size'],
+                datetime.now().isoformat()
+            )
+        )
+        self.stats['recorded'] += 1
+        self._count_write()
+    
+    def _count_write(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.conn.commit()
+            self._uncommitted = 0
+    
+    def close(self):
+        """Commit and close"""
+        self.conn.commit()
+        self.conn.close()
+
+
+# ============================================
+# SCHEDULER
+# ============================================
+
+def output_path_for(input_path: Path, output_dir: Optional[Path] = None) -> Path:
+    """
+    Compressed output path of a file ('<name>.zst' or '<name>.gz')
+    
+    Args:
+        input_path: Original file
+        output_dir: Output directory (None = next to the original)
+        
+    Returns:
+        Path: Output file
+    """
+    name = input_path.name + ('.zst' if ZSTD_AVAILABLE else '.gz')
+    return (output_dir / name) if output_dir else input_path.with_name(name)
+
+
+def plan_tasks(
+    files: List[Tuple[Path, int]],
+    num_workers: int,
+    block_size: int
+) -> List[Tuple[Path, int, int, int]]:
+    """
+    Split work into whole-file and block tasks, largest first
+    
+    A file is split into blocks when it is larger than its fair share of
+    the run (total bytes / workers) and spans at least two blocks, so the
+    largest file no longer sets the wall-clock time. Submitting all tasks
+    largest-first (LPT) then lets idle workers pick up blocks of big files
+    and whole small files alike, balancing cores by remaining bytes.
+    
+    Args:
+        files: (path, size) pairs
+        num_workers: Worker processes
+        block_size: Block size in bytes (0 = never split)
+        
+    Returns:
+        list: (path, offset, length, block_count) tasks; block_count 0 = whole file
+    """
+    total = sum(size for _, size in files)
+    fair_share = total / max(1, num_workers)
+    
+    tasks = []
+    for path, size in files:
+        if block_size and size > fair_share and size >= 2 * block_size:
+            count = -(-size // block_size)
+            tasks.extend(
+                (path, offset, min(block_size, size - offset), count)
+                for offset in range(0, size, block_size)
+            )
+        else:
+            tasks.append((path, 0, size, 0))
+    
+    tasks.sort(key=lambda task: task[2], reverse=True)
+    return tasks
+
+
+# ============================================
+# ADAPTIVE LEVEL CONTROLLER
+# ============================================
+
+class LevelController:
+    """
+    Chooses the compression level of each task from measured throughput
+    
+    The target is a total rate in MB/s, or the rate still needed to
+    finish the remaining bytes within a time budget. Results are pooled
+    per level until sample_bytes were measured; the per-worker rate is
+    then compared with target / workers and the level moves by about one
+    step per 30% of deviation (at most 4), so it settles within a few
+    files. Results of tasks started at an older level only count towards
+    progress, not towards the rate.
+    """
+    
+    RATE_STEP = 1.3  # Throughput factor per level step (rough zstd behaviour)
+    
+    def __init__(
+        self,
+        num_workers: int,
+        level: int,
+        target_mbps: Optional[float] = None,
+        time_budget_seconds: Optional[float] = None,
+        total_bytes: int = 0,
+        min_level: int = 1,
+        max_level: int = 19,
+        tolerance: float = 0.1,
+        sample_bytes: int = 32 * 1024 * 1024
+    ):
+        """
+        Initialize controller
+        
+        Args:
+            num_workers: Worker processes sharing the target
+            level: Starting level
+            target_mbps: Total throughput target
+            time_budget_seconds: Finish total_bytes within this time instead
+            total_bytes: Bytes of the run (time budget mode)
+            min_level / max_level: Level bounds
+            tolerance: Relative deviation accepted without a change
+            sample_bytes: Bytes measured before each decision
+        """
+        if target_mbps is None and time_budget_seconds is None:
+            raise ValueError("LevelController needs target_mbps or time_budget_seconds")
+        self.num_workers = max(1, num_workers)
+        self.min_level = min_level
+        self.max_level = max_level
+        self.level = max(min_level, min(max_level, level))
+        self.target_mbps = target_mbps
+        self.time_budget_seconds = time_budget_seconds
+        self.total_bytes = total_bytes
+        self.tolerance = tolerance
+        self.sample_bytes = sample_bytes
+        
+        self.start_time = time.time()
+        self.bytes_done = 0
+        self.changes: List[Dict[str, Any]] = []
+        self.levels_used: Dict[int, int] = {}
+        self._sample_bytes = 0
+        self._sample_seconds = 0.0
+    
+    def target(self) -> float:
+        """Current total target in MB/s"""
+        if self.target_mbps is not None:
+            return self.target_mbps
+        # Past the budget the target becomes huge: the level drops to its minimum
+        remaining_time = max(1e-3, self.time_budget_seconds - (time.time() - self.start_time))
+        remaining_bytes = max(0, self.total_bytes - self.bytes_done)
+        return remaining_bytes / 1024 / 1024 / remaining_time
+    
+    def next_level(self) -> int:
+        """Level for the next task"""
+        self.levels_used[self.level] = self.levels_used.get(self.level, 0) + 1
+        return self.level
+    
+    def observe(self, size: int, seconds: float, level: Optional[int]):
+        """
+        Feed one finished file / block
+        
+        Args:
+            size: Uncompressed bytes
+            seconds: Worker time spent on it
+            level: Level it was compressed at
+        """
+        self.bytes_done += size
+        if level != self.level or seconds <= 0:
+            return
+        self._sample_bytes += size
+        self._sample_seconds += seconds
+        if self._sample_bytes < self.sample_bytes:
+            return
+        
+        measured = self._sample_bytes / 1024 / 1024 / self._sample_seconds
+        self._sample_bytes = 0
+        self._sample_seconds = 0.0
+        per_worker_target = self.target() / self.num_workers
+        if per_worker_target <= 0:
+            return
+        
+        ratio = measured / per_worker_target
+        if abs(ratio - 1) <= self.tolerance:
+            return
+        # Faster than needed -> spend it on a higher level, and vice versa
+        step = int(round(math.log(ratio) / math.log(self.RATE_STEP))) or (1 if ratio > 1 else -1)
+        step = max(-4, min(4, step))
+        level = max(self.min_level, min(self.max_level, self.level + step))
+        if level != self.level:
+            logger.info(
+                f"Adaptive level: {self.level} -> {level} "
+                f"({measured:.1f} MB/s per worker, target {per_worker_target:.1f})"
+            )
+            self.changes.append({
+                'bytes_done': self.bytes_done,
+                'from_level': self.level,
+                'to_level': level,
+                'measured_mbps_per_worker': measured,
+                'target_mbps_per_worker': per_worker_target
+            })
+            self.level = level
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Controller summary for the report"""
+        return {
+            'target_mbps': self.target_mbps,
+            'time_budget_seconds': self.time_budget_seconds,
+            'final_level': self.level,
+            'tasks_per_level': dict(sorted(self.levels_used.items())),
+            'changes': self.changes
+        }
+
+
+# ============================================
+# PARALLEL COMPRESSOR
+# ============================================
+
+def _compress_block_worker(args: Tuple[Path, int, int, CompressionConfig, Path]) -> Dict[str, Any]:
+    """
+    Worker function for block-parallel compression
+    Runs in separate process
+    
+    Args:
+        args: Tuple of (input_path, offset, length, config, part_path)
+        
+    Returns:
+        dict: Block result
+    """
+    input_path, offset, length, config, part_path = args
+    compressor = StreamingCompressor(config)
+    return compressor.compress_block(input_path, offset, length, part_path)
+
+
+def _compress_worker(args: Tuple[Path, CompressionConfig, Optional[Path]]) -> Dict[str, Any]:
+    """
+    Worker function for parallel compression
+    Runs in separate process
+    
+    Args:
+        args: Tuple of (input_path, config, output_path)
+        
+    Returns:
+        dict: Compression result
+    """
+    input_path, config, output_path = args
+    compressor = StreamingCompressor(config)
+    return compressor.compress_file(input_path, output_path)
+
+
+# ============================================
+# DICTIONARY COMPRESSION (SMALL FILES)
+# ============================================
+
+# Per-process dictionary contexts, created once by _init_dictionary_worker
+_WORKER_DICT_COMPRESSOR = None
+_WORKER_DICT_DECOMPRESSOR = None
+_WORKER_PLAIN_COMPRESSOR = None  # Dictionary-less, for the baseline sample
+_WORKER_CONFIG: Optional[CompressionConfig] = None
+
+
+def train_dictionary(files: List[Path], config: CompressionConfig, seed: int = 0):
+    """
+    Train a zstd dictionary from a sample of small files
+    
+    Reads up to dictionary_samples random files, at most ~100x the
+    dictionary size in total (zstd's recommended training volume).
+    
+    Args:
+        files: Candidate files
+        config: Compression configuration (dictionary_size, dictionary_samples)
+        seed: Sampling seed (same files -> same dictionary)
+        
+    Returns:
+        tuple: (zstd.ZstdCompressionDict, sampled file count, sampled bytes)
+    """
+    sample = random.Random(seed).sample(files, min(len(files), config.dictionary_samples))
+    budget = 100 * config.dictionary_size
+    samples = []
+    total = 0
+    for path in sample:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read(min(budget - total, 1024 * 1024))
+        except OSError as e:
+            logger.warning(f"Cannot read sample {path}: {e}")
+            continue
+        if data:
+            samples.append(data)
+            total += len(data)
+        if total >= budget:
+            break
+    
+    dictionary = zstd.train_dictionary(config.dictionary_size, samples, level=config.compression_level)
+    return dictionary, len(samples), total
+
+
+def _init_dictionary_worker(dict_bytes: Optional[bytes], config: CompressionConfig, pid_queue=None):
+    """
+    Executor initializer: one dictionary compressor / decompressor per process
+    
+    The dictionary is digested once per worker instead of once per file.
+    The worker reports its pid to pid_queue (WorkerRegistry) if given.
+    """
+    global _WORKER_DICT_COMPRESSOR, _WORKER_DICT_DECOMPRESSOR, _WORKER_CONFIG
+    global _WORKER_PLAIN_COMPRESSOR
+    dictionary = zstd.ZstdCompressionDict(dict_bytes) if dict_bytes else None
+    _WORKER_DICT_COMPRESSOR = zstd.ZstdCompressor(level=config.compression_level, dict_data=dictionary)
+    _WORKER_DICT_DECOMPRESSOR = zstd.ZstdDecompressor(dict_data=dictionary)
+    _WORKER_PLAIN_COMPRESSOR = zstd.ZstdCompressor(level=config.compression_level)
+    _WORKER_CONFIG = config
+    report_worker(pid_queue)
+
+
+def _compress_small_file(
+    input_path: Path,
+    output_path: Path,
+    dictionary_file: Optional[str],
+    baseline: bool = False
+) -> Dict[str, Any]:
+    """
+    Compress one small file in memory with the worker's dictionary
+    
+    Args:
+        input_path: Path to input file
+        output_path: Path to output file
+        dictionary_file: Dictionary path recorded in the result
+        baseline: Also compress without the dictionary and record the
+            size as 'baseline_size' (the data is already in memory)
+        
+    Returns:
+        dict: Compression result (same fields as compress_file)
+    """
+    config = _WORKER_CONFIG
+    start_time = time.time()
+    result = {
+        'input_file': str(input_path),
+        'output_file': str(output_path),
+        'success': False,
+        'original_size': 0,
+        'compressed_size': 0,
+        'compression_ratio': 0.0,
+        'time_seconds': 0.0,
+        'throughput_mbps': 0.0,
+        'error': None,
+        'checksum_original': None,
+        'checksum_verified': False,
+        'dictionary': dictionary_file
+    }
+    
+    try:
+        with open(input_path, 'rb') as f:
+            data = f.read()
+        compressed = _WORKER_DICT_COMPRESSOR.compress(data)
+        with open(output_path, 'wb') as f:
+            f.write(compressed)
+        if baseline:
+            result['baseline_size'] = len(_WORKER_PLAIN_COMPRESSOR.compress(data))
+        
+        original_size = len(data)
+        result['original_size'] = original_size
+        result['compressed_size'] = len(compressed)
+        result['compression_ratio'] = (1 - len(compressed) / original_size) * 100 if original_size > 0 else 0
+        
+        if config.verify_integrity:
+            hasher = _new_hasher()
+            hasher.update(data)
+            result['checksum_original'] = hasher.hexdigest()
+            
+            restored = _WORKER_DICT_DECOMPRESSOR.decompress(compressed, max_output_size=original_size)
+            hasher = _new_hasher()
+            hasher.update(restored)
+            result['checksum_verified'] = hasher.hexdigest() == result['checksum_original']
+            if not result['checksum_verified']:
+                result['error'] = "Integrity verification failed"
+                return result
+        
+        result['success'] = True
+        result['time_seconds'] = time.time() - start_time
+        result['throughput_mbps'] = (original_size / 1024 / 1024) / result['time_seconds'] if result['time_seconds'] > 0 else 0
+        
+        if config.delete_original:
+            input_path.unlink()
+        
+        return result
+        
+    except Exception as e:
+        result['error'] = str(e)
+        result['time_seconds'] = time.time() - start_time
+        logger.error(f"Compression failed for {input_path}: {e}")
+        if output_path.exists():
+            try:
+                output_path.unlink()
+            except OSError:
+                pass
+        return result
+
+
+_DICTIONARIES: Dict[str, Any] = {}
+
+# Trained dictionaries are saved as 'zstd-dictionary-<dict id>.dict'
+DICTIONARY_PREFIX = 'zstd-dictionary-'
+DICTIONARY_SUFFIX = '.dict'
+ZSTD_FRAME_HEADER_MAX_SIZE = 18
+
+
+def dictionary_path(directory: Path, dict_id: int) -> Path:
+    """File name a trained dictionary is saved under"""
+    return directory / f"{DICTIONARY_PREFIX}{dict_id}{DICTIONARY_SUFFIX}"
+
+
+def is_dictionary_file(path: str) -> bool:
+    """Whether a path is a dictionary saved by compress_small_files"""
+    name = os.path.basename(path)
+    return name.startswith(DICTIONARY_PREFIX) and name.endswith(DICTIONARY_SUFFIX)
+
+
+def load_dictionary(path: str):
+    """Dictionary of dictionary-compressed files (cached per process)"""
+    if path not in _DICTIONARIES:
+        with open(path, 'rb') as f:
+            _DICTIONARIES[path] = zstd.ZstdCompressionDict(f.read())
+    return _DICTIONARIES[path]
+
+
+def find_dictionary(f_raw, input_path: Path, dictionary_file: Optional[str]) -> Optional[str]:
+    """
+    Dictionary needed to decompress a .zst file
+    
+    The given path (--dictionary or the report) wins while it exists.
+    Otherwise the dictionary ID in the first frame header is looked up as
+    'zstd-dictionary-<id>.dict' next to the compressed file, which finds
+    the dictionary of a moved archive without a report.
+    
+    Args:
+        f_raw: Compressed file, positioned at its start (left there)
+        input_path: Path of the compressed file
+        dictionary_file: Known dictionary path (or None)
+        
+    Returns:
+        str: Dictionary path, or None if the file needs none
+    """
+    if dictionary_file and os.path.exists(dictionary_file):
+        return dictionary_file
+    
+    header = f_raw.read(ZSTD_FRAME_HEADER_MAX_SIZE)
+    f_raw.seek(0)
+    try:
+        dict_id = zstd.get_frame_parameters(header).dict_id
+    except zstd.ZstdError:
+        dict_id = 0
+    if dict_id:
+        candidate = dictionary_path(input_path.parent, dict_id)
+        if candidate.exists():
+            return str(candidate)
+    # Missing known path: fail on it rather than on garbage output
+    return dictionary_file
+
+
+def _compress_small_batch(
+    args: Tuple[List[Tuple[Path, Path, bool]], Optional[str]]
+) -> List[Dict[str, Any]]:
+    """
+    Worker function for dictionary compression of a batch of small files
+    Runs in separate process (one task per batch keeps IPC per file low)
+    
+    Args:
+        args: Tuple of ([(input_path, output_path, in baseline sample), ...],
+              dictionary path)
+        
+    Returns:
+        list: Compression results
+    """
+    batch, dictionary_file = args
+    return [
+        _compress_small_file(input_path, output_path, dictionary_file, baseline)
+        for input_path, output_path, baseline in batch
+    ]
+
+
+def _skipped_result(path: Path, size: int, probe: Dict[str, Any]) -> Dict[str, Any]:
+    """Result of a split file the probe found incompressible"""
+    return {
+        'input_file': str(path), 'output_file': None, 'success': True, 'skipped': True,
+        'original_size': size, 'compressed_size': size,
+        'compression_ratio': 0.0, 'time_seconds': probe['probe_seconds'],
+        'error': None, 'probe': probe
+    }
+
+
+class ParallelCompressor:
+    """
+    Multi-process file compression orchestrator
+    
+    Distributes files across CPU cores for maximum throughput.
+    """
+    
+    def __init__(self, config: CompressionConfig):
+        self.config = config
+        self.results: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        
+        # Running summary, so the report does not need the results in memory
+        self._totals: Dict[str, int] = {}
+        self._results_out = None  # JSONL sink while results_file is set
+        self._reset_results()
+        
+        # Live metrics state (read by the metrics server thread on scrape)
+        self.metrics_server: Optional[MetricsServer] = None
+        self._workers = WorkerRegistry()
+        self._live = {
+            'state': 'idle',
+            'files_total': 0,
+            'files_done': 0,
+            'files_failed': 0,
+            'bytes_total': 0,
+            'bytes_done': 0,
+            'bytes_out': 0
+        }
+        self._live_start = 0.0
+        
+        # Block-parallel state: split files waiting for their blocks
+        self._assemblies: Dict[Path, Dict[str, Any]] = {}
+        self._schedule = {'tasks': 0, 'split_files': 0, 'block_tasks': 0}
+        self._dictionary_stats: Optional[Dict[str, Any]] = None
+        self._controller: Optional[LevelController] = None
+        
+        # Incremental runs: manifest and the scan record of every file submitted
+        self._manifest: Optional[CompressionManifest] = None
+        self._source_stats: Dict[str, FileRecord] = {}
+        self._incremental: Optional[Dict[str, Any]] = None
+        
+        logger.info(f"Initialized ParallelCompressor with {config.num_workers} workers")
+    
+    def _start_live(self, num_files: int, total_size: int):
+        """Reset live counters and start the metrics endpoint if configured"""
+        self._live.update(
+            state='running', files_total=num_files, files_done=0, files_failed=0,
+            bytes_total=total_size, bytes_done=0, bytes_out=0
+        )
+        self._live_start = time.time()
+        self._workers.reset()
+        if self.config.metrics_port is not None and self.metrics_server is None:
+            self.metrics_server = MetricsServer(
+                self.live_metrics,
+                port=self.config.metrics_port,
+                job='parallel_compressor'
+            ).start()
+    
+    def _reset_results(self):
+        """Clear results and running totals of a previous run"""
+        self.results = []
+        self.errors = []
+        self._totals = {
+            'files': 0, 'successful': 0, 'failed': 0, 'skipped': 0,
+            'original_bytes': 0, 'compressed_bytes': 0
+        }
+    
+    def _open_manifest(self) -> Optional[CompressionManifest]:
+        """Open the manifest if configured and reset its per-run counters"""
+        self._source_stats = {}
+        if not self.config.manifest_file:
+            return None
+        
+        if self._manifest is None:
+            self._manifest = CompressionManifest(self.config.manifest_file)
+        manifest = self._manifest
+        for state in ('unchanged', 'touched', 'new', 'modified', 'stale_outputs', 'recorded'):
+            manifest.stats[state] = 0
+        self._incremental = manifest.stats
+        return manifest
+    
+    def _is_changed(self, manifest: CompressionManifest, record: FileRecord) -> bool:
+        """Classify one file; changed files keep their record until recorded"""
+        output_dir = Path(self.config.output_dir) if self.config.output_dir else None
+        output_path = output_path_for(Path(record.path), output_dir)
+        if manifest.classify(record, output_path) in ('unchanged', 'touched'):
+            return False
+        self._source_stats[record.path] = record
+        return True
+    
+    def _log_manifest(self, manifest: CompressionManifest):
+        logger.info(
+            f"Manifest: {manifest.stats['unchanged'] + manifest.stats['touched']} unchanged, "
+            f"{manifest.stats['new']} new, {manifest.stats['modified']} modified, "
+            f"{manifest.stats['stale_outputs']} with stale/missing outputs"
+        )
+    
+    def _select_changed(self, files: List[FileRecord]) -> List[FileRecord]:
+        """
+        Drop files the manifest shows as already compressed
+        
+        Without a manifest_file every file is selected.
+        
+        Args:
+            files: Scan records of candidate files
+            
+        Returns:
+            list: Records of files to compress (kept for recording)
+        """
+        manifest = self._open_manifest()
+        if manifest is None:
+            return files
+        
+        selected = [record for record in files if self._is_changed(manifest, record)]
+        manifest.conn.commit()
+        self._log_manifest(manifest)
+        return selected
+    
+    def _track_result(self, result: Dict[str, Any]):
+        """Count one finished file (O(1))"""
+        if self._manifest is not None:
+            source = self._source_stats.pop(result.get('input_file'), None)
+            if source is not None and result.get('success') and not result.get('skipped'):
+                self._manifest.record(result, source)
+        
+        totals = self._totals
+        totals['files'] += 1
+        if result.get('success'):
+            totals['successful'] += 1
+            totals['skipped'] += 1 if result.get('skipped') else 0
+            totals['original_bytes'] += result.get('original_size', 0)
+            totals['compressed_bytes'] += result.get('compressed_size', 0)
+        else:
+            totals['failed'] += 1
+        
+        live = self._live
+        live['files_done'] += 1
+        live['bytes_done'] += result.get('original_size', 0)
+        if result.get('success'):
+            live['bytes_out'] += result.get('compressed_size', 0)
+        else:
+            live['files_failed'] += 1
+    
+    def _stop_live(self):
+        """Mark the run finished and stop the metrics endpoint"""
+        self._live['state'] = 'finished'
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+    
+    def live_metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of the running job (served by the metrics endpoint)
+        
+        Returns:
+            dict: Progress, throughput, ETA, queue depth and worker status
+        """
+        live = dict(self._live)
+        elapsed = time.time() - self._live_start if self._live_start else 0.0
+        
+        pending = live['files_total'] - live['files_done']
+        live.update(
+            elapsed_seconds=elapsed,
+            files_pending=pending,
+            files_in_progress=min(pending, self.config.num_workers),
+            num_workers=self.config.num_workers,
+            workers=worker_status(self._workers)
+        )
+        # Bytes advance per finished file, so the ETA is coarse for few large files
+        live.update(progress_metrics(live['bytes_done'], live['bytes_total'], elapsed))
+        return live
+    
+    def compress_directory(self, directory: str) -> Dict[str, Any]:
+        """
+        Compress all large files in directory using parallel processing
+        
+        Args:
+            directory: Directory path to process
+            
+        Returns:
+            dict: Overall statistics
+        """
+        start_time = time.time()
+        directory = Path(directory)
+        
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+        
+        if self.config.streaming:
+            return self._compress_streaming(directory, start_time)
+        
+        # Find files to compress (one stat per file)
+        scan_start = time.time()
+        files = scan_files(
+            directory,
+            min_size=self.config.min_file_size,
+            include_extensions=self.config.include_extensions,
+            exclude_extensions=self.config.exclude_extensions,
+            num_threads=self.config.scan_threads
+        )
+        logger.info(f"Scanned {directory} in {time.time() - scan_start:.2f}s")
+        
+        files = self._select_changed(files)
+        
+        if not files:
+            logger.warning(f"No files to compress larger than {self.config.min_file_size / 1024 / 1024:.1f}MB")
+            self._reset_results()
+            return self._generate_report(start_time)
+        
+        total_size = sum(record.size for record in files)
+        logger.info(f"Found {len(files)} files ({total_size / 1024 / 1024 / 1024:.2f}GB total)")
+        
+        # Prepare output directory
+        output_dir = Path(self.config.output_dir) if self.config.output_dir else None
+        if output_dir:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Process in parallel
+        self._run_work_items([(Path(record.path), record.size) for record in files], total_size, output_dir)
+        return self._generate_report(start_time)
+    
+    def compress_files(self, files: List[str]) -> Dict[str, Any]:
+        """
+        Compress specific list of files
+        
+        Args:
+            files: List of file paths
+            
+        Returns:
+            dict: Overall statistics
+        """
+        start_time = time.time()
+        
+        # Convert to Path objects and validate
+        file_paths = []
+        for f in files:
+            path = Path(f)
+            if path.exists() and path.is_file():
+                file_paths.append(path)
+            else:
+                logger.warning(f"File not found: {f}")
+        
+        if not file_paths:
+            logger.warning("No valid files to process")
+            return self._generate_report(start_time)
+        
+        # Process in parallel
+        sized = [(Path(record.path), record.size) for record in map(file_record, file_paths)]
+        self._run_work_items(sized, sum(size for _, size in sized), None)
+        return self._generate_report(start_time)
+    
+    def compress_small_files(self, directory: str) -> Dict[str, Any]:
+        """
+        Compress files below min_file_size with a trained zstd dictionary
+        
+        Small files share most of their structure (JSON keys, log
+        prefixes), which single-file compression cannot exploit. A
+        dictionary is trained from a sample of them, saved next to the
+        outputs ('zstd-dictionary-<id>.dict'; needed to restore, never
+        taken as input by later runs) and used by every worker, which
+        digests it once. Files travel to workers in
+        batches of small_file_batch.
+        
+        Args:
+            directory: Directory path to process
+            
+        Returns:
+            dict: Overall statistics plus a 'dictionary' section (ratio
+                  gained against dictionary-less compression of a sample)
+        """
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required for dictionary compression")
+        
+        start_time = time.time()
+        directory = Path(directory)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+        
+        records = scan_files(
+            directory,
+            min_size=1,
+            include_extensions=self.config.include_extensions,
+            exclude_extensions=self.config.exclude_extensions,
+            max_size=self.config.min_file_size,
+            num_threads=self.config.scan_threads
+        )
+        # Dictionaries of earlier runs saved into this tree are not input
+        records = self._select_changed([record for record in records if not is_dictionary_file(record.path)])
+        self._reset_results()
+        if not records:
+            logger.warning(f"No files found smaller than {self.config.min_file_size / 1024 / 1024:.1f}MB")
+            return self._generate_report(start_time)
+        
+        sizes = {Path(record.path): record.size for record in records}
+        files = list(sizes)
+        total_size = sum(sizes.values())
+        logger.info(f"Found {len(files)} small files ({total_size / 1024 / 1024:.2f}MB total)")
         
-        # Prepare output directory
         output_dir = Path(self.config.output_dir) if self.config.output_dir else None
         if output_dir:
             output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Prepare work items
-        work_items = []
-        for filepath in files:
-            if output_dir:
-                output_path = output_dir / (filepath.name + ('.zst' if ZSTD_AVAILABLE else '.gz'))
+        # Train and store the dictionary
+        train_start = time.time()
+        dict_bytes = None
+        dictionary_file = None
+        stats = {'training_files': 0, 'training_bytes': 0}
+        try:
+            dictionary, stats['training_files'], stats['training_bytes'] = train_dictionary(files, self.config)
+            dict_bytes = dictionary.as_bytes()
+            dictionary_file = str(dictionary_path((output_dir or directory).resolve(), dictionary.dict_id()))
+            with open(dictionary_file, 'wb') as f:
+                f.write(dict_bytes)
+            stats.update(file=dictionary_file, dict_id=dictionary.dict_id(), size_bytes=len(dict_bytes))
+            logger.info(
+                f"Trained {len(dict_bytes) / 1024:.1f}KB dictionary from {stats['training_files']} files "
+                f"in {time.time() - train_start:.2f}s: {dictionary_file}"
+            )
+        except Exception as e:
+            # Too few / too uniform samples: compress without a dictionary
+            logger.warning(f"Dictionary training failed, compressing without dictionary: {e}")
+        stats['training_seconds'] = time.time() - train_start
+        
+        # Batches of files per task; workers also compress a sample of the
+        # files without the dictionary, while the data is in memory
+        baseline_sample = set(random.Random(1).sample(files, min(len(files), 500)))
+        batch_size = max(1, self.config.small_file_batch)
+        batches = [
+            [
+                (f, output_path_for(f, output_dir), f in baseline_sample)
+                for f in files[i:i + batch_size]
+            ]
+            for i in range(0, len(files), batch_size)
+        ]
+        
+        self._start_live(len(files), total_size)
+        compress_start = time.time()
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.config.num_workers,
+                initializer=_init_dictionary_worker,
+                initargs=(dict_bytes, self.config, self._workers.queue)
+            ) as executor:
+                futures = {
+                    executor.submit(_compress_small_batch, (batch, dictionary_file)): batch
+                    for batch in batches
+                }
+                
+                if TQDM_AVAILABLE:
+                    pbar = tqdm(
+                        total=len(files),
+                        desc="🗜️  Compressing (dictionary)",
+                        unit="file",
+                        ncols=100
+                    )
+                
+                for future in as_completed(futures):
+                    batch = futures.pop(future)
+                    
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        results = [
+                            {'input_file': str(path), 'success': False, 'error': str(e)}
+                            for path, _, _ in batch
+                        ]
+                    
+                    for result in results:
+                        self.results.append(result)
+                        if not result['success']:
+                            self.errors.append(result)
+                            self._log_error(result)
+                        self._track_result(result)
+                    
+                    if TQDM_AVAILABLE:
+                        pbar.update(len(batch))
+                
+                if TQDM_AVAILABLE:
+                    pbar.close()
+        finally:
+            self._stop_live()
+        
+        # Ratio gained: dictionary-less compression of the same sample
+        compress_seconds = time.time() - compress_start
+        successful = [r for r in self.results if r.get('success')]
+        original = sum(r['original_size'] for r in successful)
+        compressed = sum(r['compressed_size'] for r in successful)
+        sample = [r for r in successful if 'baseline_size' in r]
+        baseline_in = sum(r['original_size'] for r in sample)
+        baseline_out = sum(r['baseline_size'] for r in sample)
+        sample_with_dict = sum(r['compressed_size'] for r in sample)
+        stats.update(
+            files=len(files),
+            compression_ratio=(1 - compressed / original) * 100 if original else 0.0,
+            baseline_ratio_sample=(1 - baseline_out / baseline_in) * 100 if baseline_in else None,
+            # Compressed size without / with dictionary on the same sample
+            size_factor_sample=baseline_out / sample_with_dict if baseline_in and sample_with_dict else None,
+            files_per_second=len(files) / compress_seconds if compress_seconds > 0 else 0.0,
+            throughput_mbps=(original / 1024 / 1024) / compress_seconds if compress_seconds > 0 else 0.0
+        )
+        if stats['baseline_ratio_sample'] is not None:
+            stats['ratio_gain_points'] = stats['compression_ratio'] - stats['baseline_ratio_sample']
+        self._dictionary_stats = stats
+        
+        return self._generate_report(start_time)
+    
+    def _compress_streaming(self, directory: Path, start_time: float) -> Dict[str, Any]:
+        """
+        Compress files while the scan is still discovering them
+        
+        Discovered files are turned into tasks lazily and pulled into the
+        same bounded submission window as a listed run, so workers start
+        on the first files found. File and byte totals are running totals.
+        Nothing kept per file outlives its task (results too, with
+        results_file), so memory does not depend on the file count.
+        
+        Args:
+            directory: Directory to scan
+            start_time: Start of the run
+            
+        Returns:
+            dict: Overall statistics
+        """
+        output_dir = Path(self.config.output_dir) if self.config.output_dir else None
+        if output_dir:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._reset_results()
+        self._assemblies = {}
+        self._schedule = {'tasks': 0, 'split_files': 0, 'block_tasks': 0}
+        self._start_live(0, 0)
+        self._open_results_file()
+        try:
+            manifest = self._open_manifest()
+            controller = self._new_controller(0)
+            block_probes: Dict[Path, Dict[str, Any]] = {}
+            records = iter_files(
+                directory,
+                min_size=self.config.min_file_size,
+                include_extensions=self.config.include_extensions,
+                exclude_extensions=self.config.exclude_extensions,
+                num_threads=self.config.scan_threads
+            )
+            try:
+                self._execute_tasks(
+                    self._stream_tasks(records, manifest, controller, block_probes),
+                    output_dir, block_probes, controller
+                )
+            finally:
+                records.close()
+        finally:
+            self._close_results_file()
+            self._stop_live()
+        
+        if manifest is not None:
+            self._log_manifest(manifest)
+        logger.info(
+            f"Streamed {self._live['files_total']} files "
+            f"({self._live['bytes_total'] / 1024 / 1024 / 1024:.2f}GB total)"
+        )
+        if not self._live['files_total']:
+            logger.warning(f"No files to compress larger than {self.config.min_file_size / 1024 / 1024:.1f}MB")
+        return self._generate_report(start_time)
+    
+    def _stream_tasks(
+        self,
+        records: Iterator[FileRecord],
+        manifest: Optional[CompressionManifest],
+        controller: Optional[LevelController],
+        block_probes: Dict[Path, Dict[str, Any]]
+    ) -> Generator[Tuple[Path, int, int, int], None, None]:
+        """
+        Turn scan records into tasks as they arrive
+        
+        The run total is unknown, so there is no fair share to compare
+        against: every file spanning at least two blocks is split. Split
+        files are probed here, as in a listed run.
+        
+        Yields:
+            tuple: (path, offset, length, block_count) tasks
+        """
+        block_size = self.config.block_size
+        schedule = self._schedule
+        live = self._live
+        
+        for record in records:
+            if manifest is not None and not self._is_changed(manifest, record):
+                continue
+            path, size = Path(record.path), record.size
+            live['files_total'] += 1
+            live['bytes_total'] += size
+            
+            if not (block_size and size >= 2 * block_size):
+                if controller is not None:
+                    controller.total_bytes += size
+                schedule['tasks'] += 1
+                yield (path, 0, size, 0)
+                continue
+            
+            if self.config.probe:
+                probe = probe_compressibility(path, size, self.config)
+                if probe['decision'] == 'skip':
+                    self._record_result(_skipped_result(path, size, probe))
+                    continue
+                block_probes[path] = probe
+            
+            if controller is not None:
+                controller.total_bytes += size
+            count = -(-size // block_size)
+            schedule['tasks'] += count
+            schedule['split_files'] += 1
+            schedule['block_tasks'] += count
+            for offset in range(0, size, block_size):
+                yield (path, offset, min(block_size, size - offset), count)
+    
+    def _run_work_items(self, files: List[Tuple[Path, int]], total_size: int, output_dir: Optional[Path]):
+        """
+        Compress files on the process pool (whole files and blocks)
+        
+        Args:
+            files: (path, size) pairs
+            total_size: Sum of file sizes
+            output_dir: Output directory (None = next to the originals)
+        """
+        self._reset_results()
+        self._assemblies = {}
+        self._start_live(len(files), total_size)
+        self._open_results_file()
+        
+        try:
+            tasks = plan_tasks(files, self.config.num_workers, self.config.block_size)
+            split_files = {task[0] for task in tasks if task[3]}
+            
+            # Split files are probed here (whole files probe in their worker)
+            block_probes = {}
+            if self.config.probe and split_files:
+                sizes = dict(files)
+                for path in split_files:
+                    block_probes[path] = probe_compressibility(path, sizes[path], self.config)
+                skipped = {path for path, probe in block_probes.items() if probe['decision'] == 'skip'}
+                for path in skipped:
+                    self._record_result(_skipped_result(path, sizes[path], block_probes.pop(path)))
+                tasks = [task for task in tasks if task[0] not in skipped]
+                split_files -= skipped
+            self._schedule = {
+                'tasks': len(tasks),
+                'split_files': len(split_files),
+                'block_tasks': sum(1 for task in tasks if task[3])
+            }
+            if split_files:
+                logger.info(
+                    f"Splitting {len(split_files)} large file(s) into "
+                    f"{self._schedule['block_tasks']} blocks of {self.config.block_size / 1024 / 1024:.0f}MB"
+                )
+            
+            controller = self._new_controller(total_size)
+            self._execute_tasks(iter(tasks), output_dir, block_probes, controller)
+        finally:
+            self._close_results_file()
+            self._stop_live()
+    
+    def _new_controller(self, total_size: int) -> Optional[LevelController]:
+        """Level controller of the run (None without a target)"""
+        controller = None
+        if self.config.target_mbps or self.config.time_budget_seconds:
+            # Streaming runs start without a total; sample a fixed amount per level
+            sample_bytes = 32 * 1024 * 1024
+            if total_size:
+                sample_bytes = min(sample_bytes, max(1, total_size // (4 * self.config.num_workers)))
+            controller = LevelController(
+                self.config.num_workers,
+                self.config.compression_level,
+                target_mbps=self.config.target_mbps,
+                time_budget_seconds=self.config.time_budget_seconds,
+                total_bytes=total_size,
+                max_level=19 if ZSTD_AVAILABLE else 9,
+                sample_bytes=sample_bytes
+            )
+        self._controller = controller
+        return controller
+    
+    def _execute_tasks(
+        self,
+        task_iter: Iterator[Tuple[Path, int, int, int]],
+        output_dir: Optional[Path],
+        block_probes: Dict[Path, Dict[str, Any]],
+        controller: Optional[LevelController]
+    ):
+        """
+        Run tasks on the process pool through a bounded submission window
+        
+        Tasks are pulled from task_iter only as futures complete, so it may
+        be a lazy generator (streaming discovery). Progress follows the
+        live counters, whose totals may still grow during the run.
+        
+        Args:
+            task_iter: (path, offset, length, block_count) tasks
+            output_dir: Output directory (None = next to the originals)
+            block_probes: Probe results of split files (consumed per file)
+            controller: Adaptive level controller or None
+        """
+        live = self._live
+        with ProcessPoolExecutor(
+            max_workers=self.config.num_workers,
+            initializer=report_worker,
+            initargs=(self._workers.queue,)
+        ) as executor:
+            futures = {}
+            
+            def submit_next() -> bool:
+                """Submit the next task (level chosen now, from the latest measurements)"""
+                task = next(task_iter, None)
+                if task is None:
+                    return False
+                path, offset, length, count = task
+                config = self.config
+                if controller is not None:
+                    config = replace(config, compression_level=controller.next_level())
+                output_path = output_path_for(path, output_dir)
+                
+                if count:
+                    state = self._assemblies.setdefault(path, {
+                        'output_path': output_path,
+                        'count': count,
+                        'blocks': [],
+                        'probe': block_probes.pop(path, None)
+                    })
+                    probe = state['probe']
+                    if probe and probe['decision'] == 'store':
+                        config = replace(config, compression_level=probe['level'])
+                    elif probe and probe['level'] != self.config.compression_level:
+                        # Probe chose the fast level
+                        config = replace(config, compression_level=min(probe['level'], config.compression_level))
+                    part_path = output_path.with_name(
+                        f"{output_path.name}.part{offset // self.config.block_size:06d}"
+                    )
+                    item = (path, offset, length, config, part_path)
+                    futures[executor.submit(_compress_block_worker, item)] = (path, offset, length)
+                else:
+                    item = (path, config, output_path)
+                    futures[executor.submit(_compress_worker, item)] = (path, None, length)
+                return True
+            
+            # Bounded window: levels of later tasks follow the measurements
+            window = max(2, 2 * self.config.num_workers)
+            while len(futures) < window and submit_next():
+                pass
+            
+            # Progress bar (total grows while files are still being discovered)
+            if TQDM_AVAILABLE:
+                pbar = tqdm(
+                    total=live['files_total'],
+                    desc="🗜️  Compressing",
+                    unit="file",
+                    ncols=100,
+                    bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+                )
+            
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filepath, offset, length = futures.pop(future)
+                    submit_next()
+                    
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'input_file': str(filepath), 'success': False, 'error': str(e)}
+                        if offset is not None:
+                            result = {'offset': offset, 'length': length, 'error': str(e)}
+                    
+                    if controller is not None:
+                        # Only plain compressions measure the level; the rest is progress
+                        probe = result.get('probe')
+                        measured = not result.get('error') and not result.get('skipped') and (
+                            not probe or probe['decision'] == 'compress'
+                        )
+                        controller.observe(
+                            length,
+                            result.get('time_seconds', 0.0) if measured else 0.0,
+                            result.get('compression_level') if measured else None
+                        )
+                    
+                    if offset is not None:
+                        # Block of a split file: a file result once all blocks are in
+                        result = self._add_block(filepath, result)
+                        if result is None:
+                            continue
+                    
+                    self._record_result(result)
+                
+                if TQDM_AVAILABLE:
+                    if pbar.total != live['files_total']:
+                        pbar.total = live['files_total']
+                    pbar.update(live['files_done'] - pbar.n)
+            
+            if TQDM_AVAILABLE:
+                pbar.close()
+    
+    def _open_results_file(self):
+        """Start the JSONL result stream of a run (if results_file is set)"""
+        if self.config.results_file:
+            self._results_out = open(self.config.results_file, 'w', encoding='utf-8')
+    
+    def _close_results_file(self):
+        if self._results_out is not None:
+            self._results_out.close()
+            self._results_out = None
+    
+    def _record_result(self, result: Dict[str, Any]):
+        """Store one file result, log failures and update live counters"""
+        if self._results_out is not None:
+            self._results_out.write(json.dumps(result) + '\n')
+        else:
+            self.results.append(result)
+        if not result['success']:
+            self.errors.append(result)
+            self._log_error(result)
+        self._track_result(result)
+    
+    def _add_block(self, input_path: Path, block: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Collect one block result; assemble the file when it is complete
+        
+        Args:
+            input_path: Original file
+            block: Block result from compress_block
+            
+        Returns:
+            dict: File result once all blocks arrived, else None
+        """
+        state = self._assemblies[input_path]
+        state['blocks'].append(block)
+        if len(state['blocks']) < state['count']:
+            return None
+        del self._assemblies[input_path]
+        
+        blocks = sorted(state['blocks'], key=lambda b: b['offset'])
+        output_path = state['output_path']
+        parts = [Path(b['part_file']) for b in blocks if b.get('part_file')]
+        original_size = sum(b.get('length', 0) for b in blocks)
+        worker_seconds = sum(b.get('time_seconds', 0.0) for b in blocks)
+        errors = [b['error'] for b in blocks if b.get('error')]
+        
+        result = {
+            'input_file': str(input_path),
+            'output_file': str(output_path),
+            'success': False,
+            'original_size': original_size,
+            'compressed_size': 0,
+            'compression_ratio': 0.0,
+            # Summed over blocks (CPU time across workers, not wall time)
+            'time_seconds': worker_seconds,
+            'throughput_mbps': (original_size / 1024 / 1024) / worker_seconds if worker_seconds > 0 else 0,
+            'error': errors[0] if errors else None,
+            # Not a checksum of the bytes: see combine_block_checksums()
+            'checksum_blocks': None,
+            'checksum_verified': False,
+            'blocks': len(blocks),
+            'checksum_block_size': self.config.block_size
+        }
+        if state['probe']:
+            result['probe'] = state['probe']
+        levels = [b['compression_level'] for b in blocks if 'compression_level' in b]
+        if levels:
+            result['compression_level'] = max(set(levels), key=levels.count)
+            if len(set(levels)) > 1:
+                result['block_levels'] = levels
+        
+        try:
+            if not errors:
+                concat_files([str(part) for part in parts], str(output_path))
+                if self.config.seekable and ZSTD_AVAILABLE:
+                    frames = [frame for b in blocks for frame in b['frames']]
+                    with open(output_path, 'ab') as f_out:
+                        write_seek_table(f_out, frames)
+                    result['seekable_frames'] = len(frames)
+                compressed_size = output_path.stat().st_size
+                result['compressed_size'] = compressed_size
+                result['compression_ratio'] = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+                if self.config.verify_integrity:
+                    result['checksum_blocks'] = combine_block_checksums([b['checksum'] for b in blocks])
+                    result['checksum_verified'] = all(b['checksum_verified'] for b in blocks)
+                result['success'] = True
+                
+                if self.config.delete_original:
+                    input_path.unlink()
+                    logger.info(f"Deleted original: {input_path}")
+        except Exception as e:
+            result['error'] = str(e)
+            result['success'] = False
+            logger.error(f"Assembling blocks failed for {input_path}: {e}")
+        finally:
+            for part in parts:
+                try:
+                    part.unlink()
+                except OSError:
+                    pass
+        
+        return result
+    
+    def _log_error(self, error_result: Dict[str, Any]):
+        """Log error to file"""
+        error_log_path = Path(self.config.error_log_file)
+        
+        with open(error_log_path, 'a', encoding='utf-8') as f:
+            timestamp = datetime.now().isoformat()
+            f.write(f"[{timestamp}] {error_result['input_file']}: {error_result.get('error', 'Unknown error')}\n")
+    
+    def _generate_report(self, start_time: float) -> Dict[str, Any]:
+        """Generate compression report"""
+        total_time = time.time() - start_time
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+        
+        totals = self._totals
+        total_original = totals['original_bytes']
+        total_compressed = totals['compressed_bytes']
+        
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'summary': {
+                'total_files': totals['files'],
+                'successful': totals['successful'],
+                'failed': totals['failed'],
+                'skipped_incompressible': totals['skipped'],
+                'total_original_size_bytes': total_original,
+                'total_compressed_size_bytes': total_compressed,
+                'overall_compression_ratio': (1 - total_compressed / total_original) * 100 if total_original > 0 else 0,
+                'total_time_seconds': total_time,
+                'throughput_mbps': (total_original / 1024 / 1024) / total_time if total_time > 0 else 0,
+                'space_saved_bytes': total_original - total_compressed,
+                'workers_used': self.config.num_workers
+            },
+            'compression_engine': 'zstd' if ZSTD_AVAILABLE else 'gzip',
+            'config': {
+                'chunk_size': self.config.chunk_size,
+                'compression_level': self.config.compression_level,
+                'verify_integrity': self.config.verify_integrity,
+                'delete_original': self.config.delete_original,
+                'block_size': self.config.block_size,
+                'checksum_algorithm': 'xxh64' if XXHASH_AVAILABLE else 'crc32',
+                'probe': self.config.probe,
+                'streaming': self.config.streaming
+            },
+            'schedule': dict(self._schedule),
+            'dictionary': self._dictionary_stats,
+            'incremental': self._incremental,
+            'adaptive': self._controller.to_dict() if self._controller else None,
+            'results': self.results,
+            'results_file': self.config.results_file,
+            'errors': self.errors
+        }
+        
+        self._print_report(report)
+        
+        return report
+    
+    def _print_report(self, report: Dict[str, Any]):
+        """Print formatted report to console"""
+        summary = report['summary']
+        
+        print("\n")
+        print("╔══════════════════════════════════════════════════════════════════╗")
+        print("║               🗜️  COMPRESSION COMPLETE                           ║")
+        print("╚══════════════════════════════════════════════════════════════════╝")
+        print()
+        print(f"  📊 Files Processed:    {summary['total_files']}")
+        print(f"     ✅ Successful:      {summary['successful']}")
+        print(f"     ❌ Failed:          {summary['failed']}")
+        if summary['skipped_incompressible']:
+            print(f"     ⏭️  Skipped:         {summary['skipped_incompressible']} (incompressible)")
+        print()
+        print(f"  💾 Storage:")
+        print(f"     Original Size:      {summary['total_original_size_bytes'] / 1024 / 1024 / 1024:.2f} GB")
+        print(f"     Compressed Size:    {summary['total_compressed_size_bytes'] / 1024 / 1024 / 1024:.2f} GB")
+        print(f"     Space Saved:        {summary['space_saved_bytes'] / 1024 / 1024 / 1024:.2f} GB ({summary['overall_compression_ratio']:.1f}%)")
+        print()
+        print(f"  ⚡ Performance:")
+        print(f"     Total Time:         {summary['total_time_seconds']:.2f}s")
+        print(f"     Throughput:         {summary['throughput_mbps']:.2f} MB/s")
+        print(f"     Workers Used:       {summary['workers_used']}")
+        print()
+        print(f"  🔧 Engine:             {report['compression_engine']}")
+        print()
+        
+        dictionary = report.get('dictionary')
+        if dictionary and dictionary.get('baseline_ratio_sample') is not None:
+            print(f"  📖 Dictionary:         {dictionary.get('file', 'none')}")
+            print(f"     Ratio:              {dictionary['compression_ratio']:.1f}% "
+                  f"(without dictionary: {dictionary['baseline_ratio_sample']:.1f}% on a sample)")
+            print(f"     Files/s:            {dictionary['files_per_second']:.0f}")
+            print()
+        
+        if report['errors']:
+            print(f"  ⚠️  Errors logged to:   {self.config.error_log_file}")
+        
+        print("═" * 70)
+
+
+# ============================================
+# PARALLEL DECOMPRESSOR
+# ============================================
+
+COMPRESSED_EXTENSIONS = ('.zst', '.gz')
+
+
+class _BlockHasher:
+    """Hashes a stream in fixed-size pieces (checksum of block-compressed files)"""
+    
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self.checksums: List[str] = []
+        self._hasher = _new_hasher()
+        self._filled = 0
+    
+    def update(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.block_size - self._filled)
+            self._hasher.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.block_size:
+                self.checksums.append(self._hasher.hexdigest())
+                self._hasher = _new_hasher()
+                self._filled = 0
+    
+    def hexdigest(self) -> str:
+        checksums = self.checksums + ([self._hasher.hexdigest()] if self._filled else [])
+        return combine_block_checksums(checksums)
+
+
+def decompress_file(
+    input_path: Path,
+    output_path: Path,
+    config: CompressionConfig,
+    expected: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Decompress one .zst / .gz file using streaming
+    
+    RAM Usage: O(chunk_size). Output is written to a temporary file and
+    renamed into place once complete (and verified).
+    
+    Args:
+        input_path: Compressed file
+        output_path: Restored file
+        config: Chunk size and delete_original (deletes the compressed file)
+        expected: Compression report entry of this file (checksum verification)
+        
+    Returns:
+        dict: Decompression result with statistics
+    """
+    start_time = time.time()
+    partial_path = output_path.with_name(output_path.name + '.partial')
+    
+    result = {
+        'input_file': str(input_path),
+        'output_file': str(output_path),
+        'success': False,
+        'compressed_size': 0,
+        'decompressed_size': 0,
+        'time_seconds': 0.0,
+        'throughput_mbps': 0.0,
+        'error': None,
+        'checksum': None,
+        'checksum_expected': None,
+        'checksum_verified': None  # None = no checksum in the report
+    }
+    
+    try:
+        result['compressed_size'] = input_path.stat().st_size
+        
+        expected = expected or {}
+        hasher = None
+        expected_checksum = expected.get('checksum_blocks')
+        if expected_checksum:
+            hasher = _BlockHasher(expected['checksum_block_size'])
+        else:
+            expected_checksum = expected.get('checksum_original')
+            if expected_checksum:
+                hasher = _new_hasher()
+        result['checksum_expected'] = expected_checksum
+        
+        suffix = input_path.suffix.lower()
+        with open(input_path, 'rb') as f_raw, open(partial_path, 'wb') as f_out:
+            if suffix == '.zst':
+                if not ZSTD_AVAILABLE:
+                    raise RuntimeError("zstandard is required to decompress .zst files")
+                dictionary_file = find_dictionary(
+                    f_raw, input_path, config.dictionary_file or expected.get('dictionary')
+                )
+                decompressor = zstd.ZstdDecompressor(
+                    dict_data=load_dictionary(dictionary_file) if dictionary_file else None
+                )
+                f_in = decompressor.stream_reader(f_raw, read_across_frames=True)
+            elif suffix == '.gz':
+                f_in = gzip.GzipFile(fileobj=f_raw, mode='rb')
             else:
-                output_path = None
-            work_items.append((filepath, self.config, output_path))
+                raise ValueError(f"Unsupported compressed file: {input_path}")
+            
+            with f_in:
+                size = 0
+                while True:
+                    chunk = f_in.read(config.chunk_size)
+                    if not chunk:
+                        break
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    f_out.write(chunk)
+                    size += len(chunk)
         
-        # Process in parallel
-        self.results = []
-        self.errors = []
+        result['decompressed_size'] = size
+        if hasher is not None:
+            result['checksum'] = hasher.hexdigest()
+            result['checksum_verified'] = result['checksum'] == expected_checksum
+            if not result['checksum_verified']:
+                raise IOError(
+                    f"Checksum mismatch: expected {expected_checksum}, got {result['checksum']}"
+                )
+        
+        os.replace(partial_path, output_path)
+        result['success'] = True
+        result['time_seconds'] = time.time() - start_time
+        result['throughput_mbps'] = (size / 1024 / 1024) / result['time_seconds'] if result['time_seconds'] > 0 else 0
+        
+        if config.delete_original:
+            input_path.unlink()
+            logger.info(f"Deleted compressed file: {input_path}")
+        
+        return result
+        
+    except Exception as e:
+        result['error'] = str(e)
+        result['time_seconds'] = time.time() - start_time
+        logger.error(f"Decompression failed for {input_path}: {e}")
+        
+        # Clean up partial output
+        if partial_path.exists():
+            try:
+                partial_path.unlink()
+            except OSError:
+                pass
+        
+        return result
+
+
+def _decompress_worker(args: Tuple[Path, Path, CompressionConfig, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Worker function for parallel decompression
+    Runs in separate process
+    
+    Args:
+        args: Tuple of (input_path, output_path, config, report entry)
+        
+    Returns:
+        dict: Decompression result
+    """
+    input_path, output_path, config, expected = args
+    return decompress_file(input_path, output_path, config, expected)
+
+
+class ParallelDecompressor(ParallelCompressor):
+    """
+    Multi-process restore of .zst / .gz trees
+    
+    Counterpart of ParallelCompressor with the same progress bar, error
+    log, live metrics and JSON report. Checksums are verified when the
+    compression report is given. Config fields: chunk_size, num_workers,
+    output_dir, delete_original (deletes compressed files after a
+    successful restore), error_log_file, metrics_port.
+    """
+    
+    def __init__(self, config: CompressionConfig, report_file: Optional[str] = None):
+        """
+        Initialize decompressor
+        
+        Args:
+            config: Compression configuration (see class docstring)
+            report_file: JSON report of the compression run (for checksums)
+        """
+        super().__init__(config)
+        self.report_file = report_file
+        self._expected = self._load_report(report_file) if report_file else {}
+    
+    @staticmethod
+    def _load_report(report_file: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Index compression results by output path and by output file name
+        
+        Accepts a JSON report or a JSONL results file (--results-jsonl); a
+        report whose results were streamed is followed to its results file.
+        """
+        with open(report_file, 'r', encoding='utf-8') as f:
+            if report_file.endswith('.jsonl'):
+                results = [json.loads(line) for line in f if line.strip()]
+            else:
+                report = json.load(f)
+                results = report.get('results', [])
+                if not results and report.get('results_file'):
+                    with open(report['results_file'], 'r', encoding='utf-8') as rf:
+                        results = [json.loads(line) for line in rf if line.strip()]
+        
+        expected = {}
+        names: Dict[str, int] = {}
+        for entry in results:
+            if not entry.get('success') or not entry.get('output_file'):
+                continue
+            output = Path(entry['output_file'])
+            expected[str(output.resolve())] = entry
+            names[output.name] = names.get(output.name, 0) + 1
+            expected.setdefault(output.name, entry)
         
-        with ProcessPoolExecutor(max_workers=self.config.num_workers) as executor:
-            futures = {executor.submit(_compress_worker, item): item[0] for item in work_items}
-            
-            # Progress bar
-            if TQDM_AVAILABLE:
-                pbar = tqdm(
-                    total=len(files),
-                    desc="🗜️  Compressing",
-                    unit="file",
-                    ncols=100,
-                    bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
-                )
-            
-            for future in as_completed(futures):
-                filepath = futures[future]
-                
-                try:
-                    result = future.result()
-                    self.results.append(result)
-                    
-                    if not result['success']:
-                        self.errors.append(result)
-                        self._log_error(result)
-                    
-                except Exception as e:
-                    error_result = {
-                        'input_file': str(filepath),
-                        'success': False,
-                        'error': str(e)
-                    }
-                    self.errors.append(error_result)
-                    self._log_error(error_result)
-                
-                if TQDM_AVAILABLE:
-                    pbar.update(1)
+        # Name fallback only where unambiguous (moved archives)
+        for name, count in names.items():
+            if count > 1:
+                expected.pop(name, None)
+        logger.info(f"Loaded {len(results)} checksums from {report_file}")
+        return expected
+    
+    def _expected_for(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Compression report entry of a compressed file"""
+        return self._expected.get(str(path.resolve())) or self._expected.get(path.name)
+    
+    def decompress_directory(self, directory: str) -> Dict[str, Any]:
+        """
+        Decompress all .zst / .gz files in directory using parallel processing
+        
+        Args:
+            directory: Directory path to process
             
-            if TQDM_AVAILABLE:
-                pbar.close()
+        Returns:
+            dict: Overall statistics
+        """
+        start_time = time.time()
+        directory = Path(directory)
         
-        return self._generate_report(start_time)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+        
+        files = scan_files(
+            directory,
+            min_size=0,
+            include_extensions=list(COMPRESSED_EXTENSIONS),
+            num_threads=self.config.scan_threads
+        )
+        return self._run_restore(files, start_time)
     
-    def compress_files(self, files: List[str]) -> Dict[str, Any]:
+    def decompress_files(self, files: List[str]) -> Dict[str, Any]:
         """
-        Compress specific list of files
+        Decompress specific list of files
         
         Args:
-            files: List of file paths
+            files: List of .zst / .gz file paths
             
         Returns:
             dict: Overall statistics
         """
         start_time = time.time()
         
-        # Convert to Path objects and validate
-        file_paths = []
+        records = []
         for f in files:
             path = Path(f)
-            if path.exists() and path.is_file():
-                file_paths.append(path)
+            if path.is_file() and path.suffix.lower() in COMPRESSED_EXTENSIONS:
+                records.append(file_record(path))
             else:
-                logger.warning(f"File not found: {f}")
+                logger.warning(f"Not a compressed file: {f}")
         
-        if not file_paths:
-            logger.warning("No valid files to process")
+        return self._run_restore(records, start_time)
+    
+    def _run_restore(self, files: List[FileRecord], start_time: float) -> Dict[str, Any]:
+        """Decompress files on the process pool and build the report"""
+        self._reset_results()
+        
+        if not files:
+            logger.warning("No compressed files found")
             return self._generate_report(start_time)
         
-        # Prepare work items
-        work_items = [(fp, self.config, None) for fp in file_paths]
+        total_size = sum(record.size for record in files)
+        logger.info(f"Found {len(files)} compressed files ({total_size / 1024 / 1024 / 1024:.2f}GB total)")
         
-        # Process in parallel
-        self.results = []
-        self.errors = []
+        output_dir = Path(self.config.output_dir) if self.config.output_dir else None
+        if output_dir:
+            output_dir.mkdir(parents=True, exist_ok=True)
         
-        with ProcessPoolExecutor(max_workers=self.config.num_workers) as executor:
-            futures = {executor.submit(_compress_worker, item): item[0] for item in work_items}
-            
-            if TQDM_AVAILABLE:
-                pbar = tqdm(
-                    total=len(file_paths),
-                    desc="🗜️  Compressing",
-                    unit="file",
-                    ncols=100
-                )
-            
-            for future in as_completed(futures):
-                filepath = futures[future]
+        self._start_live(len(files), total_size)
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.config.num_workers,
+                initializer=report_worker,
+                initargs=(self._workers.queue,)
+            ) as executor:
+                futures = {}
+                for record in files:
+                    path = Path(record.path)
+                    # 'name.log.zst' -> 'name.log'
+                    output_path = (output_dir / path.stem) if output_dir else path.with_suffix('')
+                    item = (path, output_path, self.config, self._expected_for(path))
+                    futures[executor.submit(_decompress_worker, item)] = path
                 
-                try:
-                    result = future.result()
-                    self.results.append(result)
+                if TQDM_AVAILABLE:
+                    pbar = tqdm(
+                        total=len(files),
+                        desc="📦 Decompressing",
+                        unit="file",
+                        ncols=100,
+                        bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]'
+                    )
+                
+                for future in as_completed(futures):
+                    filepath = futures.pop(future)
                     
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'input_file': str(filepath), 'success': False, 'error': str(e)}
+                    
+                    self.results.append(result)
                     if not result['success']:
                         self.errors.append(result)
                         self._log_error(result)
                     
-                except Exception as e:
-                    error_result = {
-                        'input_file': str(filepath),
-                        'success': False,
-                        'error': str(e)
-                    }
-                    self.errors.append(error_result)
-                    self._log_error(error_result)
+                    self._track_result(result)
+                    if TQDM_AVAILABLE:
+                        pbar.update(1)
                 
                 if TQDM_AVAILABLE:
-                    pbar.update(1)
-            
-            if TQDM_AVAILABLE:
-                pbar.close()
-        
+                    pbar.close()
+        finally:
+            self._stop_live()
         return self._generate_report(start_time)
     
-    def _log_error(self, error_result: Dict[str, Any]):
-        """Log error to file"""
-        error_log_path = Path(self.config.error_log_file)
-        
-        with open(error_log_path, 'a', encoding='utf-8') as f:
-            timestamp = datetime.now().isoformat()
-            f.write(f"[{timestamp}] {error_result['input_file']}: {error_result.get('error', 'Unknown error')}\n")
+    def _track_result(self, result: Dict[str, Any]):
+        """Count one finished file (progress in compressed bytes)"""
+        live = self._live
+        live['files_done'] += 1
+        live['bytes_done'] += result.get('compressed_size', 0)
+        if result.get('success'):
+            live['bytes_out'] += result.get('decompressed_size', 0)
+        else:
+            live['files_failed'] += 1
     
     def _generate_report(self, start_time: float) -> Dict[str, Any]:
-        """Generate compression report"""
+        """Generate decompression report"""
         total_time = time.time() - start_time
         
         successful = [r for r in self.results if r.get('success')]
-        failed = [r for r in self.results if not r.get('success')]
-        
-        total_original = sum(r.get('original_size', 0) for r in successful)
         total_compressed = sum(r.get('compressed_size', 0) for r in successful)
+        total_decompressed = sum(r.get('decompressed_size', 0) for r in successful)
         
         report = {
             'timestamp': datetime.now().isoformat(),
             'summary': {
                 'total_files': len(self.results),
                 'successful': len(successful),
-                'failed': len(failed),
-                'total_original_size_bytes': total_original,
+                'failed': len(self.results) - len(successful),
+                'verified': sum(1 for r in self.results if r.get('checksum_verified')),
+                'unverified': sum(1 for r in successful if r.get('checksum_verified') is None),
                 'total_compressed_size_bytes': total_compressed,
-                'overall_compression_ratio': (1 - total_compressed / total_original) * 100 if total_original > 0 else 0,
+                'total_decompressed_size_bytes': total_decompressed,
                 'total_time_seconds': total_time,
-                'throughput_mbps': (total_original / 1024 / 1024) / total_time if total_time > 0 else 0,
-                'space_saved_bytes': total_original - total_compressed,
+                'throughput_mbps': (total_decompressed / 1024 / 1024) / total_time if total_time > 0 else 0,
                 'workers_used': self.config.num_workers
             },
-            'compression_engine': 'zstd' if ZSTD_AVAILABLE else 'gzip',
             'config': {
                 'chunk_size': self.config.chunk_size,
-                'compression_level': self.config.compression_level,
-                'verify_integrity': self.config.verify_integrity,
-                'delete_original': self.config.delete_original
+                'report_file': self.report_file,
+                'delete_compressed': self.config.delete_original
             },
             'results': self.results,
             'errors': self.errors
@@ -643,25 +2913,23 @@ class ParallelCompressor:
         
         print("\n")
         print("╔══════════════════════════════════════════════════════════════════╗")
-        print("║               🗜️  COMPRESSION COMPLETE                           ║")
+        print("║               📦 DECOMPRESSION COMPLETE                          ║")
         print("╚══════════════════════════════════════════════════════════════════╝")
         print()
         print(f"  📊 Files Processed:    {summary['total_files']}")
         print(f"     ✅ Successful:      {summary['successful']}")
         print(f"     ❌ Failed:          {summary['failed']}")
+        print(f"     🔒 Verified:        {summary['verified']}")
         print()
         print(f"  💾 Storage:")
-        print(f"     Original Size:      {summary['total_original_size_bytes'] / 1024 / 1024 / 1024:.2f} GB")
         print(f"     Compressed Size:    {summary['total_compressed_size_bytes'] / 1024 / 1024 / 1024:.2f} GB")
-        print(f"     Space Saved:        {summary['space_saved_bytes'] / 1024 / 1024 / 1024:.2f} GB ({summary['overall_compression_ratio']:.1f}%)")
+        print(f"     Restored Size:      {summary['total_decompressed_size_bytes'] / 1024 / 1024 / 1024:.2f} GB")
         print()
         print(f"  ⚡ Performance:")
         print(f"     Total Time:         {summary['total_time_seconds']:.2f}s")
         print(f"     Throughput:         {summary['throughput_mbps']:.2f} MB/s")
         print(f"     Workers Used:       {summary['workers_used']}")
         print()
-        print(f"  🔧 Engine:             {report['compression_engine']}")
-        print()
         
         if report['errors']:
             print(f"  ⚠️  Errors logged to:   {self.config.error_log_file}")
@@ -673,8 +2941,8 @@ class ParallelCompressor:
 # CLI INTERFACE
 # ============================================
 
-def parse_args():
-    """Parse command line arguments"""
+def parse_args(argv: Optional[List[str]] = None):
+    """Parse command line arguments ('compress' subcommand or the plain form)"""
     parser = argparse.ArgumentParser(
         description='High-Performance Parallel File Compressor',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -682,6 +2950,10 @@ def parse_args():
 Examples:
   # Compress all files > 10MB in directory
   python compressor.py /path/to/data
+  python compressor.py compress /path/to/data
+
+  # Restore (see: python compressor.py decompress --help)
+  python compressor.py decompress /path/to/data --report report.json
 
   # Custom settings
   python compressor.py /path/to/data --min-size 50 --workers 4 --level 5
@@ -691,6 +2963,9 @@ Examples:
 
   # Output to different directory
   python compressor.py /path/to/data --output-dir /path/to/compressed
+
+  # Millions of files: compress while scanning, results to JSONL
+  python compressor.py /path/to/data --stream --results-jsonl results.jsonl
         """
     )
     
@@ -764,6 +3039,178 @@ Examples:
         help='Error log file path (default: compression_errors.log)'
     )
     
+    parser.add_argument(
+        '--block-size',
+        type=int,
+        default=64,
+        help='Split oversized files into independently compressed blocks of this many MB (0 = never, default: 64)'
+    )
+    
+    parser.add_argument(
+        '--small-files',
+        action='store_true',
+        default=False,
+        help='Compress files below --min-size with a zstd dictionary trained on them'
+    )
+    
+    parser.add_argument(
+        '--manifest',
+        type=str,
+        default=None,
+        help='SQLite manifest for incremental runs: skip files unchanged since the last run'
+    )
+    
+    parser.add_argument(
+        '--probe',
+        action='store_true',
+        default=False,
+        help='Sample each file first: skip, store or pick a level by estimated compressibility'
+    )
+    
+    parser.add_argument(
+        '--target-mbps',
+        type=float,
+        default=None,
+        help='Adapt the level per file/block to reach this total throughput (MB/s)'
+    )
+    
+    parser.add_argument(
+        '--time-budget',
+        type=float,
+        default=None,
+        help='Adapt the level per file/block to finish within this many seconds'
+    )
+    
+    parser.add_argument(
+        '--seekable',
+        action='store_true',
+        default=False,
+        help='Write seekable zstd (independent frames + seek table) for random access'
+    )
+    
+    parser.add_argument(
+        '--frame-size',
+        type=int,
+        default=4096,
+        help='Uncompressed KB per frame in seekable mode (default: 4096)'
+    )
+    
+    parser.add_argument(
+        '--scan-threads',
+        type=int,
+        default=8,
+        help='Threads scanning directories in parallel (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        default=False,
+        help='Start compressing while the directory scan is still running'
+    )
+    
+    parser.add_argument(
+        '--results-jsonl',
+        type=str,
+        default=None,
+        help='Write per-file results to this JSONL file instead of keeping them in memory'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Serve live metrics on this local HTTP port (/metrics, /metrics.json)'
+    )
+    
+    parser.add_argument(
+        '--json-report',
+        type=str,
+        default=None,
+        help='Save detailed JSON report to file'
+    )
+    
+    return parser.parse_args(argv)
+
+
+def parse_decompress_args(argv: List[str]):
+    """Parse 'decompress' subcommand arguments"""
+    parser = argparse.ArgumentParser(
+        prog='compressor.py decompress',
+        description='Parallel decompression of .zst / .gz files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Restore next to the compressed files, verifying against the compression report
+  python compressor.py decompress /path/to/data --report report.json
+
+  # Restore into another directory
+  python compressor.py decompress /path/to/data --output-dir /path/to/restored
+        """
+    )
+    
+    parser.add_argument(
+        'directory',
+        type=str,
+        help='Directory containing .zst / .gz files'
+    )
+    
+    parser.add_argument(
+        '--report',
+        type=str,
+        default=None,
+        help='JSON report of the compression run (verifies checksums)'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=64,
+        help='Chunk size in KB for streaming (default: 64)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of worker processes (default: CPU count)'
+    )
+    
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default=None,
+        help='Output directory for restored files (default: next to the compressed files)'
+    )
+    
+    parser.add_argument(
+        '--dictionary',
+        type=str,
+        default=None,
+        help='zstd dictionary of --small-files archives (default: path in --report)'
+    )
+    
+    parser.add_argument(
+        '--delete-compressed',
+        action='store_true',
+        default=False,
+        help='Delete compressed files after successful restore (default: False)'
+    )
+    
+    parser.add_argument(
+        '--error-log',
+        type=str,
+        default='decompression_errors.log',
+        help='Error log file path (default: decompression_errors.log)'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Serve live metrics on this local HTTP port (/metrics, /metrics.json)'
+    )
+    
     parser.add_argument(
         '--json-report',
         type=str,
@@ -771,12 +3218,64 @@ Examples:
         help='Save detailed JSON report to file'
     )
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def decompress_main(argv: List[str]):
+    """'decompress' subcommand entry point"""
+    args = parse_decompress_args(argv)
+    
+    config = CompressionConfig(
+        chunk_size=args.chunk_size * 1024,  # Convert KB to bytes
+        num_workers=args.workers,
+        delete_original=args.delete_compressed,
+        output_dir=args.output_dir,
+        dictionary_file=args.dictionary,
+        error_log_file=args.error_log,
+        metrics_port=args.metrics_port
+    )
+    
+    print()
+    print("╔══════════════════════════════════════════════════════════════════╗")
+    print("║          📦 HIGH-PERFORMANCE PARALLEL DECOMPRESSOR               ║")
+    print("╚══════════════════════════════════════════════════════════════════╝")
+    print()
+    print(f"  📁 Target Directory:   {args.directory}")
+    print(f"  🧵 Workers:            {config.num_workers}")
+    print(f"  🔒 Verify Checksums:   {args.report or 'No (no --report)'}")
+    print(f"  🗑️  Delete Compressed: {'Yes ⚠️' if config.delete_original else 'No'}")
+    print()
+    print("═" * 70)
+    print()
+    
+    try:
+        decompressor = ParallelDecompressor(config, report_file=args.report)
+        report = decompressor.decompress_directory(args.directory)
+        
+        if args.json_report:
+            with open(args.json_report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n📄 Detailed report saved to: {args.json_report}")
+        
+        sys.exit(1 if report['summary']['failed'] > 0 else 0)
+        
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Decompression interrupted by user")
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
 
 
 def main():
     """Main entry point"""
-    args = parse_args()
+    argv = sys.argv[1:]
+    if argv and argv[0] == 'decompress':
+        decompress_main(argv[1:])
+        return
+    if argv and argv[0] == 'compress':
+        argv = argv[1:]
+    args = parse_args(argv)
     
     # Build configuration
     config = CompressionConfig(
@@ -788,7 +3287,18 @@ def main():
         verify_integrity=not args.no_verify,
         include_extensions=args.include_ext,
         output_dir=args.output_dir,
-        error_log_file=args.error_log
+        error_log_file=args.error_log,
+        metrics_port=args.metrics_port,
+        block_size=args.block_size * 1024 * 1024,  # Convert MB to bytes
+        scan_threads=args.scan_threads,
+        streaming=args.stream,
+        results_file=args.results_jsonl,
+        manifest_file=args.manifest,
+        probe=args.probe,
+        target_mbps=args.target_mbps,
+        time_budget_seconds=args.time_budget,
+        seekable=args.seekable,
+        seekable_frame_size=args.frame_size * 1024  # Convert KB to bytes
     )
     
     print()
@@ -812,7 +3322,10 @@ def main():
     compressor = ParallelCompressor(config)
     
     try:
-        report = compressor.compress_directory(args.directory)
+        if args.small_files:
+            report = compressor.compress_small_files(args.directory)
+        else:
+            report = compressor.compress_directory(args.directory)
         
         # Save JSON report if requested
         if args.json_report:
@@ -28,6 +28,7 @@ DEFAULT_ENCODING = 'utf-8'
 # Multiprocessing
 DEFAULT_NUM_WORKERS = None  # Auto-detect CPU count
 DEFAULT_CHUNKSIZE = 1  # Items per worker batch
+IN_FLIGHT_PER_WORKER = 4  # Chunks read ahead per worker (bounds parent memory)
 
 # Stop Words (Turkish + English)
 STOP_WORDS = {
@@ -80,13 +81,28 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 # PERFORMANCE THRESHOLDS
 # ============================================
 
-MAX_MEMORY_MB = 500  # Memory threshold for warning
+MAX_MEMORY_MB = 500  # Memory budget of the memory watchdog (parent + workers)
 PROGRESS_UPDATE_FREQ = 100  # Update progress every N chunks
 STAT_UPDATE_FREQ = 10  # Stats update frequency
 
+# Autotuning (worker count / chunk size calibration)
+AUTOTUNE_CACHE_FILE = Path(os.getenv(
+    'NEXAI_AUTOTUNE_CACHE',
+    Path.home() / '.cache' / 'nexai' / 'autotune.json'
+))
+AUTOTUNE_SAMPLE_BYTES = 4 * 1024 * 1024  # Input bytes per calibration run
+AUTOTUNE_MEMORY_FRACTION = 0.5  # Default budget: share of physical RAM
+
+# Corpus statistics sketches (fixed memory per worker, see sketches.py)
+SKETCH_CMS_WIDTH = 2 ** 16  # Count-Min counters per row (power of two)
+SKETCH_CMS_DEPTH = 4  # Count-Min rows
+SKETCH_HLL_PRECISION = 14  # HyperLogLog registers = 2 ** precision (~0.8% error)
+SKETCH_TOP_K = 100  # Heavy-hitter tokens tracked
+SKETCH_BUFFER_KEYS = 50_000  # Exact per-worker counts folded into the sketches when full
+
 # ============================================
 # OUTPUT FORMATS
 # ============================================
 
-OUTPUT_FORMATS = ['txt', 'json', 'csv']
+OUTPUT_FORMATS = ['txt', 'json', 'csv', 'records']
 DEFAULT_OUTPUT_FORMAT = 'txt'
@@ -0,0 +1,654 @@
+"""
+Multi-Node Coordinator / Worker Mode
+Hands out newline-aligned byte ranges over TCP to worker agents on many machines
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from .reader import FileReader, newline_aligned_ranges, split_line_chunks
+from .processor import _init_worker, _worker_reduce
+from .writer import open_compressed_sink, resolve_compressed_output
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9750
+DEFAULT_RANGE_SIZE = 16 * 1024 * 1024  # 16MB per range
+DEFAULT_MAX_AHEAD = 32  # Ranges handed out past the oldest uncommitted one
+
+# Wire format: !II header (json length, payload length) + JSON + payload
+_HEADER = struct.Struct('!II')
+
+
+# ============================================
+# WIRE PROTOCOL
+# ============================================
+
+def _send_msg(sock: socket.socket, message: Dict, payload: bytes = b''):
+    """Send one framed message"""
+    body = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(body), len(payload)) + body)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Receive exactly size bytes or raise ConnectionError"""
+    buf = bytearray()
+    while len(buf) < size:
+        part = sock.recv(min(size - len(buf), 1024 * 1024))
+        if not part:
+            raise ConnectionError("Connection closed by peer")
+        buf += part
+    return bytes(buf)
+
+
+def _recv_msg(sock: socket.socket) -> Tuple[Dict, bytes]:
+    """Receive one framed message"""
+    body_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    message = json.loads(_recv_exact(sock, body_len).decode('utf-8'))
+    payload = _recv_exact(sock, payload_len) if payload_len else b''
+    return message, payload
+
+
+# ============================================
+# COORDINATOR
+# ============================================
+
+class RangeCoordinator:
+    """
+    Coordinator for multi-node text reduction
+
+    - Splits the input into newline-aligned byte ranges
+    - Hands one range at a time to each connected agent
+    - Commits range outputs to the output file in input order
+    - Hands out at most max_ahead ranges past the oldest uncommitted one,
+      so a straggler cannot pull the rest of the output into memory
+    - Re-queues ranges held by agents that disconnect or time out
+
+    The protocol is unauthenticated: listen on localhost (the default)
+    unless the network between coordinator and agents is trusted.
+
+    Agents read ranges from a shared path (same mount on every host) or,
+    with ship_data=True, receive the range bytes over the socket.
+    """
+
+    def __init__(
+        self,
+        input_file: str,
+        output_file: str,
+        host: str = '127.0.0.1',
+        port: int = DEFAULT_PORT,
+        range_size: int = DEFAULT_RANGE_SIZE,
+        max_ahead: int = DEFAULT_MAX_AHEAD,
+        nlp_mode: str = 'basic',
+        custom_stop_words: Optional[Set[str]] = None,
+        max_lines_per_chunk: int = 50,
+        task_timeout: float = 600.0,
+        max_attempts: int = 3,
+        ship_data: bool = False,
+        compression_level: int = 3
+    ):
+        """
+        Initialize coordinator
+
+        Args:
+            input_file: Path to input file
+            output_file: Path to output file ('.zst' / '.gz' compress on the fly)
+            host: Interface to listen on ('0.0.0.0' exposes it to the network)
+            port: TCP port (0 = pick a free port)
+            range_size: Target bytes per range
+            max_ahead: Ranges dispatched past the oldest uncommitted one
+                       (bounds buffered out-of-order outputs)
+            nlp_mode: Text reduction mode for agents
+            custom_stop_words: Additional stop words for agents
+            max_lines_per_chunk: Lines per chunk inside agents
+            task_timeout: Seconds an agent may hold a range before it is re-queued
+            max_attempts: Attempts per range before the run fails
+            ship_data: Send range bytes to agents (no shared filesystem needed)
+            compression_level: Level for compressed output
+        """
+        self.input_file = Path(input_file)
+        self.output_file, self.output_codec = resolve_compressed_output(output_file)
+        self.host = host
+        self.port = port
+        self.max_ahead = max(1, max_ahead)
+        self.nlp_mode = nlp_mode
+        self.custom_stop_words = custom_stop_words
+        self.max_lines_per_chunk = max_lines_per_chunk
+        self.task_timeout = task_timeout
+        self.max_attempts = max_attempts
+        self.ship_data = ship_data
+        self.compression_level = compression_level
+
+        if not self.input_file.exists():
+            raise FileNotFoundError(f"Input file not found: {self.input_file}")
+
+        self.ranges = newline_aligned_ranges(str(self.input_file), range_size)
+
+        self._cond = threading.Condition()
+        self._pending = deque(range(len(self.ranges)))
+        self._attempts = [0] * len(self.ranges)
+        self._completed: Dict[int, bytes] = {}
+        self._next_commit = 0
+        self._failure: Optional[str] = None
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+        self._sink = None
+        self._start_time = 0.0
+
+        self.stats = {
+            'total_ranges': len(self.ranges),
+            'ranges_committed': 0,
+            'retries': 0,
+            'max_buffered_ranges': 0,
+            'total_chunks': 0,
+            'total_bytes_in': 0,
+            'total_bytes_out': 0,
+            'errors': 0,
+            'agents': {},
+            'processing_time': 0.0
+        }
+
+        logger.info(
+            f"Coordinator: {self.input_file} -> {self.output_file} "
+            f"({len(self.ranges)} ranges of ~{range_size / 1024 / 1024:.1f}MB)"
+        )
+
+    @property
+    def finished(self) -> bool:
+        """True once every range is committed or the run failed"""
+        return self._next_commit >= len(self.ranges) or self._failure is not None
+
+    def start(self) -> Tuple[str, int]:
+        """
+        Start listening for agents in a background thread
+
+        Returns:
+            tuple: (host, port) actually bound
+        """
+        self._start_time = time.time()
+        if self.output_codec:
+            self._sink = open_compressed_sink(
+                self.output_file, self.output_codec, self.compression_level
+            )
+        else:
+            self._sink = open(self.output_file, 'wb')
+
+        coordinator = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                coordinator.serve_agent(self.request, self.client_address)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+
+        threading.Thread(target=self._server.serve_forever, name='coordinator', daemon=True).start()
+        logger.info(f"Coordinator listening on {self.host}:{self.port}")
+
+        return self.host, self.port
+
+    def wait(self, timeout: Optional[float] = None) -> dict:
+        """
+        Block until all ranges are committed, then shut down
+
+        Args:
+            timeout: Maximum seconds to wait (None = forever)
+
+        Returns:
+            dict: Run statistics
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.finished, timeout=timeout)
+
+        self._shutdown()
+
+        if self._failure is not None:
+            raise RuntimeError(self._failure)
+        if self._next_commit < len(self.ranges):
+            raise TimeoutError(
+                f"Only {self._next_commit}/{len(self.ranges)} ranges committed before timeout"
+            )
+
+        self.stats['processing_time'] = time.time() - self._start_time
+        self._log_stats()
+        return self.stats
+
+    def run(self) -> dict:
+        """Start and wait for completion"""
+        self.start()
+        return self.wait()
+
+    def _shutdown(self):
+        """Stop the server and close the output"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    # ---------- per-agent connection ----------
+
+    def serve_agent(self, sock: socket.socket, address):
+        """
+        Serve one agent connection until it disconnects or the run ends
+
+        Called by the listener for every accepted connection; a range the
+        agent still holds when it goes away is re-queued.
+
+        Args:
+            sock: Connected agent socket
+            address: Agent address (name used until the agent says hello)
+        """
+        agent = f"{address[0]}:{address[1]}"
+        held: Optional[int] = None
+        sock.settimeout(self.task_timeout)
+
+        try:
+            hello, _ = _recv_msg(sock)
+            agent = hello.get('agent', agent)
+            logger.info(f"Agent connected: {agent} ({hello.get('workers', '?')} workers)")
+            _send_msg(sock, {
+                'type': 'config',
+                'input_file': str(self.input_file),
+                'nlp_mode': self.nlp_mode,
+                'custom_stop_words': sorted(self.custom_stop_words or []),
+                'max_lines_per_chunk': self.max_lines_per_chunk
+            })
+
+            while True:
+                message, payload = _recv_msg(sock)
+
+                if message['type'] == 'result':
+                    self._complete(agent, message, payload)
+                    held = None
+
+                range_id = self._next_range()
+                if range_id is None:
+                    if self.finished:
+                        _send_msg(sock, {'type': 'done'})
+                        return
+                    # Everything is assigned (or the window is full); wait in case a holder dies
+                    _send_msg(sock, {'type': 'wait', 'seconds': 1.0})
+                    continue
+
+                held = range_id
+                offset, length = self.ranges[range_id]
+                data = b''
+                if self.ship_data:
+                    with open(self.input_file, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read(length)
+                _send_msg(sock, {
+                    'type': 'task',
+                    'range_id': range_id,
+                    'offset': offset,
+                    'length': length
+                }, data)
+
+        except (ConnectionError, socket.timeout, OSError, ValueError) as e:
+            logger.warning(f"Agent {agent} lost: {e}")
+        finally:
+            if held is not None:
+                self._requeue(held, agent)
+
+    def _next_range(self) -> Optional[int]:
+        """Pop the next range to hand out (None = nothing within the window)"""
+        with self._cond:
+            while self._pending:
+                range_id = self._pending[0]
+                # Skip ranges completed by an earlier (slow) holder
+                if range_id < self._next_commit or range_id in self._completed:
+                    self._pending.popleft()
+                    continue
+                # Too far ahead of the commit point: wait for the oldest range
+                if range_id >= self._next_commit + self.max_ahead:
+                    return None
+                self._pending.popleft()
+                self._attempts[range_id] += 1
+                return range_id
+            return None
+
+    def _requeue(self, range_id: int, agent: str):
+        """Put a range held by a dead agent back at the front of the queue"""
+        with self._cond:
+            if range_id < self._next_commit or range_id in self._completed:
+                return
+            if self._attempts[range_id] >= self.max_attempts:
+                self._failure = f"Range {range_id} failed {self._attempts[range_id]} times"
+                logger.error(self._failure)
+                self._cond.notify_all()
+                return
+            self._pending.appendleft(range_id)
+            self.stats['retries'] += 1
+            logger.warning(f"Re-queued range {range_id} from {agent}")
+
+    def _complete(self, agent: str, message: Dict, payload: bytes):
+        """Record a range result and commit every contiguous completed range"""
+        range_id = message['range_id']
+
+        with self._cond:
+            if range_id < self._next_commit or range_id in self._completed:
+                return  # Duplicate from a re-queued range
+
+            self._completed[range_id] = payload
+            self.stats['max_buffered_ranges'] = max(
+                self.stats['max_buffered_ranges'], len(self._completed)
+            )
+            self.stats['total_chunks'] += message.get('chunks', 0)
+            self.stats['total_bytes_in'] += message.get('bytes_in', 0)
+            self.stats['total_bytes_out'] += message.get('bytes_out', 0)
+            self.stats['errors'] += message.get('errors', 0)
+            self.stats['agents'][agent] = self.stats['agents'].get(agent, 0) + 1
+
+            # Commit in input order
+            while self._next_commit in self._completed:
+                self._sink.write(self._completed.pop(self._next_commit))
+                self._next_commit += 1
+                self.stats['ranges_committed'] += 1
+
+            if self.finished:
+                self._cond.notify_all()
+
+    def _log_stats(self):
+        """Log final statistics"""
+        elapsed = max(self.stats['processing_time'], 1e-9)
+        logger.info(
+            f"Distributed run complete: {self.stats['ranges_committed']} ranges, "
+            f"{self.stats['total_chunks']} chunks, {self.stats['retries']} retries, "
+            f"{len(self.stats['agents'])} agents, {elapsed:.2f}s "
+            f"({self.input_file.stat().st_size / 1024 / 1024 / elapsed:.2f}MB/s)"
+        )
+
+
+# ============================================
+# WORKER AGENT
+# ============================================
+
+class WorkerAgent:
+    """
+    Worker agent for multi-node text reduction
+
+    Connects to a coordinator, keeps a pool of warm reducers (one per
+    local core) and reduces one byte range at a time. Chunk order inside
+    a range is preserved, so the committed output matches a local run.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = DEFAULT_PORT,
+        num_workers: Optional[int] = None,
+        name: Optional[str] = None,
+        input_file: Optional[str] = None,
+        connect_timeout: float = 30.0
+    ):
+        """
+        Initialize worker agent
+
+        Args:
+            host: Coordinator host
+            port: Coordinator port
+            num_workers: Local reducer processes (default: CPU count)
+            name: Agent name reported to the coordinator
+            input_file: Local path of the input if mounted elsewhere
+            connect_timeout: Seconds to keep retrying the initial connection
+        """
+        self.host = host
+        self.port = port
+        self.num_workers = num_workers or cpu_count()
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.input_file = input_file
+        self.connect_timeout = connect_timeout
+        self.stats = {
+            'ranges': 0, 'chunks': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0,
+            'disconnected': False
+        }
+
+    def _connect(self) -> socket.socket:
+        """Connect to the coordinator, retrying until connect_timeout"""
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection(
+                    (self.host, self.port), timeout=self.connect_timeout
+                )
+            except OSError:
+                if time.time() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def run(self) -> dict:
+        """
+        Process ranges until the coordinator reports completion
+
+        If the coordinator drops the connection (e.g. this agent held a
+        range past task_timeout, so the range went to another agent), the
+        agent stops and returns its statistics instead of raising.
+
+        Returns:
+            dict: Agent statistics
+        """
+        sock = self._connect()
+        sock.settimeout(None)
+
+        try:
+            _send_msg(sock, {'type': 'hello', 'agent': self.name, 'workers': self.num_workers})
+            config, _ = _recv_msg(sock)
+            reader = FileReader(self.input_file or config['input_file'])
+
+            with Pool(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(config['nlp_mode'], set(config['custom_stop_words']) or None)
+            ) as pool:
+                _send_msg(sock, {'type': 'request'})
+
+                while True:
+                    message, payload = _recv_msg(sock)
+
+                    if message['type'] == 'done':
+                        break
+                    if message['type'] == 'wait':
+                        time.sleep(message.get('seconds', 1.0))
+                        _send_msg(sock, {'type': 'request'})
+                        continue
+
+                    result, output = self._reduce_range(pool, reader, config, message, payload)
+                    _send_msg(sock, result, output)
+        except ConnectionError as e:
+            # Closed by the coordinator; whatever this agent held is re-queued there
+            logger.warning(f"Agent {self.name} disconnected by coordinator: {e}")
+            self.stats['disconnected'] = True
+        finally:
+            sock.close()
+
+        logger.info(f"Agent {self.name} finished: {self.stats['ranges']} ranges")
+        return self.stats
+
+    def _reduce_range(self, pool, reader: FileReader, config: Dict, task: Dict, payload: bytes):
+        """Reduce one range with the local pool"""
+        max_lines = config['max_lines_per_chunk']
+        if payload:
+            chunks = split_line_chunks(payload, max_lines)
+        else:
+            chunks = reader.read_range_lines(task['offset'], task['length'], max_lines)
+
+        parts = []
+        num_chunks = 0
+        errors = 0
+        # imap (ordered) keeps line order within the range
+        for record in pool.imap(_worker_reduce, chunks, chunksize=4):
+            num_chunks += 1
+            if record.error is not None:
+                errors += 1
+            if record.text:
+                parts.append(record.text)
+
+        output = ''.join(part + '\n' for part in parts).encode('utf-8')
+
+        self.stats['ranges'] += 1
+        self.stats['chunks'] += num_chunks
+        self.stats['bytes_in'] += task['length']
+        self.stats['bytes_out'] += len(output)
+        self.stats['errors'] += errors
+
+        return {
+            'type': 'result',
+            'range_id': task['range_id'],
+            'chunks': num_chunks,
+            'bytes_in': task['length'],
+            'bytes_out': len(output),
+            'errors': errors
+        }, output
+
+
+# ============================================
+# LOCAL CLUSTER
+# ============================================
+
+def _run_agent(host: str, port: int, num_workers: Optional[int], name: str):
+    """Process entry point for a local agent"""
+    WorkerAgent(host, port, num_workers=num_workers, name=name).run()
+
+
+def run_local_cluster(
+    input_file: str,
+    output_file: str,
+    num_agents: int = 2,
+    workers_per_agent: Optional[int] = None,
+    **coordinator_kwargs
+) -> dict:
+    """
+    Run coordinator and agents on this machine (testing / single-host use)
+
+    Args:
+        input_file: Path to input file
+        output_file: Path to output file
+        num_agents: Number of local agent processes
+        workers_per_agent: Reducer processes per agent
+        **coordinator_kwargs: Passed to RangeCoordinator
+
+    Returns:
+        dict: Coordinator statistics
+    """
+    coordinator_kwargs.setdefault('host', '127.0.0.1')
+    coordinator_kwargs.setdefault('port', 0)
+    coordinator = RangeCoordinator(input_file, output_file, **coordinator_kwargs)
+    host, port = coordinator.start()
+
+    workers = workers_per_agent or max(1, cpu_count() // num_agents)
+    agents = [
+        multiprocessing.Process(
+            target=_run_agent,
+            args=(host, port, workers, f"local-{i}"),
+            name=f"agent-{i}"
+        )
+        for i in range(num_agents)
+    ]
+    for agent in agents:
+        agent.start()
+
+    try:
+        return coordinator.wait()
+    finally:
+        for agent in agents:
+            agent.join(timeout=10)
+            if agent.is_alive():
+                agent.terminate()
+
+
+# ============================================
+# CLI INTERFACE
+# ============================================
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Multi-node text reduction')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    coord = sub.add_parser('coordinator', help='Serve ranges to agents')
+    coord.add_argument('input_file')
+    coord.add_argument('output_file')
+    coord.add_argument(
+        '--host', default='127.0.0.1',
+        help='Interface to listen on (default: 127.0.0.1; use 0.0.0.0 on a trusted network only)'
+    )
+    coord.add_argument('--port', type=int, default=DEFAULT_PORT)
+    coord.add_argument('--range-size', type=int, default=16, help='Range size in MB (default: 16)')
+    coord.add_argument(
+        '--max-ahead', type=int, default=DEFAULT_MAX_AHEAD,
+        help=f'Ranges dispatched past the oldest uncommitted one (default: {DEFAULT_MAX_AHEAD})'
+    )
+    coord.add_argument('--mode', default='basic', help='NLP mode (default: basic)')
+    coord.add_argument('--lines', type=int, default=50, help='Lines per chunk (default: 50)')
+    coord.add_argument('--ship-data', action='store_true', help='Send range bytes to agents')
+
+    agent = sub.add_parser('agent', help='Reduce ranges for a coordinator')
+    agent.add_argument('host')
+    agent.add_argument('--port', type=int, default=DEFAULT_PORT)
+    agent.add_argument('--workers', type=int, default=None)
+    agent.add_argument('--input-file', default=None, help='Local path of the shared input')
+
+    local = sub.add_parser('local', help='Coordinator + agents on this machine')
+    local.add_argument('input_file')
+    local.add_argument('output_file')
+    local.add_argument('--agents', type=int, default=2)
+    local.add_argument('--workers', type=int, default=None)
+    local.add_argument('--range-size', type=int, default=16, help='Range size in MB (default: 16)')
+    local.add_argument('--mode', default='basic', help='NLP mode (default: basic)')
+    local.add_argument('--lines', type=int, default=50, help='Lines per chunk (default: 50)')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == 'coordinator':
+        RangeCoordinator(
+            args.input_file,
+            args.output_file,
+            host=args.host,
+            port=args.port,
+            range_size=args.range_size * 1024 * 1024,
+            max_ahead=args.max_ahead,
+            nlp_mode=args.mode,
+            max_lines_per_chunk=args.lines,
+            ship_data=args.ship_data
+        ).run()
+    elif args.command == 'agent':
+        WorkerAgent(
+            args.host, args.port, num_workers=args.workers, input_file=args.input_file
+        ).run()
+    else:
+        run_local_cluster(
+            args.input_file,
+            args.output_file,
+            num_agents=args.agents,
+            workers_per_agent=args.workers,
+            range_size=args.range_size * 1024 * 1024,
+            nlp_mode=args.mode,
+            max_lines_per_chunk=args.lines
+        )
+
+
+if __name__ == '__main__':
+    main()
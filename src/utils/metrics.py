@@ -0,0 +1,495 @@
+"""
+Per-Stage Timing Instrumentation and Live Metrics
+Low-overhead stage timers shared by the reader, reducer, processor and writer,
+Prometheus text rendering and a local HTTP metrics endpoint
+
+Has no package-relative imports so the standalone compressor script can use it.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter_ns
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+METRIC_PREFIX = 'nexai'
+
+
+def process_rss_mb(pid: Optional[int] = None) -> float:
+    """
+    Current resident memory of a process in MB
+
+    Reads /proc/<pid>/statm; falls back to the peak RSS of this process
+    on platforms without procfs.
+
+    Args:
+        pid: Process id (default: current process)
+
+    Returns:
+        float: Resident set size in MB (0.0 if the process is gone)
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", 'rb') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        if pid not in (None, os.getpid()):
+            return 0.0
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+def process_cpu_seconds(pid: Optional[int] = None) -> float:
+    """
+    CPU time (user + system) consumed by a process
+
+    Args:
+        pid: Process id (default: current process)
+
+    Returns:
+        float: Seconds (0.0 if unknown or the process is gone)
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/stat", 'rb') as f:
+            # Fields after the parenthesised command name; utime/stime are 14/15
+            fields = f.read().rsplit(b')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        if pid not in (None, os.getpid()):
+            return 0.0
+        return time.process_time()
+
+
+class StageTimers:
+    """
+    Accumulates (calls, total ns, max ns) per named stage
+
+    Timing uses perf_counter_ns and plain list updates, so one measurement
+    costs a few hundred nanoseconds; stages are timed per chunk or per
+    buffer, never per line. Worker processes ship their timings to the
+    parent with drain(), where they are merged with add_many().
+
+    add() may be called from several threads as long as each stage name
+    is only updated by one of them; lap() keeps per-instance state and
+    belongs to a single thread.
+    """
+
+    def __init__(self):
+        """Initialize empty timers"""
+        self.stages: Dict[str, List[int]] = {}
+        self._last = 0
+
+    def add(self, stage: str, elapsed_ns: int, calls: int = 1):
+        """
+        Record time spent in a stage
+
+        Args:
+            stage: Stage name
+            elapsed_ns: Nanoseconds spent
+            calls: Number of calls the time covers
+        """
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [calls, elapsed_ns, elapsed_ns]
+            return
+        entry[0] += calls
+        entry[1] += elapsed_ns
+        if elapsed_ns > entry[2]:
+            entry[2] = elapsed_ns
+
+    def start(self):
+        """Start a lap sequence (see lap())"""
+        self._last = perf_counter_ns()
+
+    def lap(self, stage: str):
+        """Charge the time since the previous start()/lap() to a stage"""
+        now = perf_counter_ns()
+        self.add(stage, now - self._last)
+        self._last = now
+
+    def timed_iter(self, iterable: Iterable[T], stage: str) -> Iterator[T]:
+        """
+        Wrap an iterator, charging the time of each next() to a stage
+
+        For generators this is exactly the time spent producing items.
+
+        Args:
+            iterable: Source iterable
+            stage: Stage name
+
+        Yields:
+            Items of the source iterable
+        """
+        iterator = iter(iterable)
+        add = self.add
+        while True:
+            start = perf_counter_ns()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            add(stage, perf_counter_ns() - start)
+            yield item
+
+    def drain(self) -> Tuple[Tuple[str, int, int, int], ...]:
+        """
+        Return and reset the accumulated timings
+
+        Returns:
+            tuple: (stage, calls, total_ns, max_ns) per stage
+        """
+        drained = tuple((stage, *entry) for stage, entry in self.stages.items())
+        self.stages = {}
+        return drained
+
+    def add_many(self, timings: Iterable[Sequence[Union[str, int]]]):
+        """
+        Merge drained timings from another process
+
+        Args:
+            timings: (stage, calls, total_ns, max_ns) tuples
+        """
+        stages = self.stages
+        for stage, calls, total_ns, max_ns in timings:
+            entry = stages.get(stage)
+            if entry is None:
+                stages[stage] = [calls, total_ns, max_ns]
+                continue
+            entry[0] += calls
+            entry[1] += total_ns
+            if max_ns > entry[2]:
+                entry[2] = max_ns
+
+    def merge(self, other: 'StageTimers'):
+        """Merge another StageTimers instance"""
+        self.add_many((stage, *entry) for stage, entry in other.stages.items())
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """
+        Export timings
+
+        Shares are relative to the sum of all stages; worker stages are
+        summed across processes, so the total can exceed wall time.
+
+        Returns:
+            dict: {stage: {'calls', 'total_seconds', 'mean_ms', 'max_ms', 'share_percent'}}
+        """
+        grand_total = sum(entry[1] for entry in self.stages.values()) or 1
+        return {
+            stage: {
+                'calls': calls,
+                'total_seconds': total_ns / 1e9,
+                'mean_ms': total_ns / calls / 1e6 if calls else 0.0,
+                'max_ms': max_ns / 1e6,
+                'share_percent': total_ns / grand_total * 100
+            }
+            # list() snapshots the items; a metrics thread may call this mid-run
+            for stage, (calls, total_ns, max_ns) in sorted(
+                list(self.stages.items()), key=lambda item: -item[1][1]
+            )
+        }
+
+
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(
+    stages: Optional[Dict[str, Dict]] = None,
+    gauges: Optional[Dict[str, float]] = None,
+    labels: Optional[Dict[str, str]] = None,
+    prefix: str = METRIC_PREFIX,
+    workers: Optional[Dict[str, Dict[str, float]]] = None
+) -> str:
+    """
+    Render metrics in the Prometheus text exposition format
+
+    Args:
+        stages: StageTimers.to_dict() output
+        gauges: Extra metric name -> value (names are prefixed; None values skipped)
+        labels: Labels added to every sample (e.g. {'job': 'reduce'})
+        workers: Worker id -> {metric: value}, rendered as
+            '<prefix>_worker_<metric>{worker="<id>"}'
+
+    Returns:
+        str: Exposition text (ends with a newline)
+    """
+    base = ','.join(f'{key}="{_escape_label(str(value))}"' for key, value in (labels or {}).items())
+
+    def sample(name: str, value: float, label: Optional[Tuple[str, str]] = None) -> str:
+        label_parts = [base] if base else []
+        if label is not None:
+            label_parts.append(f'{label[0]}="{_escape_label(str(label[1]))}"')
+        label_text = '{' + ','.join(label_parts) + '}' if label_parts else ''
+        return f"{name}{label_text} {float(value)}"
+
+    lines = []
+    for name, value in (gauges or {}).items():
+        if value is None:
+            continue
+        metric = f"{prefix}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(sample(metric, value))
+
+    if workers:
+        names = sorted({name for values in workers.values() for name in values})
+        for name in names:
+            metric = f"{prefix}_worker_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for worker, values in workers.items():
+                if values.get(name) is not None:
+                    lines.append(sample(metric, values[name], ('worker', worker)))
+
+    if stages:
+        series = (
+            ('stage_seconds_total', 'counter', 'Time spent per pipeline stage',
+             lambda s: s['total_seconds']),
+            ('stage_calls_total', 'counter', 'Timed calls per pipeline stage',
+             lambda s: s['calls']),
+            ('stage_max_seconds', 'gauge', 'Slowest single call per pipeline stage',
+             lambda s: s['max_ms'] / 1000),
+        )
+        for suffix, kind, help_text, value_of in series:
+            metric = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for stage, stats in stages.items():
+                lines.append(sample(metric, value_of(stats), ('stage', stage)))
+
+    return '\n'.join(lines) + '\n'
+
+
+class WorkerRegistry:
+    """
+    Process ids reported by pool workers themselves
+
+    Pass `queue` to the pool initializer and call report_worker(queue) in
+    it; the parent reads the ids with pids() or by iterating, without
+    reaching into private pool attributes. Safe to use from the metrics
+    endpoint thread. Ids of workers that exited stay listed (not alive)
+    until reset().
+    """
+
+    def __init__(self):
+        """Initialize registry"""
+        self.queue = multiprocessing.SimpleQueue()
+        self._pids: List[int] = []
+        self._lock = threading.Lock()
+
+    def _drain(self):
+        queue = self.queue
+        while not queue.empty():
+            self._pids.append(queue.get())
+
+    def pids(self) -> List[int]:
+        """
+        Worker process ids reported so far
+
+        Returns:
+            list: Process ids in reporting order
+        """
+        with self._lock:
+            self._drain()
+            return list(self._pids)
+
+    def wait(self, count: int, timeout: float = 30.0) -> List[int]:
+        """
+        Block until `count` workers have reported (their initializer finished)
+
+        Args:
+            count: Number of workers to wait for
+            timeout: Seconds to wait at most
+
+        Returns:
+            list: Process ids reported so far (fewer than count on timeout)
+        """
+        deadline = time.monotonic() + timeout
+        pids = self.pids()
+        while len(pids) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+            pids = self.pids()
+        return pids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.pids())
+
+    def reset(self):
+        """Forget reported ids (before starting a new pool)"""
+        with self._lock:
+            self._drain()
+            self._pids = []
+
+
+def report_worker(queue) -> None:
+    """
+    Pool initializer: report this worker's pid to a WorkerRegistry
+
+    Args:
+        queue: WorkerRegistry.queue (None = not tracked)
+    """
+    if queue is not None:
+        queue.put(os.getpid())
+
+
+def worker_status(pids: Iterable[int]) -> Dict[str, Dict[str, float]]:
+    """
+    Liveness, memory and CPU time of worker processes (read from procfs)
+
+    Args:
+        pids: Worker process ids
+
+    Returns:
+        dict: {pid: {'alive', 'rss_mb', 'cpu_seconds'}}
+    """
+    status = {}
+    for pid in pids:
+        rss_mb = process_rss_mb(pid)
+        status[str(pid)] = {
+            'alive': 1 if rss_mb > 0 else 0,
+            'rss_mb': rss_mb,
+            'cpu_seconds': process_cpu_seconds(pid)
+        }
+    return status
+
+
+def progress_metrics(
+    bytes_done: int,
+    bytes_total: Optional[int],
+    elapsed_seconds: float
+) -> Dict[str, Optional[float]]:
+    """
+    Throughput, completion and ETA from byte counters
+
+    Args:
+        bytes_done: Input bytes processed so far
+        bytes_total: Total input bytes (None if unknown)
+        elapsed_seconds: Time since the run started
+
+    Returns:
+        dict: {'throughput_mbps', 'percent_done', 'eta_seconds'}
+    """
+    rate = bytes_done / elapsed_seconds if elapsed_seconds > 0 else 0.0
+    remaining = max(0, bytes_total - bytes_done) if bytes_total else None
+    return {
+        'throughput_mbps': rate / 1024 / 1024,
+        'percent_done': bytes_done / bytes_total * 100 if bytes_total else None,
+        'eta_seconds': remaining / rate if remaining is not None and rate > 0 else None
+    }
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving live run metrics
+
+    GET /metrics       Prometheus text format
+    GET /metrics.json  JSON snapshot (also served at /)
+
+    The snapshot callable runs on the server thread only when a client
+    scrapes, reading counters the pipeline maintains anyway, so the hot
+    loop never pays for monitoring. Numeric top-level snapshot values
+    become gauges; a 'workers' entry becomes per-worker series.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict],
+        port: int = 0,
+        host: str = '127.0.0.1',
+        job: str = METRIC_PREFIX
+    ):
+        """
+        Initialize metrics server (call start() to listen)
+
+        Args:
+            snapshot: Returns the current metrics dict
+            port: TCP port (0 = pick a free port, see .port)
+            host: Bind address (default: localhost only)
+            job: Value of the 'job' label
+        """
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self.job = job
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def render_json(self) -> bytes:
+        """Current snapshot as JSON"""
+        return json.dumps(self.snapshot(), default=str).encode('utf-8')
+
+    def render_prometheus(self) -> bytes:
+        """Current snapshot in Prometheus text format"""
+        snapshot = self.snapshot()
+        gauges = {
+            name: value for name, value in snapshot.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        return format_prometheus(
+            stages=snapshot.get('stages'),
+            gauges=gauges,
+            labels={'job': self.job},
+            workers=snapshot.get('workers')
+        ).encode('utf-8')
+
+    def start(self) -> 'MetricsServer':
+        """Start serving on a daemon thread"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                try:
+                    if path == '/metrics':
+                        body, content_type = server.render_prometheus(), 'text/plain; version=0.0.4'
+                    elif path in ('/', '/metrics.json'):
+                        body, content_type = server.render_json(), 'application/json'
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    logger.warning(f"Metrics snapshot failed: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the job log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics-server', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Live metrics: http://{self.host}:{self.port}/metrics (JSON: /metrics.json)")
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
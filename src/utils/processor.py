@@ -3,20 +3,93 @@ Multiprocessing Pipeline Orchestrator
 Manages parallel text reduction using worker processes
 """
 
+import json
 import logging
-from multiprocessing import Pool, cpu_count, Manager
+import os
+import shutil
+import time
+from array import array
+from functools import partial
+from multiprocessing import Barrier, Pool, cpu_count, Manager
+from multiprocessing.util import Finalize
+from threading import BrokenBarrierError
 from pathlib import Path
-from typing import Optional, Callable, Set
+from typing import Dict, NamedTuple, Optional, Callable, Sequence, Set, Tuple, Union
 import sys
 
 from tqdm import tqdm
 
+from .metrics import (
+    MetricsServer, StageTimers, WorkerRegistry, progress_metrics, report_worker, worker_status
+)
 from .reader import FileReader, read_file_lines
 from .reducer import TextReducer, reduce_text
-from .config import DEFAULT_NUM_WORKERS, DEFAULT_CHUNKSIZE, PROGRESS_UPDATE_FREQ
+from .sketches import CorpusSketch
+from .tokens import TokenStreamWriter, Vocabulary, VocabularySnapshot, encode_tokens
+from .tracing import DEFAULT_MAX_EVENTS, TraceRecorder, traced_call
+from .watchdog import InFlightGate, MemoryWatchdog
+from .fileops import concat_files
+from .writer import (
+    Analytics,
+    BackgroundWriter,
+    OutputWriter,
+    open_compressed_sink,
+    resolve_compressed_output
+)
+from .config import (
+    DEFAULT_NUM_WORKERS,
+    DEFAULT_CHUNKSIZE,
+    IN_FLIGHT_PER_WORKER,
+    MAX_MEMORY_MB,
+    PROGRESS_UPDATE_FREQ
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_LINES_PER_CHUNK = 50
+
+# Default of parameters autotuning may fill (explicit values always win)
+_UNSET = object()
+
+
+class ChunkResult(NamedTuple):
+    """
+    Compact per-chunk record returned by workers
+    
+    Pickles as a plain tuple, so the parent only pays for the reduced text
+    plus a few integers per chunk.
+    """
+    text: Optional[str]        # Reduced text (None if empty, failed or sharded)
+    bytes_in: int              # UTF-8 bytes of the input chunk
+    bytes_out: int             # UTF-8 bytes of the reduced text
+    reduce_time: float         # Seconds spent reducing in the worker
+    error: Optional[str] = None
+    shard: Optional[str] = None  # Shard file written (sharded mode)
+    tokens: Optional[bytes] = None  # uint32 LE token IDs (token output mode)
+    new_tokens: Tuple[str, ...] = ()  # Tokens behind provisional IDs
+    stages: Tuple[Tuple[str, int, int, int], ...] = ()  # Worker stage timings (StageTimers.drain)
+    trace: Optional[Tuple[int, int, int, int]] = None  # (seq, pid, start_ns, end_ns) if traced
+
+
+# Per-process reducer, created once by _init_worker (warm worker state)
+_WORKER_REDUCER: Optional[TextReducer] = None
+
+# Per-process shard output (worker-direct sharded mode)
+_WORKER_SHARD_DIR: Optional[str] = None
+_WORKER_SHARD_FD: Optional[int] = None
+
+# Per-process view of the growing vocabulary file (token output mode)
+_WORKER_VOCAB: Optional[VocabularySnapshot] = None
+
+# Per-process stage timers, drained into every ChunkResult (timing mode)
+_WORKER_TIMERS: Optional[StageTimers] = None
+
+# Per-process corpus sketch and the barrier that gives every worker exactly
+# one flush task at the end of a run (corpus statistics mode)
+_WORKER_SKETCH_BARRIER = None
+
+SKETCH_FLUSH_TIMEOUT = 120  # Seconds a worker waits for the others to flush
+
 
 class ParallelProcessor:
     """
@@ -26,6 +99,8 @@ class ParallelProcessor:
     - Distributes to worker pool (multiprocessing)
     - Collects results efficiently (imap_unordered)
     - Writes output in real-time
+    - Compresses output on the fly ('.zst' / '.gz' output files)
+    - Optionally lets each worker write its own output shard
     
     Memory: Bounded by chunk size, not file size!
     CPU: Uses all available cores
@@ -39,9 +114,29 @@ class ParallelProcessor:
         nlp_mode: str = 'basic',
         custom_stop_words: Optional[Set[str]] = None,
         chunk_size: int = 1024 * 50,
-        max_lines_per_chunk: Optional[int] = 50,
+        max_lines_per_chunk: Union[int, None, object] = _UNSET,
         use_lines: bool = True,
-        verbose: bool = True
+        verbose: bool = True,
+        compression_level: int = 3,
+        output_batch_bytes: int = 1024 * 1024,
+        max_pending_buffers: int = 2,
+        shard_output: bool = False,
+        merge_shards: bool = True,
+        autotune: bool = False,
+        memory_budget_mb: Optional[float] = None,
+        output_format: str = 'text',
+        vocab_file: Optional[str] = None,
+        stage_timings: bool = False,
+        metrics_file: Optional[str] = None,
+        trace_file: Optional[str] = None,
+        trace_sample_every: Optional[int] = None,
+        trace_max_events: int = DEFAULT_MAX_EVENTS,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = '127.0.0.1',
+        corpus_stats: bool = False,
+        sketch_options: Optional[Dict] = None,
+        memory_watchdog: bool = False,
+        max_in_flight: Optional[int] = None
     ):
         """
         Initialize parallel processor
@@ -53,36 +148,151 @@ class ParallelProcessor:
             nlp_mode: Text reduction mode ('basic', 'pos', 'aggressive')
             custom_stop_words: Additional stop words
             chunk_size: Bytes per chunk (if use_lines=False)
-            max_lines_per_chunk: Lines per chunk (if use_lines=True)
+            max_lines_per_chunk: Lines per chunk (if use_lines=True; default:
+                50, or the autotuned value)
             use_lines: Read by lines (True) or bytes (False)
             verbose: Show progress bar
+            compression_level: Level for compressed output (zstd: 1-22, gzip: 1-9)
+            output_batch_bytes: Bytes batched per hand-off to the writer thread
+            max_pending_buffers: Filled output buffers in flight to the writer thread
+            shard_output: Workers append to their own shard files and only send
+                small completion records back (parent no longer writes text)
+            merge_shards: Concatenate shards into output_file at the end; if False,
+                keep the shards and write a '<output>.manifest.json' instead
+            autotune: Pick num_workers / max_lines_per_chunk from a calibration
+                run on this input (cached per host and settings); only
+                values not passed explicitly are filled
+            memory_budget_mb: Memory budget for autotuning (default: half of RAM)
+                and for the memory watchdog (default: MAX_MEMORY_MB)
+            output_format: 'text' (reduced lines) or 'tokens' (uint32 token IDs,
+                one '<eos>' after each chunk, plus vocab and meta files)
+            vocab_file: Shared vocabulary for 'tokens' output (default:
+                '<output>.vocab'); new token IDs depend on chunk completion
+                order, so reuse the file for reproducible IDs
+            stage_timings: Time reading, reducer stages, result waits and
+                writing, aggregated across workers into stats['stages']
+            metrics_file: Save Analytics JSON here plus a Prometheus text file
+                next to it ('<name>.prom'); implies stage_timings
+            trace_file: Write a Chrome trace JSON (Perfetto) with per-chunk
+                read / queued / reduce / result_queue / write spans
+            trace_sample_every: Trace every N-th chunk (default: sized so
+                the run fits trace_max_events)
+            trace_max_events: Bound of the in-memory trace buffer
+            metrics_port: Serve live metrics over HTTP on this port while
+                processing (/metrics Prometheus text, /metrics.json JSON;
+                0 = any free port)
+            metrics_host: Bind address of the metrics endpoint
+            corpus_stats: Workers keep Count-Min / HyperLogLog / top-K sketches
+                of output tokens and removed stop-words; merged into
+                stats['corpus'] (and Analytics JSON) after the run
+            sketch_options: CorpusSketch arguments (cms_width, cms_depth,
+                hll_precision, top_k, buffer_keys); memory per worker is fixed
+            memory_watchdog: Sample parent + worker RSS during the run; near
+                the memory budget, shrink the in-flight window and chunk size,
+                then recycle bloated workers (actions in stats['watchdog'])
+            max_in_flight: Chunks read but not yet collected (default:
+                IN_FLIGHT_PER_WORKER per worker)
         """
         self.input_file = Path(input_file)
-        self.output_file = Path(output_file)
+        # Output codec is chosen by extension ('.zst', '.gz'); None = plain text
+        self.output_file, self.output_codec = resolve_compressed_output(output_file)
         self.num_workers = num_workers or cpu_count()
         self.nlp_mode = nlp_mode
         self.custom_stop_words = custom_stop_words
         self.chunk_size = chunk_size
-        self.max_lines_per_chunk = max_lines_per_chunk
+        lines_explicit = max_lines_per_chunk is not _UNSET
+        self.max_lines_per_chunk = max_lines_per_chunk if lines_explicit else DEFAULT_LINES_PER_CHUNK
         self.use_lines = use_lines
         self.verbose = verbose
+        self.compression_level = compression_level
+        self.output_batch_bytes = output_batch_bytes
+        self.max_pending_buffers = max_pending_buffers
+        self.shard_output = shard_output
+        self.merge_shards = merge_shards
+        self.shard_dir = self.output_file.with_name(self.output_file.name + '.shards')
+        self.shard_files: Set[str] = set()
         
         # Validation
         if not self.input_file.exists():
             raise FileNotFoundError(f"Input file not found: {self.input_file}")
         
+        if shard_output and not merge_shards and self.output_codec:
+            raise ValueError("Shard manifests hold plain text; use a merged or uncompressed output")
+        
+        self.output_format = output_format
+        self.vocab_file = vocab_file
+        self.vocab: Optional[Vocabulary] = None
+        if output_format not in ('text', 'tokens'):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        if output_format == 'tokens' and (shard_output or self.output_codec):
+            raise ValueError("Token output is written uncompressed by the parent (no shards)")
+        
+        # Autotuning (explicit num_workers / max_lines_per_chunk always win)
+        self.autotune_result = None
+        if autotune:
+            from .autotune import autotune as run_autotune
+            self.autotune_result = run_autotune(
+                str(self.input_file),
+                nlp_mode=nlp_mode,
+                custom_stop_words=custom_stop_words,
+                memory_budget_mb=memory_budget_mb
+            )
+            if num_workers is None:
+                self.num_workers = self.autotune_result['num_workers']
+            if use_lines and not lines_explicit:
+                self.max_lines_per_chunk = self.autotune_result['max_lines_per_chunk']
+        
         # Statistics
         self.stats = {
             'total_chunks': 0,
-            'total_chars_in': 0,
-            'total_chars_out': 0,
+            'total_bytes_in': 0,
+            'total_bytes_out': 0,
+            'reduction_percent': 0.0,
             'errors': 0,
-            'processing_time': 0.0
+            'processing_time': 0.0,
+            'throughput_mbps': 0.0,
+            'latency_ms': {},
+            'bytes_uncompressed': 0
         }
+        self._latencies = array('d')
+        self._error_samples = []
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.timers = StageTimers() if stage_timings or metrics_file else None
+        self.trace_file = trace_file
+        self.trace_sample_every = trace_sample_every
+        self.trace_max_events = trace_max_events
+        self.tracer: Optional[TraceRecorder] = None
+        
+        # Live metrics endpoint state (read by the server thread on scrape)
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.metrics_server: Optional[MetricsServer] = None
+        self._state = 'initialized'
+        self._start_time: Optional[float] = None
+        self._reader: Optional[FileReader] = None
+        self.workers = WorkerRegistry()
+        self._active_writer = None
+        
+        # Corpus statistics (merged worker sketches)
+        self.corpus_stats = corpus_stats
+        self.sketch_options = dict(sketch_options or {})
+        self.corpus_sketch: Optional[CorpusSketch] = None
+        
+        # In-flight window and memory watchdog
+        self.gate = InFlightGate(max_in_flight or self.num_workers * IN_FLIGHT_PER_WORKER)
+        self.watchdog: Optional[MemoryWatchdog] = None
+        if memory_watchdog:
+            self.watchdog = MemoryWatchdog(
+                memory_budget_mb or MAX_MEMORY_MB,
+                window=self.gate.limit,
+                chunk_units=(self.max_lines_per_chunk or 1) if use_lines else chunk_size,
+                min_chunk_units=1 if use_lines else min(chunk_size, 4096)
+            )
+        self._generations = 0
         
         logger.info(f"Initialized processor with {self.num_workers} workers")
         logger.info(f"Input: {self.input_file} ({self.input_file.stat().st_size / 1024 / 1024:.2f}MB)")
-        logger.info(f"Output: {self.output_file}")
+        logger.info(f"Output: {self.output_file} ({self.output_codec or 'plain'})")
         logger.info(f"Mode: {self.nlp_mode}")
     
     def process(self) -> dict:
@@ -92,8 +302,16 @@ class ParallelProcessor:
         Returns:
             dict: Processing statistics
         """
-        import time
         start_time = time.time()
+        self._start_time = start_time
+        self._state = 'running'
+        if self.metrics_port is not None:
+            self.metrics_server = MetricsServer(
+                self.live_metrics,
+                port=self.metrics_port,
+                host=self.metrics_host,
+                job='parallel_processor'
+            ).start()
         
         try:
             # Initialize reader
@@ -101,29 +319,83 @@ class ParallelProcessor:
                 self.input_file,
                 chunk_size=self.chunk_size
             )
+            self._reader = reader
             
-            # Clear output file
-            self.output_file.write_text('')
-            logger.info(f"Output file cleared: {self.output_file}")
+            # Output file is truncated when the writer opens it
+            if self.shard_output:
+                self._prepare_shard_dir()
             
             # Get chunks generator
             if self.use_lines:
                 chunks_generator = reader.read_lines(self.max_lines_per_chunk)
             else:
                 chunks_generator = reader.read_chunks()
+            if self.timers:
+                chunks_generator = self.timers.timed_iter(chunks_generator, 'read')
             
             # Process with worker pool
             self._process_with_pool(chunks_generator)
             
+            if self.shard_output:
+                self._finish_shards()
+            
             self.stats['processing_time'] = time.time() - start_time
+            self._finalize_stats()
             self._log_stats()
+            if self.metrics_file:
+                self._save_metrics()
+            if self.tracer:
+                self.stats['trace_file'] = str(self.tracer.save())
             
+            self._state = 'finished'
             return self.stats
             
         except Exception as e:
             logger.error(f"Processing failed: {e}")
             self.stats['errors'] += 1
+            self._state = 'failed'
             raise
+        
+        finally:
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+    
+    def live_metrics(self) -> Dict:
+        """
+        Snapshot of the running job (served by the metrics endpoint)
+        
+        Reads counters the collector maintains anyway; safe to call from
+        another thread.
+        
+        Returns:
+            dict: Progress, throughput, ETA, queue depths and worker status
+        """
+        stats = self.stats
+        elapsed = time.time() - self._start_time if self._start_time else 0.0
+        chunks_read = self._reader.chunks_read if self._reader else 0
+        writer = self._active_writer
+        
+        snapshot = {
+            'state': self._state,
+            'input_file': str(self.input_file),
+            'elapsed_seconds': elapsed,
+            'bytes_done': stats['total_bytes_in'],
+            'bytes_total': self.input_file.stat().st_size,
+            'bytes_out': stats['total_bytes_out'],
+            'chunks_read': chunks_read,
+            'chunks_done': stats['total_chunks'],
+            # Chunks handed to the pool but not collected yet
+            'chunks_in_flight': self.gate.in_flight,
+            'in_flight_limit': self.gate.limit,
+            'write_buffers_pending': writer.pending_buffers if writer is not None else 0,
+            'errors': stats['errors'],
+            'num_workers': self.num_workers,
+            'workers': worker_status(self.workers)
+        }
+        snapshot.update(progress_metrics(snapshot['bytes_done'], snapshot['bytes_total'], elapsed))
+        if self.timers:
+            snapshot['stages'] = self.timers.to_dict()
+        return snapshot
     
     def _process_with_pool(self, chunks_generator):
         """
@@ -134,38 +406,343 @@ class ParallelProcessor:
         """
         total_chunks_approx = self._estimate_chunks()
         
-        with Pool(self.num_workers) as pool:
-            # Use imap_unordered for non-blocking result collection
-            results = pool.imap_unordered(
-                _worker_reduce,
-                chunks_generator,
-                chunksize=DEFAULT_CHUNKSIZE
+        shard_dir = str(self.shard_dir) if self.shard_output else None
+        worker_fn = _worker_reduce_to_shard if self.shard_output else _worker_reduce
+        
+        if self.output_format == 'tokens':
+            self.vocab = Vocabulary(
+                self.vocab_file or str(self.output_file.with_name(self.output_file.name + '.vocab'))
+            )
+            # Workers load and follow this file
+            self.vocab.save()
+            worker_fn = _worker_reduce_to_tokens
+        
+        if self.trace_file:
+            self.tracer = TraceRecorder(
+                self.trace_file,
+                max_events=self.trace_max_events,
+                sample_every=self.trace_sample_every,
+                expected_chunks=total_chunks_approx
+            )
+            chunks_generator = self.tracer.trace_chunks(chunks_generator)
+            worker_fn = partial(traced_call, worker_fn)
+        
+        pool_results = self._generation_results(iter(chunks_generator), worker_fn, shard_dir)
+        results = pool_results
+        if self.timers:
+            # Time the parent spends blocked waiting for workers
+            results = self.timers.timed_iter(results, 'result_wait')
+        if self.tracer:
+            results = self.tracer.trace_results(results)
+        
+        pbar = tqdm(
+            results,
+            total=total_chunks_approx,
+            disable=not self.verbose,
+            desc='Processing',
+            unit='chunk'
+        ) if self.verbose else results
+        
+        try:
+            if self.shard_output:
+                # Workers wrote the text; only completion records arrive here
+                for record in pbar:
+                    self._update_stats(record)
+                    if record.shard:
+                        self.shard_files.add(record.shard)
+            elif self.output_format == 'tokens':
+                self._collect_tokens(pbar)
+            else:
+                # Write results as they arrive (real-time streaming)
+                self._collect(pbar)
+        finally:
+            # Shut the pool down now, also when collecting failed
+            pool_results.close()
+        
+        if self.corpus_sketch is not None:
+            self.stats['corpus'] = self.corpus_sketch.to_dict()
+            logger.info(
+                f"Corpus stats: {self.corpus_sketch.total_tokens} tokens, "
+                f"~{self.stats['corpus']['distinct_tokens_estimate']} distinct, "
+                f"{self.stats['corpus']['stop_words_removed_total']} stop-words removed"
+            )
+        if self.watchdog is not None:
+            self.stats['watchdog'] = dict(
+                self.watchdog.get_stats(),
+                pool_generations=self._generations
             )
+    
+    def _generation_results(self, source, worker_fn, shard_dir):
+        """
+        Run the chunk source through one or more worker pools
+        
+        Chunks enter the pool through the in-flight gate, so at most
+        gate.limit chunks are read but not collected. When the memory
+        watchdog asks for a recycle, the gate stops feeding, the current
+        pool drains and is replaced by fresh workers that continue with
+        the next chunk of the same source. If the consumer fails or closes
+        this generator, the gate is stopped first (the pool's feeder
+        thread may be waiting on it) and the pool is terminated.
+        
+        Args:
+            source: Chunk iterator (shared across pools)
+            worker_fn: Worker function
+            shard_dir: Shard directory (sharded mode)
             
-            # Write results as they arrive (real-time streaming)
-            with open(self.output_file, 'a', encoding='utf-8') as out_f:
-                pbar = tqdm(
-                    results,
-                    total=total_chunks_approx,
-                    disable=not self.verbose,
-                    desc='Processing',
-                    unit='chunk'
-                ) if self.verbose else results
+        Yields:
+            ChunkResult: Worker records of all pools
+        """
+        gate = self.gate
+        watchdog = self.watchdog
+        
+        while True:
+            self._generations += 1
+            self.workers.reset()
+            gate.reopen()
+            pool = Pool(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.nlp_mode, self.custom_stop_words, shard_dir,
+                    # Workers follow the vocab file the parent appends to
+                    str(self.vocab.vocab_file) if self.vocab is not None else None,
+                    self.timers is not None,
+                    self.sketch_options if self.corpus_stats else None,
+                    Barrier(self.num_workers) if self.corpus_stats else None,
+                    self.workers.queue
+                )
+            )
+            if watchdog is not None:
+                # Fresh workers, before any chunk: what recycling returns to
+                watchdog.record_baseline(self.workers.wait(self.num_workers))
+            completed = False
+            try:
+                # Use imap_unordered for non-blocking result collection
+                results = pool.imap_unordered(
+                    worker_fn,
+                    gate.feed(source),
+                    chunksize=DEFAULT_CHUNKSIZE
+                )
+                for record in results:
+                    yield record
+                    gate.release()
+                    if watchdog is not None:
+                        self._apply_watchdog(watchdog.on_result(self.workers))
                 
-                for chunk_result in pbar:
-                    if chunk_result:
-                        out_f.write(chunk_result + '\n')
-                        
-                        # Update statistics
-                        self.stats['total_chunks'] += 1
-                        
-                        if isinstance(chunk_result, dict):
-                            # Result with metadata
-                            self.stats['total_chars_in'] += chunk_result.get('chars_in', 0)
-                            self.stats['total_chars_out'] += chunk_result.get('chars_out', 0)
-                        else:
-                            # Simple string result
-                            self.stats['total_chars_out'] += len(chunk_result)
+                if self.corpus_stats:
+                    self._collect_sketches(pool)
+                completed = True
+            finally:
+                # A feeder blocked in the gate would hang terminate()
+                gate.stop()
+                if completed:
+                    # Let workers exit normally so their finalizers (shard files) run
+                    pool.close()
+                else:
+                    pool.terminate()
+                pool.join()
+            
+            if gate.exhausted:
+                return
+            logger.info(f"Started worker pool #{self._generations + 1}")
+    
+    def _apply_watchdog(self, actions):
+        """
+        Apply memory watchdog decisions to the gate and the reader
+        
+        Args:
+            actions: Actions returned by MemoryWatchdog.on_result
+        """
+        if not actions:
+            return
+        watchdog = self.watchdog
+        self.gate.set_limit(watchdog.window)
+        if self.use_lines:
+            self._reader.lines_per_chunk = watchdog.chunk_units
+        else:
+            self._reader.chunk_size = watchdog.chunk_units
+        if 'recycle_workers' in actions:
+            # Drain the current pool; _generation_results starts a new one
+            self.gate.stop()
+    
+    def _collect_sketches(self, pool):
+        """
+        Fetch every worker's corpus sketch and merge them into corpus_sketch
+        
+        Args:
+            pool: The (idle) worker pool
+        """
+        sketches = pool.map(_worker_flush_sketch, range(self.num_workers), chunksize=1)
+        if self.corpus_sketch is None:
+            self.corpus_sketch = CorpusSketch(**self.sketch_options)
+        for sketch in sketches:
+            if sketch is not None:
+                self.corpus_sketch.merge(sketch)
+    
+    def _collect(self, results):
+        """
+        Stream results into the output file
+        
+        Results are batched into ~output_batch_bytes buffers and handed to
+        the writer thread, which compresses (for '.zst' / '.gz' outputs) and
+        writes one buffer while the collector fills the next, so disk and
+        compression stalls never stop the pool from being drained.
+        
+        Args:
+            results: Iterable of worker results
+        """
+        writer = OutputWriter(
+            str(self.output_file),
+            format='txt',
+            buffer_size=self.output_batch_bytes,
+            async_write=True,
+            max_pending_buffers=self.max_pending_buffers,
+            append=False,
+            compression_level=self.compression_level,
+            timers=self.timers
+        )
+        self._active_writer = writer
+        
+        try:
+            for record in results:
+                self._update_stats(record)
+                if record.text:
+                    writer.write(record.text)
+        finally:
+            # Surfaces any background write error
+            writer.close()
+        
+        self.stats['bytes_uncompressed'] = writer.total_bytes_written
+    
+    def _collect_tokens(self, results):
+        """
+        Merge worker token streams into one uint32 stream
+        
+        Args:
+            results: Iterable of worker results
+        """
+        writer = TokenStreamWriter(
+            str(self.output_file),
+            self.vocab,
+            max_pending_buffers=self.max_pending_buffers,
+            buffer_size=self.output_batch_bytes
+        )
+        self._active_writer = writer
+        
+        try:
+            for record in results:
+                self._update_stats(record)
+                if record.tokens:
+                    writer.write(record.tokens, record.new_tokens)
+        finally:
+            self.stats['token_stream'] = writer.close()
+    
+    def _prepare_shard_dir(self):
+        """Create an empty shard directory"""
+        if self.shard_dir.exists():
+            shutil.rmtree(self.shard_dir)
+        self.shard_dir.mkdir(parents=True)
+        logger.info(f"Shard directory: {self.shard_dir}")
+    
+    def _finish_shards(self):
+        """Merge shards into the output file or write a shard manifest"""
+        shards = sorted(self.shard_files)
+        
+        if not self.merge_shards:
+            manifest = self.output_file.with_name(self.output_file.name + '.manifest.json')
+            with open(manifest, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'input_file': str(self.input_file),
+                    'shards': [
+                        {'path': shard, 'size_bytes': os.path.getsize(shard)}
+                        for shard in shards
+                    ]
+                }, f, indent=2)
+            logger.info(f"Wrote manifest of {len(shards)} shards: {manifest}")
+            return
+        
+        if self.output_codec:
+            # Compressed output: stream shards through the compressor
+            sink = open_compressed_sink(self.output_file, self.output_codec, self.compression_level)
+            with BackgroundWriter(sink, name='compress-output') as writer:
+                for shard in shards:
+                    with open(shard, 'rb') as f:
+                        for block in iter(lambda: f.read(self.output_batch_bytes), b''):
+                            writer.submit(block)
+            self.stats['bytes_uncompressed'] = writer.bytes_written
+        else:
+            concat_files(shards, str(self.output_file))
+        
+        shutil.rmtree(self.shard_dir)
+        logger.info(f"Merged {len(shards)} shards into {self.output_file}")
+    
+    def _update_stats(self, record: ChunkResult):
+        """Aggregate one worker record (O(1) per chunk)"""
+        stats = self.stats
+        stats['total_chunks'] += 1
+        stats['total_bytes_in'] += record.bytes_in
+        stats['total_bytes_out'] += record.bytes_out
+        self._latencies.append(record.reduce_time)
+        if record.stages:
+            self.timers.add_many(record.stages)
+        
+        if record.error is not None:
+            stats['errors'] += 1
+            if len(self._error_samples) < 10:
+                self._error_samples.append(record.error)
+                logger.warning(f"Chunk failed: {record.error}")
+    
+    def _finalize_stats(self):
+        """Derive reduction ratio, throughput and latency percentiles"""
+        stats = self.stats
+        
+        if stats['total_bytes_in'] > 0:
+            stats['reduction_percent'] = (
+                (stats['total_bytes_in'] - stats['total_bytes_out']) /
+                stats['total_bytes_in'] * 100
+            )
+        
+        if stats['processing_time'] > 0:
+            stats['throughput_mbps'] = stats['total_bytes_in'] / 1024 / 1024 / stats['processing_time']
+        
+        stats['latency_ms'] = {
+            name: value * 1000
+            for name, value in _percentiles(self._latencies, (50, 90, 99, 100)).items()
+        }
+        stats['error_samples'] = list(self._error_samples)
+        if self.timers:
+            stats['stages'] = self.timers.to_dict()
+    
+    def to_analytics(self, name: str = 'parallel_processor') -> Analytics:
+        """
+        Build an Analytics report from the last run
+        
+        Args:
+            name: Report name (Prometheus 'job' label)
+            
+        Returns:
+            Analytics: Finalized report including stage timings
+        """
+        analytics = Analytics(name)
+        analytics.update(
+            total_input_bytes=self.stats['total_bytes_in'],
+            total_output_bytes=self.stats['total_bytes_out'],
+            total_chunks=self.stats['total_chunks'],
+            errors=self.stats['errors']
+        )
+        analytics.finalize()
+        analytics.update(processing_time_seconds=self.stats['processing_time'])
+        if self.timers:
+            analytics.add_stage_timings(self.timers)
+        if self.corpus_sketch is not None:
+            analytics.add_corpus_stats(self.corpus_sketch)
+        return analytics
+    
+    def _save_metrics(self):
+        """Write Analytics JSON and Prometheus text files"""
+        analytics = self.to_analytics()
+        analytics.save_to_json(str(self.metrics_file))
+        analytics.save_to_prometheus(str(self.metrics_file.with_suffix('.prom')))
     
     def _estimate_chunks(self) -> int:
         """Estimate number of chunks for progress bar"""
@@ -178,13 +755,7 @@ class ParallelProcessor:
     
     def _log_stats(self):
         """Log final statistics"""
-        reduction_percent = 0.0
-        if self.stats['total_chars_in'] > 0:
-            reduction_percent = (
-                (self.stats['total_chars_in'] - self.stats['total_chars_out']) /
-                self.stats['total_chars_in'] * 100
-            )
-        
+        latency = self.stats['latency_ms']
         output_size = self.output_file.stat().st_size / 1024 / 1024 if self.output_file.exists() else 0
         
         logger.info(f"""
@@ -197,18 +768,94 @@ class ParallelProcessor:
   Errors: {self.stats['errors']}
   
 📈 Data Reduction:
-  Input size: {self.stats['total_chars_in'] / 1024 / 1024:.2f}MB
-  Output size: {output_size:.2f}MB
-  Reduction: {reduction_percent:.1f}%
+  Input size: {self.stats['total_bytes_in'] / 1024 / 1024:.2f}MB
+  Output size: {output_size:.2f}MB{f' ({self.output_codec})' if self.output_codec else ''}
+  Reduction: {self.stats['reduction_percent']:.1f}%
   
 ⏱️  Performance:
   Time: {self.stats['processing_time']:.2f}s
-  Throughput: {self.stats['total_chars_in'] / 1024 / 1024 / self.stats['processing_time']:.2f}MB/s
+  Throughput: {self.stats['throughput_mbps']:.2f}MB/s
+  Chunk latency: p50 {latency.get('p50', 0):.2f}ms / p90 {latency.get('p90', 0):.2f}ms / p99 {latency.get('p99', 0):.2f}ms
   Workers: {self.num_workers}
 """)
+        
+        if self.timers:
+            logger.info("Stage timings (worker stages summed across processes):\n" + '\n'.join(
+                f"  {stage:<14} {t['total_seconds']:8.2f}s  {t['share_percent']:5.1f}%  "
+                f"mean {t['mean_ms']:.3f}ms"
+                for stage, t in self.stats['stages'].items()
+            ))
+
+        if 'watchdog' in self.stats:
+            watchdog = self.stats['watchdog']
+            logger.info(
+                f"Memory watchdog: peak {watchdog['peak_rss_mb']:.0f}MB of "
+                f"{watchdog['budget_mb']:.0f}MB, actions {watchdog['actions'] or 'none'}, "
+                f"{watchdog['pool_generations']} worker pool(s)"
+            )
+
+
+def _percentiles(values: Sequence[float], points: Sequence[int]) -> Dict[str, float]:
+    """
+    Nearest-rank percentiles of a sequence
+    
+    Args:
+        values: Samples
+        points: Percentiles to compute (0-100)
+        
+    Returns:
+        dict: {'p50': ..., 'p100': ...}
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {f"p{p}": ordered[min(last, int(round(p / 100 * last)))] for p in points}
+
+
+def _init_worker(
+    nlp_mode: str = 'basic',
+    custom_stop_words: Optional[Set[str]] = None,
+    shard_dir: Optional[str] = None,
+    vocab_file: Optional[str] = None,
+    stage_timings: bool = False,
+    sketch_options: Optional[Dict] = None,
+    sketch_barrier=None,
+    pid_queue=None
+):
+    """
+    Pool initializer: build one reducer per worker process
+    
+    Loading stop words and spaCy models is expensive, so it happens once
+    per process instead of once per chunk.
+    
+    Args:
+        nlp_mode: Text reduction mode
+        custom_stop_words: Additional stop words
+        shard_dir: Directory for per-worker output shards (sharded mode)
+        vocab_file: Vocabulary file to follow (token output mode)
+        stage_timings: Collect per-stage timings and ship them with each result
+        sketch_options: Build a CorpusSketch with these arguments (None = off)
+        sketch_barrier: Barrier sized to the pool for _worker_flush_sketch
+        pid_queue: WorkerRegistry queue this worker reports its pid to
+    """
+    global _WORKER_REDUCER, _WORKER_SHARD_DIR, _WORKER_SHARD_FD, _WORKER_VOCAB, _WORKER_TIMERS
+    global _WORKER_SKETCH_BARRIER
+    _WORKER_TIMERS = StageTimers() if stage_timings else None
+    _WORKER_SKETCH_BARRIER = sketch_barrier
+    _WORKER_REDUCER = TextReducer(
+        nlp_mode,
+        custom_stop_words,
+        timers=_WORKER_TIMERS,
+        sketch=CorpusSketch(**sketch_options) if sketch_options is not None else None
+    )
+    _WORKER_SHARD_DIR = shard_dir
+    _WORKER_SHARD_FD = None
+    _WORKER_VOCAB = VocabularySnapshot(vocab_file) if vocab_file else None
+    report_worker(pid_queue)
 
 
-def _worker_reduce(chunk: str) -> Optional[str]:
+def _worker_reduce(chunk: str) -> ChunkResult:
     """
     Worker function for multiprocessing
     Runs in separate process (GIL is bypassed!)
@@ -217,20 +864,155 @@ def _worker_reduce(chunk: str) -> Optional[str]:
         chunk: Text chunk to reduce
         
     Returns:
-        str: Reduced text
+        ChunkResult: Reduced text plus size/timing/error record
     """
+    start = time.perf_counter()
+    bytes_in = len(chunk.encode('utf-8')) if chunk else 0
+    
     try:
         if not chunk or not chunk.strip():
-            return None
+            return ChunkResult(None, bytes_in, 0, time.perf_counter() - start)
+        
+        # Reduce density (warm reducer when initialized by the pool)
+        error = None
+        if _WORKER_REDUCER is not None:
+            errors_before = _WORKER_REDUCER.stats['errors']
+            reduced = _WORKER_REDUCER.reduce(chunk)
+            if _WORKER_REDUCER.stats['errors'] != errors_before:
+                error = 'TextReducer error (partially reduced text kept)'
+        else:
+            reduced = reduce_text(chunk, nlp_mode='basic')
         
-        # Reduce density
-        reduced = reduce_text(chunk, nlp_mode='basic')
+        stages = _WORKER_TIMERS.drain() if _WORKER_TIMERS else ()
+        if not reduced.strip():
+            return ChunkResult(None, bytes_in, 0, time.perf_counter() - start, error, stages=stages)
         
-        return reduced if reduced.strip() else None
+        return ChunkResult(
+            reduced,
+            bytes_in,
+            len(reduced.encode('utf-8')) + 1,  # + newline separator
+            time.perf_counter() - start,
+            error,
+            stages=stages
+        )
         
     except Exception as e:
         logger.error(f"Worker error: {e}")
+        # Don't let this chunk's partial timings leak into the next result
+        stages = _WORKER_TIMERS.drain() if _WORKER_TIMERS else ()
+        return ChunkResult(
+            None, bytes_in, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}",
+            stages=stages
+        )
+
+
+def _worker_flush_sketch(_task: int = 0) -> Optional[CorpusSketch]:
+    """
+    Hand this worker's corpus sketch to the parent and start a fresh one
+    
+    The barrier holds each worker until all of them took a flush task,
+    so no worker is skipped and none flushes twice.
+    
+    Returns:
+        CorpusSketch: Folded sketch (None if corpus statistics are off)
+    """
+    sketch = _WORKER_REDUCER.sketch if _WORKER_REDUCER is not None else None
+    if sketch is None:
         return None
+    sketch.fold()
+    _WORKER_REDUCER.sketch = sketch.empty_copy()
+    
+    if _WORKER_SKETCH_BARRIER is not None:
+        try:
+            _WORKER_SKETCH_BARRIER.wait(SKETCH_FLUSH_TIMEOUT)
+        except BrokenBarrierError:
+            logger.warning("Sketch flush barrier broken; corpus statistics may be incomplete")
+    return sketch
+
+
+def _worker_reduce_to_shard(chunk: str) -> ChunkResult:
+    """
+    Worker function for sharded output
+    
+    Appends the reduced text to this worker's own shard with a single
+    O_APPEND write, so nothing is lost if the pool is terminated, and
+    returns only the record without the text.
+    
+    Args:
+        chunk: Text chunk to reduce
+        
+    Returns:
+        ChunkResult: Record with text=None and the shard path
+    """
+    global _WORKER_SHARD_FD
+    
+    record = _worker_reduce(chunk)
+    if record.text is None:
+        return record
+    
+    shard = os.path.join(_WORKER_SHARD_DIR, f"part-{os.getpid()}.txt")
+    try:
+        if _WORKER_SHARD_FD is None:
+            _WORKER_SHARD_FD = os.open(shard, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            # Closed when the worker exits (pool.close() + join())
+            Finalize(None, _close_shard_fd, exitpriority=10)
+        
+        start = time.perf_counter_ns()
+        data = (record.text + '\n').encode('utf-8')
+        view = memoryview(data)
+        while view:
+            written = os.write(_WORKER_SHARD_FD, view)
+            view = view[written:]
+    except OSError as e:
+        return record._replace(text=None, bytes_out=0, error=f"Shard write failed: {e}")
+    
+    stages = record.stages
+    if _WORKER_TIMERS:
+        elapsed = time.perf_counter_ns() - start
+        stages += (('shard_write', 1, elapsed, elapsed),)
+    return record._replace(text=None, shard=shard, stages=stages)
+
+
+def _close_shard_fd():
+    """Close this worker's shard file"""
+    global _WORKER_SHARD_FD
+    if _WORKER_SHARD_FD is not None:
+        os.close(_WORKER_SHARD_FD)
+        _WORKER_SHARD_FD = None
+
+
+def _worker_reduce_to_tokens(chunk: str) -> ChunkResult:
+    """
+    Worker function for token output
+    
+    Encodes the reduced text against the worker's view of the vocabulary
+    file (refreshed every VOCAB_REFRESH_SECONDS); tokens the parent has not
+    assigned yet travel as provisional IDs and are merged by the parent.
+    
+    Args:
+        chunk: Text chunk to reduce
+        
+    Returns:
+        ChunkResult: Record with text=None and the token stream
+    """
+    record = _worker_reduce(chunk)
+    if record.text is None:
+        return record
+    
+    start = time.perf_counter_ns()
+    _WORKER_VOCAB.refresh()
+    token_bytes, new_tokens = encode_tokens(record.text, _WORKER_VOCAB.ids)
+    stages = record.stages
+    if _WORKER_TIMERS:
+        elapsed = time.perf_counter_ns() - start
+        stages += (('token_encode', 1, elapsed, elapsed),)
+    return record._replace(
+        text=None,
+        bytes_out=len(token_bytes),
+        tokens=token_bytes,
+        new_tokens=new_tokens,
+        stages=stages
+    )
 
 
 # ============================================
@@ -244,8 +1026,17 @@ def reduce_file(
     nlp_mode: str = 'basic',
     custom_stop_words: Optional[Set[str]] = None,
     use_lines: bool = True,
-    max_lines_per_chunk: int = 50,
-    verbose: bool = True
+    max_lines_per_chunk: Union[int, None, object] = _UNSET,
+    verbose: bool = True,
+    compression_level: int = 3,
+    shard_output: bool = False,
+    merge_shards: bool = True,
+    autotune: bool = False,
+    output_format: str = 'text',
+    vocab_file: Optional[str] = None,
+    metrics_file: Optional[str] = None,
+    trace_file: Optional[str] = None,
+    metrics_port: Optional[int] = None
 ) -> dict:
     """
     Reduce text density in a file
@@ -257,8 +1048,18 @@ def reduce_file(
         nlp_mode: Processing mode
         custom_stop_words: Additional stop words
         use_lines: Read by lines (True) or bytes (False)
-        max_lines_per_chunk: Lines per chunk
+        max_lines_per_chunk: Lines per chunk (default: 50, or the autotuned value)
         verbose: Show progress
+        compression_level: Level used when output_file ends in '.zst' or '.gz'
+        shard_output: Workers write their own output shards
+        merge_shards: Concatenate shards (True) or keep them with a manifest (False)
+        autotune: Calibrate worker count and chunk size on this input first
+        output_format: 'text' or 'tokens' (uint32 token IDs + vocabulary)
+        vocab_file: Shared vocabulary file for 'tokens' output
+        metrics_file: Save Analytics JSON (with stage timings) and a
+            Prometheus '.prom' file
+        trace_file: Write a Chrome trace JSON of the run (open in Perfetto)
+        metrics_port: Serve live metrics on this local HTTP port while running
         
     Returns:
         dict: Processing statistics
@@ -271,7 +1072,16 @@ def reduce_file(
         custom_stop_words=custom_stop_words,
         max_lines_per_chunk=max_lines_per_chunk,
         use_lines=use_lines,
-        verbose=verbose
+        verbose=verbose,
+        compression_level=compression_level,
+        shard_output=shard_output,
+        merge_shards=merge_shards,
+        autotune=autotune,
+        output_format=output_format,
+        vocab_file=vocab_file,
+        metrics_file=metrics_file,
+        trace_file=trace_file,
+        metrics_port=metrics_port
     )
     
     return processor.process()
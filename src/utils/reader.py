@@ -3,11 +3,16 @@ Memory-Safe Generator-Based File Reader
 Reads large files in chunks without loading everything to RAM
 """
 
+import mmap
 import os
+import struct
+import sys
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Generator, Iterator, List, Optional, Tuple, Union
 import logging
 
+from .writer import INDEX_MAGIC, INDEX_SUFFIX, RECORDS_MAGIC
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +43,7 @@ class FileReader:
         self.chunk_size = chunk_size
         self.encoding = encoding
         self.skip_empty = skip_empty
+        self.lines_per_chunk: Optional[int] = None  # Current read_lines() group size
         self.total_bytes = 0
         self.chunks_read = 0
         
@@ -87,7 +93,8 @@ class FileReader:
         Generator: Read file line by line (or grouped lines)
         
         Args:
-            max_lines_per_chunk: Group lines into chunks of this size
+            max_lines_per_chunk: Group lines into chunks of this size; the
+                group size can be changed mid-stream via `lines_per_chunk`
             
         Yields:
             str: Line(s)
@@ -107,6 +114,7 @@ class FileReader:
                         yield line
                 else:
                     # Group lines into chunks
+                    self.lines_per_chunk = max_lines_per_chunk
                     chunk_lines = []
                     for line in f:
                         line = line.rstrip('\n')
@@ -115,7 +123,7 @@ class FileReader:
                         
                         chunk_lines.append(line)
                         
-                        if len(chunk_lines) >= max_lines_per_chunk:
+                        if len(chunk_lines) >= self.lines_per_chunk:
                             chunk = '\n'.join(chunk_lines)
                             self.total_bytes += len(chunk.encode(self.encoding))
                             self.chunks_read += 1
@@ -135,6 +143,32 @@ class FileReader:
             logger.error(f"Error reading lines: {e}")
             raise
     
+    def read_range_lines(
+        self,
+        offset: int,
+        length: int,
+        max_lines_per_chunk: Optional[int] = None
+    ) -> Generator[str, None, None]:
+        """
+        Generator: Read grouped lines from a newline-aligned byte range
+        
+        Args:
+            offset: Start byte (must be at a line start)
+            length: Number of bytes in the range
+            max_lines_per_chunk: Group lines into chunks of this size
+            
+        Yields:
+            str: Line(s)
+        """
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        
+        self.total_bytes += len(data)
+        for chunk in split_line_chunks(data, max_lines_per_chunk, self.encoding, self.skip_empty):
+            self.chunks_read += 1
+            yield chunk
+    
     def get_stats(self) -> dict:
         """
         Get reading statistics
@@ -166,6 +200,113 @@ class FileReader:
         return f"{bytes_value:.2f}TB"
 
 
+class RecordReader:
+    """
+    Memory-mapped random-access reader for the 'records' output format
+    
+    Written by OutputWriter(format='records'): a data file of length-prefixed
+    records plus a '<data>.idx' file of fixed-width uint64 offsets.
+    
+    - record[i] is O(1): one index lookup, one length read
+    - Records are returned as memoryviews into the mapping (zero-copy);
+      slices return lists of memoryviews
+    - Release returned views before close()
+    """
+    
+    def __init__(self, filepath: str, index_file: Optional[str] = None):
+        """
+        Open a records file
+        
+        Args:
+            filepath: Path to the data file
+            index_file: Path to the index (default: '<filepath>.idx')
+        """
+        self.filepath = Path(filepath)
+        self.index_file = Path(index_file) if index_file else self.filepath.with_name(self.filepath.name + INDEX_SUFFIX)
+        
+        self._data_fh = open(self.filepath, 'rb')
+        self._index_fh = open(self.index_file, 'rb')
+        self._data = self._map(self._data_fh)
+        self._index = self._map(self._index_fh)
+        
+        if self._data[:len(RECORDS_MAGIC)] != RECORDS_MAGIC:
+            raise ValueError(f"Not a records file: {self.filepath}")
+        if self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"Not a records index: {self.index_file}")
+        
+        self._data_view = memoryview(self._data)
+        self._offsets = memoryview(self._index)[len(INDEX_MAGIC):].cast('Q')
+        self._swap = sys.byteorder != 'little'
+        
+        logger.info(f"Opened records: {self.filepath.name} ({len(self)} records)")
+    
+    @staticmethod
+    def _map(fh) -> Union[mmap.mmap, bytes]:
+        """Map a file read-only (tiny files cannot be mapped as empty)"""
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return b''
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def __len__(self) -> int:
+        return len(self._offsets)
+    
+    def _offset(self, i: int) -> int:
+        offset = self._offsets[i]
+        if self._swap:
+            offset = int.from_bytes(offset.to_bytes(8, 'big'), 'little')
+        return offset
+    
+    def record(self, i: int) -> memoryview:
+        """
+        Get one record without copying
+        
+        Args:
+            i: Record number (negative counts from the end)
+            
+        Returns:
+            memoryview: UTF-8 bytes of the record
+        """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Record {i} out of range")
+        
+        offset = self._offset(i)
+        (length,) = struct.unpack_from('<I', self._data, offset)
+        start = offset + 4
+        return self._data_view[start:start + length]
+    
+    def __getitem__(self, key: Union[int, slice]) -> Union[memoryview, List[memoryview]]:
+        if isinstance(key, slice):
+            return [self.record(i) for i in range(*key.indices(len(self)))]
+        return self.record(key)
+    
+    def __iter__(self) -> Iterator[memoryview]:
+        for i in range(len(self)):
+            yield self.record(i)
+    
+    def text(self, i: int) -> str:
+        """Get one record decoded as text"""
+        return str(self.record(i), 'utf-8')
+    
+    def close(self):
+        """Unmap and close files (all returned views must be released)"""
+        self._offsets.release()
+        self._data_view.release()
+        for mapping in (self._data, self._index):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+        self._data_fh.close()
+        self._index_fh.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 # ============================================
 # UTILITY FUNCTIONS
 # ============================================
@@ -188,6 +329,65 @@ def read_file_chunks(
     yield from reader.read_chunks()
 
 
+def split_line_chunks(
+    data: bytes,
+    max_lines_per_chunk: Optional[int] = None,
+    encoding: str = 'utf-8',
+    skip_empty: bool = True
+) -> Generator[str, None, None]:
+    """
+    Split an in-memory block of lines into grouped-line chunks
+    
+    Args:
+        data: Raw bytes holding whole lines
+        max_lines_per_chunk: Group lines into chunks of this size
+        encoding: Text encoding
+        skip_empty: Drop blank lines
+        
+    Yields:
+        str: Line(s)
+    """
+    lines = data.decode(encoding, errors='replace').split('\n')
+    if skip_empty:
+        lines = [line for line in lines if line.strip()]
+    
+    group = max_lines_per_chunk or 1
+    for i in range(0, len(lines), group):
+        yield '\n'.join(lines[i:i + group])
+
+
+def newline_aligned_ranges(filepath: str, range_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a file into byte ranges that start and end on line boundaries
+    
+    Each range is roughly range_size bytes; its end is extended to the next
+    newline so no line is split between two ranges.
+    
+    Args:
+        filepath: Path to file
+        range_size: Target bytes per range
+        
+    Returns:
+        List[Tuple[int, int]]: (offset, length) pairs covering the whole file
+    """
+    file_size = os.path.getsize(filepath)
+    ranges = []
+    offset = 0
+    
+    with open(filepath, 'rb') as f:
+        while offset < file_size:
+            end = min(offset + range_size, file_size)
+            if end < file_size:
+                f.seek(end)
+                # Extend to the end of the current line
+                tail = f.readline()
+                end += len(tail)
+            ranges.append((offset, end - offset))
+            offset = end
+    
+    return ranges
+
+
 def read_file_lines(
     filepath: str,
     max_lines_per_chunk: Optional[int] = None
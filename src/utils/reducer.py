@@ -26,6 +26,8 @@ except ImportError:
     logging.warning("spaCy not installed. POS tagging disabled.")
 
 from .config import PATTERNS, STOP_WORDS, DEFAULT_NLP_MODE
+from .metrics import StageTimers
+from .sketches import CorpusSketch
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +47,9 @@ class TextReducer:
         self,
         nlp_mode: str = DEFAULT_NLP_MODE,
         custom_stop_words: Optional[Set[str]] = None,
-        preserve_case: bool = False
+        preserve_case: bool = False,
+        timers: Optional[StageTimers] = None,
+        sketch: Optional[CorpusSketch] = None
     ):
         """
         Initialize text reducer
@@ -54,9 +58,13 @@ class TextReducer:
             nlp_mode: 'basic', 'pos', 'aggressive' (default 'basic')
             custom_stop_words: Additional stop words to filter
             preserve_case: Keep original case (default False - lowercase)
+            timers: Per-stage timers (clean/tokenize/stopwords/pos_tag/final_cleanup)
+            sketch: Corpus statistics of output tokens and removed stop-words
         """
         self.nlp_mode = nlp_mode
         self.preserve_case = preserve_case
+        self.timers = timers
+        self.sketch = sketch
         
         # Combine stop words
         self.stop_words = set(STOP_WORDS)
@@ -119,11 +127,16 @@ class TextReducer:
         Returns:
             str: Reduced text
         """
+        timers = self.timers
         try:
             original_length = len(text)
+            if timers:
+                timers.start()
             
             # STEP 1: Cleaning
             text = self._clean_text(text)
+            if timers:
+                timers.lap('clean')
             
             # STEP 2: Stop-word filtering
             if self.nlp_mode in ['basic', 'pos', 'aggressive']:
@@ -132,9 +145,18 @@ class TextReducer:
             # STEP 3: POS tagging (if enabled and available)
             if self.nlp_mode in ['pos', 'aggressive'] and self.nlp:
                 text = self._pos_tagging(text)
+                if timers:
+                    timers.lap('pos_tag')
             
             # STEP 4: Final cleanup
             text = self._final_cleanup(text)
+            if timers:
+                timers.lap('final_cleanup')
+            
+            if self.sketch is not None:
+                self.sketch.add_tokens(text.split())
+                if timers:
+                    timers.lap('sketch')
             
             # Update statistics
             self.stats['chunks_processed'] += 1
@@ -193,6 +215,8 @@ class TextReducer:
             else:
                 # Fallback: simple split
                 tokens = text.split()
+            if self.timers:
+                self.timers.lap('tokenize')
             
             # Filter stop words
             filtered = [
@@ -201,7 +225,13 @@ class TextReducer:
                 and len(token) > 1  # Remove single chars
             ]
             
-            return ' '.join(filtered)
+            if self.sketch is not None:
+                self.sketch.add_stop_words(tokens, self.stop_words)
+            
+            result = ' '.join(filtered)
+            if self.timers:
+                self.timers.lap('stopwords')
+            return result
             
         except Exception as e:
             logger.warning(f"Stop-word filtering error: {e}")
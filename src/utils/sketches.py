@@ -0,0 +1,342 @@
+"""
+Mergeable Corpus Statistics Sketches
+Count-Min, HyperLogLog and top-K token statistics in fixed memory
+"""
+
+import hashlib
+import logging
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import (
+    SKETCH_CMS_WIDTH,
+    SKETCH_CMS_DEPTH,
+    SKETCH_HLL_PRECISION,
+    SKETCH_TOP_K,
+    SKETCH_BUFFER_KEYS
+)
+
+# Fast hash (optional, falls back to blake2b); must be identical in every process
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_MASK64 = (1 << 64) - 1
+
+
+def hash64(token: str) -> int:
+    """Process-independent 64-bit token hash (unlike the salted built-in hash())"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh64_intdigest(token.encode('utf-8'))
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch: frequency estimates that never undercount
+
+    Memory is width * depth 64-bit counters. Row indices come from one
+    64-bit hash via double hashing. Sketches of equal shape merge by
+    adding counters.
+    """
+
+    def __init__(self, width: int = SKETCH_CMS_WIDTH, depth: int = SKETCH_CMS_DEPTH):
+        """
+        Initialize sketch
+
+        Args:
+            width: Counters per row (rounded up to a power of two)
+            depth: Number of rows
+        """
+        self.width = 1 << max(1, (width - 1).bit_length())
+        self.depth = depth
+        self.counts = array('Q', bytes(8 * self.width * depth))
+
+    def _indices(self, h: int) -> List[int]:
+        """Counter positions of a hash, one per row"""
+        mask = self.width - 1
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        return [row * self.width + ((h1 + row * h2) & mask) for row in range(self.depth)]
+
+    def add(self, h: int, count: int = 1) -> int:
+        """
+        Add a count for a hashed token
+
+        Args:
+            h: hash64() of the token
+            count: Occurrences to add
+
+        Returns:
+            int: New frequency estimate
+        """
+        counts = self.counts
+        estimate = None
+        for i in self._indices(h):
+            value = counts[i] + count
+            counts[i] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def query(self, h: int) -> int:
+        """Frequency estimate of a hashed token"""
+        counts = self.counts
+        return min(counts[i] for i in self._indices(h))
+
+    def merge(self, other: 'CountMinSketch'):
+        """Add another sketch of the same shape"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Count-Min sketches must have the same width and depth")
+        self.counts = array('Q', map(int.__add__, self.counts, other.counts))
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the counter table"""
+        return self.counts.itemsize * len(self.counts)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter
+
+    2 ** precision one-byte registers; relative error ~1.04 / sqrt(2 ** precision).
+    Sketches of equal precision merge by taking register maxima.
+    """
+
+    def __init__(self, precision: int = SKETCH_HLL_PRECISION):
+        """
+        Initialize counter
+
+        Args:
+            precision: Index bits (4-18)
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h: int):
+        """Add a hashed token"""
+        p = self.precision
+        index = h >> (64 - p)
+        rest = (h << p) & _MASK64
+        rank = 64 - p + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """Estimated number of distinct tokens"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: 'HyperLogLog'):
+        """Merge another counter of the same precision"""
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog counters must have the same precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the registers"""
+        return len(self.registers)
+
+
+class CorpusSketch:
+    """
+    Per-worker corpus statistics in fixed memory
+
+    - Token frequencies: Count-Min sketch
+    - Distinct tokens: HyperLogLog
+    - Top tokens: up to 2 * top_k heavy-hitter candidates, ranked by
+      Count-Min estimates
+    - Removed stop-words: exact counts (bounded by the stop-word list)
+
+    Tokens are first counted exactly in a buffer of at most buffer_keys
+    entries and folded into the sketches when it fills (and before
+    merging), so repeated tokens cost one C-level Counter update instead
+    of a sketch update each. Sketches from different workers merge into
+    the same result regardless of how the input was split, except for
+    top-K candidates, which are approximate by nature.
+    """
+
+    def __init__(
+        self,
+        cms_width: int = SKETCH_CMS_WIDTH,
+        cms_depth: int = SKETCH_CMS_DEPTH,
+        hll_precision: int = SKETCH_HLL_PRECISION,
+        top_k: int = SKETCH_TOP_K,
+        buffer_keys: int = SKETCH_BUFFER_KEYS
+    ):
+        """
+        Initialize corpus sketch
+
+        Args:
+            cms_width: Count-Min counters per row
+            cms_depth: Count-Min rows
+            hll_precision: HyperLogLog precision bits
+            top_k: Number of top tokens reported
+            buffer_keys: Exact-count buffer size before folding
+        """
+        self.cms = CountMinSketch(cms_width, cms_depth)
+        self.hll = HyperLogLog(hll_precision)
+        self.top_k = top_k
+        self.buffer_keys = buffer_keys
+        self.total_tokens = 0
+        self.stop_words_removed: Counter = Counter()
+        self._buffer: Counter = Counter()
+        self._candidates: Dict[str, int] = {}
+        self._floor = 0
+
+    def empty_copy(self) -> 'CorpusSketch':
+        """New empty sketch with the same shape (mergeable with this one)"""
+        return CorpusSketch(
+            self.cms.width, self.cms.depth, self.hll.precision, self.top_k, self.buffer_keys
+        )
+
+    def add_tokens(self, tokens: Iterable[str]):
+        """
+        Count kept (output) tokens
+
+        Args:
+            tokens: Tokens of one reduced chunk
+        """
+        buffer = self._buffer
+        buffer.update(tokens)
+        if len(buffer) >= self.buffer_keys:
+            self.fold()
+
+    def add_stop_words(self, tokens: Iterable[str], stop_words: Set[str]):
+        """
+        Count the stop-words among a chunk's tokens (case-insensitive)
+
+        Args:
+            tokens: Tokens before stop-word filtering
+            stop_words: Stop-word set of the reducer
+        """
+        removed = self.stop_words_removed
+        # Lower-case each distinct token once instead of every occurrence
+        for token, count in Counter(tokens).items():
+            lowered = token.lower()
+            if lowered in stop_words:
+                removed[lowered] += count
+
+    def fold(self):
+        """Move buffered exact counts into the sketches"""
+        cms_add = self.cms.add
+        hll_add = self.hll.add
+        candidates = self._candidates
+        limit = 2 * self.top_k
+
+        for token, count in self._buffer.items():
+            h = hash64(token)
+            estimate = cms_add(h, count)
+            hll_add(h)
+            self.total_tokens += count
+            if token in candidates or len(candidates) < limit:
+                candidates[token] = estimate
+            elif estimate > self._floor:
+                candidates[token] = estimate
+                self._prune()
+
+        self._buffer = Counter()
+
+    def _prune(self):
+        """Keep the top_k strongest candidates once the set doubles"""
+        if len(self._candidates) <= 2 * self.top_k:
+            return
+        ranked = sorted(self._candidates.items(), key=lambda item: -item[1])[:self.top_k]
+        # In place: fold() holds a reference to the dict
+        self._candidates.clear()
+        self._candidates.update(ranked)
+        self._floor = ranked[-1][1] if ranked else 0
+
+    def merge(self, other: 'CorpusSketch'):
+        """
+        Merge another worker's sketch
+
+        Args:
+            other: Sketch with the same shape
+        """
+        self.fold()
+        other.fold()
+        self.cms.merge(other.cms)
+        self.hll.merge(other.hll)
+        self.total_tokens += other.total_tokens
+        self.stop_words_removed.update(other.stop_words_removed)
+
+        # Re-rank the union of candidates against the merged counts
+        union = self.candidates() | other.candidates()
+        query = self.cms.query
+        ranked = sorted(
+            ((token, query(hash64(token))) for token in union),
+            key=lambda item: -item[1]
+        )[:self.top_k]
+        self._candidates = dict(ranked)
+        self._floor = ranked[-1][1] if ranked else 0
+
+    def candidates(self) -> Set[str]:
+        """Current heavy-hitter candidates (call fold() first to include the buffer)"""
+        return set(self._candidates)
+
+    def top_tokens(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Most frequent tokens with Count-Min estimates (upper bounds)
+
+        Args:
+            n: Number of tokens (default: top_k)
+        """
+        self.fold()
+        query = self.cms.query
+        ranked = sorted(
+            ((token, query(hash64(token))) for token in self._candidates),
+            key=lambda item: -item[1]
+        )
+        return ranked[:n or self.top_k]
+
+    @property
+    def memory_bytes(self) -> int:
+        """Fixed sketch memory (buffer and candidates excluded)"""
+        return self.cms.memory_bytes + self.hll.memory_bytes
+
+    def to_dict(self) -> Dict:
+        """
+        Export statistics
+
+        Returns:
+            dict: Token totals, distinct estimate, top tokens and stop-word removals
+        """
+        self.fold()
+        total = self.total_tokens
+        return {
+            'total_tokens': total,
+            'distinct_tokens_estimate': self.hll.count(),
+            'top_tokens': [
+                {'token': token, 'count_estimate': count,
+                 'share_percent': count / total * 100 if total else 0.0}
+                for token, count in self.top_tokens()
+            ],
+            'stop_words_removed_total': sum(self.stop_words_removed.values()),
+            'stop_words_removed': dict(self.stop_words_removed.most_common(self.top_k)),
+            'sketch': {
+                'cms_width': self.cms.width,
+                'cms_depth': self.cms.depth,
+                # Worst-case overcount e/width * total with probability 1 - e^-depth
+                'cms_error_bound': int(2.718281828 / self.cms.width * total),
+                'hll_precision': self.hll.precision,
+                'hll_relative_error': 1.04 / (len(self.hll.registers) ** 0.5),
+                'memory_bytes': self.memory_bytes
+            }
+        }
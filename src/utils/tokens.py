@@ -0,0 +1,351 @@
+"""
+Integer Token Stream Output
+Writes reduced text as uint32 token IDs against a shared, persistent vocabulary
+"""
+
+import json
+import logging
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .writer import BackgroundWriter
+
+logger = logging.getLogger(__name__)
+
+EOS_TOKEN = '<eos>'  # ID 0, written after every chunk
+EOS_ID = 0
+
+# Worker-local IDs for tokens missing from the worker's vocabulary snapshot;
+# the parent remaps them to global IDs
+PROVISIONAL_BIT = 1 << 31
+
+TOKEN_DTYPE = '<u4'  # NumPy dtype of the stream (np.fromfile / np.memmap)
+
+# How often workers pick up tokens the parent appended to the vocab file
+VOCAB_REFRESH_SECONDS = 0.5
+
+
+class Vocabulary:
+    """
+    Append-only token vocabulary
+
+    Stored as a UTF-8 text file with one token per line; the line number
+    is the token ID. IDs never change once assigned, so the same vocab file
+    gives stable IDs across workers and across runs.
+
+    New tokens get IDs in the order the parent merges worker results,
+    which depends on chunk completion order: two runs over the same input
+    from an empty vocabulary can assign different IDs. Reuse the vocab
+    file for reproducible IDs.
+    """
+
+    def __init__(self, vocab_file: Optional[str] = None):
+        """
+        Initialize vocabulary
+
+        Args:
+            vocab_file: Vocabulary file to load / extend (created if missing)
+        """
+        self.vocab_file = Path(vocab_file) if vocab_file else None
+        self.tokens: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._saved = 0
+
+        if self.vocab_file and self.vocab_file.exists():
+            self._load()
+        if not self.tokens:
+            self.add(EOS_TOKEN)
+
+    def _load(self):
+        """Load tokens from the vocab file"""
+        with open(self.vocab_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                self.add(line.rstrip('\n'))
+        self._saved = len(self.tokens)
+
+        if self.tokens and self.tokens[EOS_ID] != EOS_TOKEN:
+            raise ValueError(f"Vocabulary {self.vocab_file} does not start with {EOS_TOKEN}")
+        logger.info(f"Loaded vocabulary: {self.vocab_file} ({len(self.tokens)} tokens)")
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def add(self, token: str) -> int:
+        """
+        Get the ID of a token, assigning the next ID if it is new
+
+        Args:
+            token: Token text (must not contain newlines)
+
+        Returns:
+            int: Token ID
+        """
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.tokens.append(token)
+            self.ids[token] = token_id
+        return token_id
+
+    def save(self, vocab_file: Optional[str] = None):
+        """
+        Append newly assigned tokens to the vocab file
+
+        Args:
+            vocab_file: Target file (default: the loaded file)
+        """
+        target = Path(vocab_file) if vocab_file else self.vocab_file
+        if target is None:
+            raise ValueError("No vocabulary file to save to")
+
+        if target != self.vocab_file:
+            # Different file: write everything
+            self.vocab_file = target
+            self._saved = 0
+
+        if self._saved == len(self.tokens) and target.exists():
+            return
+        with open(target, 'a' if self._saved else 'w', encoding='utf-8') as f:
+            f.write(''.join(token + '\n' for token in self.tokens[self._saved:]))
+        self._saved = len(self.tokens)
+
+
+class VocabularySnapshot:
+    """
+    Worker-side token -> ID map that follows a growing vocab file
+
+    Loads the file once and then, at most every refresh_seconds, reads the
+    lines the parent appended since (Vocabulary.save), so tokens already
+    assigned by the parent stop travelling back as provisional IDs. Only
+    complete lines are read; a line being appended is picked up later.
+    """
+
+    def __init__(self, vocab_file: str, refresh_seconds: float = VOCAB_REFRESH_SECONDS):
+        """
+        Initialize snapshot
+
+        Args:
+            vocab_file: Vocabulary file written by the parent
+            refresh_seconds: Minimum interval between file checks
+        """
+        self.vocab_file = vocab_file
+        self.refresh_seconds = refresh_seconds
+        self.ids: Dict[str, int] = {}
+        self.refreshes = 0
+        self._offset = 0
+        self._checked = 0.0
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Read tokens appended to the vocab file since the last refresh
+
+        Args:
+            force: Ignore refresh_seconds
+
+        Returns:
+            int: Number of tokens added
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_seconds:
+            return 0
+        self._checked = now
+
+        try:
+            with open(self.vocab_file, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return 0
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return 0
+        self._offset += end
+
+        ids = self.ids
+        before = len(ids)
+        for token in data[:end].decode('utf-8').split('\n')[:-1]:
+            # Same numbering as Vocabulary._load: line number = ID
+            ids.setdefault(token, len(ids))
+        self.refreshes += 1
+        return len(ids) - before
+
+
+def encode_tokens(text: str, vocab_ids: Dict[str, int]) -> Tuple[bytes, Tuple[str, ...]]:
+    """
+    Encode whitespace-separated tokens against a vocabulary snapshot
+
+    Tokens missing from the snapshot get provisional IDs
+    (PROVISIONAL_BIT | index into the returned new-token tuple).
+
+    Args:
+        text: Reduced text
+        vocab_ids: Token -> ID snapshot
+
+    Returns:
+        tuple: (uint32 LE bytes ending with EOS, new tokens)
+    """
+    new_tokens: Dict[str, int] = {}
+    ids = array('I')
+    lookup = vocab_ids.get
+
+    for token in text.split():
+        token_id = lookup(token)
+        if token_id is None:
+            token_id = PROVISIONAL_BIT | new_tokens.setdefault(token, len(new_tokens))
+        ids.append(token_id)
+    ids.append(EOS_ID)
+
+    if sys.byteorder != 'little':
+        ids.byteswap()
+    return ids.tobytes(), tuple(new_tokens)
+
+
+class TokenStreamWriter:
+    """
+    Parent-side writer for worker token streams
+
+    Remaps provisional IDs to global vocabulary IDs (only for chunks that
+    introduced new tokens) and writes the uint32 stream through a
+    background writer thread. New tokens are appended to the vocabulary
+    file every VOCAB_REFRESH_SECONDS, where workers following it
+    (VocabularySnapshot) pick them up. On close it writes
+    '<output>.meta.json'.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        vocab: Vocabulary,
+        max_pending_buffers: int = 2,
+        buffer_size: int = 1024 * 1024
+    ):
+        """
+        Initialize token stream writer
+
+        Args:
+            output_file: Path to the uint32 token stream
+            vocab: Shared vocabulary (extended with new tokens)
+            max_pending_buffers: Buffers in flight to the writer thread
+            buffer_size: Bytes batched per hand-off
+        """
+        self.output_file = Path(output_file)
+        self.vocab = vocab
+        if self.vocab.vocab_file is None:
+            self.vocab.vocab_file = self.output_file.with_name(self.output_file.name + '.vocab')
+        self.buffer_size = buffer_size
+        self.total_tokens = 0
+        self.total_chunks = 0
+        self.remapped_chunks = 0
+        self._buffer: List[bytes] = []
+        self._buffered_bytes = 0
+        self._published = time.monotonic()
+        self._writer = BackgroundWriter(
+            open(self.output_file, 'wb'),
+            max_pending=max_pending_buffers,
+            name='token-writer'
+        )
+
+    def write(self, token_bytes: bytes, new_tokens: Sequence[str] = ()):
+        """
+        Add one chunk's token stream
+
+        Args:
+            token_bytes: uint32 LE IDs from encode_tokens()
+            new_tokens: Tokens behind the chunk's provisional IDs
+        """
+        if new_tokens:
+            token_bytes = self._remap(token_bytes, new_tokens)
+            self.remapped_chunks += 1
+            now = time.monotonic()
+            if now - self._published >= VOCAB_REFRESH_SECONDS:
+                self.vocab.save()
+                self._published = now
+
+        self._buffer.append(token_bytes)
+        self._buffered_bytes += len(token_bytes)
+        self.total_tokens += len(token_bytes) // 4
+        self.total_chunks += 1
+
+        if self._buffered_bytes >= self.buffer_size:
+            self.flush()
+
+    def _remap(self, token_bytes: bytes, new_tokens: Sequence[str]) -> bytes:
+        """Replace provisional IDs with global IDs"""
+        mapping = [self.vocab.add(token) for token in new_tokens]
+        ids = array('I')
+        ids.frombytes(token_bytes)
+        swap = sys.byteorder != 'little'
+        if swap:
+            ids.byteswap()
+
+        remapped = array('I', (
+            mapping[token_id ^ PROVISIONAL_BIT] if token_id & PROVISIONAL_BIT else token_id
+            for token_id in ids
+        ))
+        if swap:
+            remapped.byteswap()
+        return remapped.tobytes()
+
+    @property
+    def pending_buffers(self) -> int:
+        """Buffers queued for the writer thread"""
+        return self._writer.pending
+
+    def flush(self):
+        """Hand buffered tokens to the writer thread"""
+        if self._buffer:
+            self._writer.submit(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered_bytes = 0
+
+    def close(self) -> Dict:
+        """
+        Finish the stream, save the vocabulary and write metadata
+
+        Returns:
+            dict: Stream metadata
+        """
+        self.flush()
+        self._writer.close()
+        self.vocab.save()
+
+        meta = {
+            'token_file': str(self.output_file),
+            'dtype': TOKEN_DTYPE,
+            'vocab_file': str(self.vocab.vocab_file),
+            'vocab_size': len(self.vocab),
+            'eos_id': EOS_ID,
+            'num_tokens': self.total_tokens,
+            'num_chunks': self.total_chunks
+        }
+        meta_file = self.output_file.with_name(self.output_file.name + '.meta.json')
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        logger.info(
+            f"Token stream closed: {self.total_tokens} tokens, "
+            f"vocab {len(self.vocab)} ({self.remapped_chunks} chunks remapped)"
+        )
+        return meta
+
+
+def read_token_stream(token_file: str) -> array:
+    """
+    Load a token stream as array('I') (NumPy: np.fromfile(path, dtype='<u4'))
+
+    Args:
+        token_file: Path to the uint32 stream
+
+    Returns:
+        array: Token IDs
+    """
+    ids = array('I')
+    with open(token_file, 'rb') as f:
+        ids.frombytes(f.read())
+    if sys.byteorder != 'little':
+        ids.byteswap()
+    return ids
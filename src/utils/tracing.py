@@ -0,0 +1,228 @@
+"""
+Chrome Trace / Perfetto Timeline Export
+Records per-chunk spans of a ParallelProcessor run (read, queue, reduce, write)
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from time import monotonic_ns
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EVENTS = 1_000_000  # ~100MB of trace JSON
+EVENTS_PER_CHUNK = 7            # read, queued (b/e), reduce, result_queue (b/e), write
+
+# Event tuple: (phase, name, ts_ns, dur_ns, pid, tid, seq)
+TraceEvent = Tuple[str, str, int, int, int, int, int]
+
+
+def traced_call(worker_fn: Callable, item: Tuple[int, str]):
+    """
+    Worker wrapper: run worker_fn and stamp sampled results with timings
+
+    Uses time.monotonic_ns, which is system-wide on Linux and macOS, so
+    worker and parent timestamps share one timeline.
+
+    Args:
+        worker_fn: Module-level worker function returning a ChunkResult
+        item: (sequence number or -1 if not sampled, chunk)
+
+    Returns:
+        ChunkResult: With trace=(seq, pid, start_ns, end_ns) when sampled
+    """
+    seq, chunk = item
+    if seq < 0:
+        return worker_fn(chunk)
+    start = monotonic_ns()
+    record = worker_fn(chunk)
+    return record._replace(trace=(seq, os.getpid(), start, monotonic_ns()))
+
+
+class TraceRecorder:
+    """
+    Bounded timeline recorder for one processing run
+
+    Every `sample_every`-th chunk is traced. The parent records the read
+    span and the queue wait up to the worker start; the worker stamps its
+    own start/end; the parent then records the time the result waited to
+    be collected and the write span. The buffer holds at most `max_events`
+    events: when it fills up, the sampling interval doubles and events of
+    chunks that are no longer sampled are discarded, so the trace always
+    covers the whole run uniformly.
+    """
+
+    def __init__(
+        self,
+        trace_file: str,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        sample_every: Optional[int] = None,
+        expected_chunks: Optional[int] = None
+    ):
+        """
+        Initialize trace recorder
+
+        Args:
+            trace_file: Output Chrome trace JSON (open in ui.perfetto.dev)
+            max_events: Event buffer bound
+            sample_every: Initial interval: trace every N-th chunk (default:
+                derived from expected_chunks so the run fits the buffer)
+            expected_chunks: Estimated chunk count of the run
+        """
+        self.trace_file = Path(trace_file)
+        self.max_events = max_events
+        if sample_every is None:
+            sample_every = max(1, math.ceil((expected_chunks or 0) * EVENTS_PER_CHUNK / max_events))
+        self.sample_every = sample_every
+
+        self.events: List[TraceEvent] = []
+        self.dropped_events = 0
+        self._lock = threading.Lock()
+        self.sampled_chunks = 0
+        self.pid = os.getpid()
+        self.start_ns = monotonic_ns()
+        self._reader_tid = 0
+        self._worker_pids = set()
+
+    def _add(self, event: TraceEvent):
+        """Append an event, downsampling when the buffer is full"""
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self._downsample()
+            if event[6] % self.sample_every:
+                # Chunk sampled before the interval grew
+                self.dropped_events += 1
+                return
+            self.events.append(event)
+
+    def _downsample(self):
+        """Double the sampling interval and keep only events of still-sampled chunks"""
+        self.sample_every *= 2
+        every = self.sample_every
+        kept = [event for event in self.events if event[6] % every == 0]
+        self.dropped_events += len(self.events) - len(kept)
+        self.events = kept
+        logger.info(f"Trace buffer full: sampling every {every}th chunk")
+
+    def trace_chunks(self, chunks: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """
+        Number chunks for traced_call() and record read / enqueue times
+
+        Runs on the pool's task feeder thread.
+
+        Args:
+            chunks: Chunk generator
+
+        Yields:
+            tuple: (seq or -1, chunk)
+        """
+        self._reader_tid = threading.get_ident()
+        iterator = iter(chunks)
+        seq = 0
+        while True:
+            start = monotonic_ns()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+
+            if seq % self.sample_every:
+                yield -1, chunk
+            else:
+                end = monotonic_ns()
+                self.sampled_chunks += 1
+                self._add(('X', 'read', start, end - start, self.pid, self._reader_tid, seq))
+                # Closed when the worker picks the chunk up
+                self._add(('b', 'queued', end, 0, self.pid, 0, seq))
+                yield seq, chunk
+            seq += 1
+
+    def trace_results(self, results: Iterable) -> Iterator:
+        """
+        Record worker spans and the consumer's handling time of each result
+
+        The time between yielding a result and being resumed is what the
+        collector spent on it (stats + write).
+
+        Args:
+            results: ChunkResult iterator from the pool
+
+        Yields:
+            ChunkResult: Unchanged records
+        """
+        tid = threading.get_ident()
+        for record in results:
+            trace = record.trace
+            if trace is None:
+                yield record
+                continue
+
+            seq, pid, start, end = trace
+            arrived = monotonic_ns()
+            self._worker_pids.add(pid)
+            self._add(('e', 'queued', start, 0, self.pid, 0, seq))
+            self._add(('X', 'reduce', start, end - start, pid, pid, seq))
+            self._add(('b', 'result_queue', end, 0, self.pid, 0, seq))
+            self._add(('e', 'result_queue', arrived, 0, self.pid, 0, seq))
+
+            yield record
+            self._add(('X', 'write', arrived, monotonic_ns() - arrived, self.pid, tid, seq))
+
+    def save(self) -> Path:
+        """
+        Write the Chrome trace JSON (streamed, one event per line)
+
+        Returns:
+            Path: Trace file
+        """
+        t0 = self.start_ns
+        metadata = [
+            {'ph': 'M', 'name': 'process_name', 'pid': self.pid, 'tid': 0,
+             'args': {'name': 'ParallelProcessor (parent)'}},
+            {'ph': 'M', 'name': 'thread_name', 'pid': self.pid, 'tid': self._reader_tid,
+             'args': {'name': 'reader / task feeder'}},
+        ] + [
+            {'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0,
+             'args': {'name': f'worker {pid}'}}
+            for pid in sorted(self._worker_pids)
+        ]
+
+        with open(self.trace_file, 'w', encoding='utf-8') as f:
+            f.write('{"traceEvents": [\n')
+            for event in metadata:
+                f.write(json.dumps(event) + ',\n')
+
+            for phase, name, ts, dur, pid, tid, seq in self.events:
+                event = {
+                    'name': name, 'cat': 'chunk', 'ph': phase,
+                    'ts': (ts - t0) / 1000, 'pid': pid, 'tid': tid,
+                    'args': {'seq': seq}
+                }
+                if phase == 'X':
+                    event['dur'] = dur / 1000
+                else:
+                    event['id'] = seq
+                f.write(json.dumps(event) + ',\n')
+
+            # Closing instant event avoids a trailing comma
+            f.write(json.dumps({
+                'name': 'trace_end', 'ph': 'i', 's': 'g', 'pid': self.pid, 'tid': 0,
+                'ts': (monotonic_ns() - t0) / 1000
+            }) + '\n')
+            f.write('], "displayTimeUnit": "ms", "otherData": ' + json.dumps({
+                'sample_every': self.sample_every,
+                'sampled_chunks': self.sampled_chunks,
+                'max_events': self.max_events,
+                'events': len(self.events),
+                'dropped_events': self.dropped_events
+            }) + '}\n')
+
+        logger.info(
+            f"Trace saved to: {self.trace_file} ({len(self.events)} events, "
+            f"1/{self.sample_every} chunks sampled)"
+        )
+        return self.trace_file
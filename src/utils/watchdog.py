@@ -0,0 +1,258 @@
+"""
+Memory Watchdog and In-Flight Throttling
+Keeps parallel runs inside a memory budget by shrinking work in flight and
+recycling bloated worker processes
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from .metrics import process_rss_mb
+from .config import MAX_MEMORY_MB, PROGRESS_UPDATE_FREQ, STAT_UPDATE_FREQ
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class InFlightGate:
+    """
+    Bounds the number of chunks handed to a worker pool but not collected
+
+    feed() runs on the pool's task feeder thread and blocks while `limit`
+    chunks are in flight; the collector calls release() for every result.
+    The limit can change at any time, and stop() ends the current feed so
+    the pool drains and can be replaced.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Initialize gate
+
+        Args:
+            limit: Maximum chunks in flight
+        """
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.exhausted = False
+        self._stopped = False
+        self._cond = threading.Condition()
+
+    def feed(self, source: Iterator[T]) -> Iterator[T]:
+        """
+        Yield items from a shared source while respecting the limit
+
+        Args:
+            source: Iterator shared across pool generations
+
+        Yields:
+            Items of the source
+        """
+        cond = self._cond
+        while True:
+            with cond:
+                while self.in_flight >= self.limit and not self._stopped:
+                    cond.wait()
+                if self._stopped:
+                    return
+                self.in_flight += 1
+
+            try:
+                item = next(source)
+            except StopIteration:
+                with cond:
+                    self.in_flight -= 1
+                    self.exhausted = True
+                return
+            yield item
+
+    def release(self):
+        """Mark one chunk as collected"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def set_limit(self, limit: int):
+        """Change the in-flight limit"""
+        with self._cond:
+            self.limit = max(1, limit)
+            self._cond.notify_all()
+
+    def stop(self):
+        """End the current feed (the source keeps its position)"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        """Allow a new feed after stop()"""
+        with self._cond:
+            self._stopped = False
+
+
+class MemoryWatchdog:
+    """
+    Samples RSS of the parent and worker processes and decides throttling
+
+    Above the soft limit (soft_fraction of the budget) one step is taken
+    per check, in order: halve the in-flight window, halve the chunk size,
+    recycle the workers if any grew past recycle_factor times the fresh
+    worker size recorded by record_baseline(). Above the hard limit, bloated workers are recycled right away.
+    Below the low-water mark the window and chunk size grow back towards
+    their original values. Every action is logged and counted.
+    """
+
+    def __init__(
+        self,
+        budget_mb: float = MAX_MEMORY_MB,
+        window: int = 8,
+        chunk_units: int = 50,
+        min_chunk_units: int = 1,
+        soft_fraction: float = 0.8,
+        low_fraction: float = 0.5,
+        recycle_factor: float = 1.5,
+        check_every: int = STAT_UPDATE_FREQ,
+        log_every: int = PROGRESS_UPDATE_FREQ
+    ):
+        """
+        Initialize watchdog
+
+        Args:
+            budget_mb: Memory budget for parent + workers
+            window: Initial (maximum) chunks in flight
+            chunk_units: Initial (maximum) chunk size (lines or bytes)
+            min_chunk_units: Smallest chunk size it shrinks to
+            soft_fraction: Share of the budget where throttling starts
+            low_fraction: Share of the budget below which it relaxes again
+            recycle_factor: Worker growth over its fresh RSS that counts as bloat
+            check_every: Sample memory every N collected chunks
+            log_every: Log a memory status line every N collected chunks
+        """
+        self.budget_mb = budget_mb
+        self.max_window = max(1, window)
+        self.max_chunk_units = max(1, chunk_units)
+        self.min_chunk_units = max(1, min(min_chunk_units, chunk_units))
+        self.window = self.max_window
+        self.chunk_units = self.max_chunk_units
+        self.soft_mb = budget_mb * soft_fraction
+        self.low_mb = budget_mb * low_fraction
+        self.recycle_factor = recycle_factor
+        self.check_every = max(1, check_every)
+        self.log_every = max(1, log_every)
+
+        self.checks = 0
+        self.peak_rss_mb = 0.0
+        self.last_rss_mb = 0.0
+        self.worker_baseline_mb: Optional[float] = None
+        self.actions: Counter = Counter()
+        self._collected = 0
+
+    def sample(self, worker_pids: Iterable[int]) -> Dict[int, float]:
+        """RSS per worker pid (parent under key 0)"""
+        rss = {pid: process_rss_mb(pid) for pid in worker_pids}
+        rss[0] = process_rss_mb()
+        return rss
+
+    def record_baseline(self, worker_pids: Iterable[int]) -> Optional[float]:
+        """
+        Record the RSS of freshly initialized workers as the bloat baseline
+
+        Call once per pool, after the workers finished their initializer
+        and before they get work, so growth is measured against warm but
+        unused workers.
+
+        Args:
+            worker_pids: Process ids of the new workers
+
+        Returns:
+            float: Baseline in MB (None if no worker could be sampled)
+        """
+        workers = [mb for mb in map(process_rss_mb, worker_pids) if mb > 0]
+        self.worker_baseline_mb = max(workers) if workers else None
+        return self.worker_baseline_mb
+
+    def on_result(self, worker_pids: Iterable[int]) -> List[str]:
+        """
+        Count one collected chunk and, every check_every chunks, check memory
+
+        Args:
+            worker_pids: Current worker process ids
+
+        Returns:
+            list: Actions to apply ('shrink_window', 'shrink_chunks',
+                  'recycle_workers', 'grow_window', 'grow_chunks')
+        """
+        self._collected += 1
+        if self._collected % self.check_every:
+            return []
+        return self.check(worker_pids)
+
+    def check(self, worker_pids: Iterable[int]) -> List[str]:
+        """Sample memory and decide actions (see on_result)"""
+        self.checks += 1
+        rss = self.sample(worker_pids)
+        workers = [mb for pid, mb in rss.items() if pid and mb > 0]
+        total = sum(rss.values())
+        self.last_rss_mb = total
+        self.peak_rss_mb = max(self.peak_rss_mb, total)
+
+        bloated = bool(
+            workers and self.worker_baseline_mb
+            and max(workers) > self.worker_baseline_mb * self.recycle_factor
+        )
+
+        if self._collected % self.log_every < self.check_every:
+            logger.info(
+                f"Memory: {total:.0f}MB / {self.budget_mb:.0f}MB "
+                f"(largest worker {max(workers, default=0):.0f}MB, "
+                f"window {self.window}, chunk {self.chunk_units})"
+            )
+
+        actions = []
+        if total > self.budget_mb and bloated:
+            actions.append('recycle_workers')
+        elif total > self.soft_mb:
+            if self.window > 1:
+                self.window = max(1, self.window // 2)
+                actions.append('shrink_window')
+            elif self.chunk_units > self.min_chunk_units:
+                self.chunk_units = max(self.min_chunk_units, self.chunk_units // 2)
+                actions.append('shrink_chunks')
+            elif bloated:
+                actions.append('recycle_workers')
+        elif total < self.low_mb:
+            if self.chunk_units < self.max_chunk_units:
+                self.chunk_units = min(self.max_chunk_units, self.chunk_units * 2)
+                actions.append('grow_chunks')
+            elif self.window < self.max_window:
+                self.window = min(self.max_window, self.window * 2)
+                actions.append('grow_window')
+
+        for action in actions:
+            self.actions[action] += 1
+            log = logger.warning if action in ('recycle_workers', 'shrink_window', 'shrink_chunks') else logger.info
+            log(
+                f"Memory watchdog: {action} at {total:.0f}MB "
+                f"(budget {self.budget_mb:.0f}MB, window {self.window}, chunk {self.chunk_units})"
+            )
+        return actions
+
+    def get_stats(self) -> Dict:
+        """
+        Watchdog summary for the final stats
+
+        Returns:
+            dict: Budget, peak/last RSS, checks and action counts
+        """
+        return {
+            'budget_mb': self.budget_mb,
+            'peak_rss_mb': self.peak_rss_mb,
+            'last_rss_mb': self.last_rss_mb,
+            'worker_baseline_mb': self.worker_baseline_mb,
+            'checks': self.checks,
+            'actions': dict(self.actions),
+            'final_window': self.window,
+            'final_chunk_units': self.chunk_units
+        }
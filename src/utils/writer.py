@@ -3,49 +3,219 @@ Output Writer and Analytics
 Handles efficient file writing and performance tracking
 """
 
+import csv
+import gzip
+import io
 import json
 import logging
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
+from time import perf_counter_ns
 import os
 
+from .metrics import StageTimers, format_prometheus
+from .sketches import CorpusSketch
+
+# Optional zstd support (gzip fallback)
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Optional fast JSON serializer
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# C string escaper used by json.dumps(ensure_ascii=False)
+_encode_json_str = json.encoder.encode_basestring
+
+# Stateless, so one compact encoder serves every writer
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
 logger = logging.getLogger(__name__)
 
+# Indexed binary record format ('records'):
+#   data file:  RECORDS_MAGIC, then per record <uint32 LE length><utf-8 bytes>
+#   index file: INDEX_MAGIC, then one <uint64 LE offset> per record
+RECORDS_MAGIC = b'NXREC\x00\x01\x00'
+INDEX_MAGIC = b'NXIDX\x00\x01\x00'
+INDEX_SUFFIX = '.idx'
+_RECORD_LENGTH = struct.Struct('<I')
+
+# Output file extension -> compression codec
+OUTPUT_CODECS = {
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+    '.gz': 'gzip',
+}
+
 
 class OutputWriter:
     """
     Efficient output file writer with analytics
-    Supports multiple formats (txt, json, csv)
+    Supports multiple formats (txt, json, csv, records)
+    
+    - txt/records are encoded once, at write() time; json/csv rows are
+      serialized a whole buffer at a time on flush
+    - A running byte counter decides when to flush (O(1) per record)
+    - One long-lived file handle; each flush is a single batched write
+    - Optional background writer thread (double-buffered async mode)
+    - '.zst' / '.gz' output files are compressed on the fly
     """
     
     def __init__(
         self,
         output_file: str,
         format: str = 'txt',
-        buffer_size: int = 8192
+        buffer_size: int = 1024 * 1024,
+        os_buffer_size: int = 4 * 1024 * 1024,
+        async_write: bool = False,
+        max_pending_buffers: int = 2,
+        append: bool = True,
+        compression_level: int = 3,
+        csv_columns: Optional[List[str]] = None,
+        csv_header: bool = True,
+        timers: Optional[StageTimers] = None
     ):
         """
         Initialize output writer
         
         Args:
             output_file: Path to output file
-            format: Output format ('txt', 'json', 'csv')
-            buffer_size: Write buffer size (bytes)
+            format: Output format ('txt', 'json', 'csv', 'records'); 'records'
+                writes length-prefixed records plus a '<output>.idx' offset index
+            buffer_size: Encoded bytes batched before each write (default 1MB)
+            os_buffer_size: Buffer size of the underlying file handle (default 4MB)
+            async_write: Hand full buffers to a writer thread instead of
+                writing inline; the next buffer fills while one is written
+            max_pending_buffers: Filled buffers allowed in flight (async mode)
+            append: Append to an existing file (False = truncate)
+            compression_level: Level for '.zst' / '.gz' outputs
+            csv_columns: Metadata keys written as CSV columns after 'text'
+                (default: keys of the first metadata in the first flushed
+                batch, or none; keys outside the columns are dropped)
+            csv_header: Write a header row when starting a new CSV file
+            timers: Per-flush stage timers ('serialize', 'write' or, in async
+                mode, 'write_wait' plus the writer thread's 'sink_write')
         """
-        self.output_file = Path(output_file)
+        self.output_file, self.codec = resolve_compressed_output(output_file)
         self.format = format
         self.buffer_size = buffer_size
-        self.buffer = []
+        self.os_buffer_size = os_buffer_size
+        self.buffer: List[bytes] = []
+        self.buffered_bytes = 0
         self.total_writes = 0
         self.total_bytes_written = 0
+        self.total_flushes = 0
         self.start_time = datetime.now()
+        self.csv_columns = list(csv_columns) if csv_columns is not None else None
+        self.timers = timers
+        
+        # json/csv rows wait unserialized until flush
+        self._rows: List[Tuple[str, Optional[Dict]]] = []
         
         # Validate format
-        if format not in ['txt', 'json', 'csv']:
+        if format not in ['txt', 'json', 'csv', 'records']:
             raise ValueError(f"Unsupported format: {format}")
+        if format == 'records' and self.codec:
+            raise ValueError("The 'records' format needs an uncompressed output for random access")
+        
+        self._encode = {
+            'txt': self._encode_txt,
+            'json': self._encode_json,
+            'csv': self._encode_csv,
+            'records': self._encode_record,
+        }[format]
+        self._encode_batch = {
+            'json': encode_jsonl_batch,
+            'csv': self._encode_csv_batch,
+        }.get(format)
+        
+        is_new_file = (
+            not append or not self.output_file.exists() or self.output_file.stat().st_size == 0
+        )
+        self._csv_header_pending = format == 'csv' and csv_header and is_new_file
+        
+        if self.codec:
+            self._file: Optional[BinaryIO] = open_compressed_sink(
+                self.output_file, self.codec, compression_level, append=append
+            )
+        else:
+            self._file = open(self.output_file, 'ab' if append else 'wb', buffering=os_buffer_size)
+        
+        # Offset index for the 'records' format
+        self.index_file: Optional[Path] = None
+        self._index: Optional[BinaryIO] = None
+        self._offsets = array('Q')
+        self._next_offset = 0
+        self._unindexed_bytes = 0  # Record bytes written since the last index write
+        if format == 'records':
+            self._open_index()
+        
+        self._background: Optional[BackgroundWriter] = None
+        if async_write:
+            self._background = BackgroundWriter(
+                self._file,
+                max_pending=max_pending_buffers,
+                name=f"writer-{self.output_file.name}",
+                timers=timers
+            )
+        
+        logger.info(
+            f"Initialized OutputWriter: {self.output_file} "
+            f"({format}{', ' + self.codec if self.codec else ''}{', async' if async_write else ''})"
+        )
+    
+    def _open_index(self):
+        """Open the offset index and write headers for a new records file"""
+        self.index_file = self.output_file.with_name(self.output_file.name + INDEX_SUFFIX)
+        data_size = self._file.tell()
         
-        logger.info(f"Initialized OutputWriter: {self.output_file} ({format})")
+        if data_size == 0:
+            self._file.write(RECORDS_MAGIC)
+            self.total_bytes_written += len(RECORDS_MAGIC)
+            self._index = open(self.index_file, 'wb')
+            self._index.write(INDEX_MAGIC)
+            self._next_offset = len(RECORDS_MAGIC)
+        else:
+            if not self.index_file.exists():
+                raise FileNotFoundError(f"Cannot append records without index: {self.index_file}")
+            self._index = open(self.index_file, 'ab')
+            self._next_offset = data_size
+    
+    @staticmethod
+    def _encode_record(data: str, metadata: Optional[Dict]) -> bytes:
+        encoded = data.encode('utf-8')
+        return _RECORD_LENGTH.pack(len(encoded)) + encoded
+    
+    @staticmethod
+    def _encode_txt(data: str, metadata: Optional[Dict]) -> bytes:
+        return (data + '\n').encode('utf-8')
+    
+    def _encode_json(self, data: str, metadata: Optional[Dict]) -> bytes:
+        return encode_jsonl_batch([(data, metadata)])
+    
+    def _encode_csv(self, data: str, metadata: Optional[Dict]) -> bytes:
+        return self._encode_csv_batch([(data, metadata)])
+    
+    def _encode_csv_batch(self, rows: List[Tuple[str, Optional[Dict]]]) -> bytes:
+        if self.csv_columns is None:
+            # Fixed by the first batch, together with the header
+            first = next((metadata for _, metadata in rows if metadata), {})
+            self.csv_columns = list(first)
+        header, self._csv_header_pending = self._csv_header_pending, False
+        return encode_csv_batch(rows, self.csv_columns, header=header)
     
     def write(self, data: str, metadata: Optional[Dict] = None):
         """
@@ -56,60 +226,466 @@ class OutputWriter:
             data: Text data to write
             metadata: Optional metadata (used for json/csv)
         """
-        self.buffer.append((data, metadata))
+        self.total_writes += 1
+        
+        if self._encode_batch is not None:
+            # Serialized with the rest of the buffer on flush; size is an estimate
+            self._rows.append((data, metadata))
+            self.buffered_bytes += len(data) + 16
+        else:
+            encoded = self._encode(data, metadata)
+            if self._index is not None:
+                self._offsets.append(self._next_offset)
+                self._next_offset += len(encoded)
+            self.buffer.append(encoded)
+            self.buffered_bytes += len(encoded)
         
         # Flush if buffer full
-        total_size = sum(len(item[0].encode('utf-8')) for item in self.buffer)
-        if total_size >= self.buffer_size:
+        if self.buffered_bytes >= self.buffer_size:
+            self.flush()
+    
+    def write_many(self, records: List[str], metadata: Optional[List[Optional[Dict]]] = None):
+        """
+        Write a batch of records
+        
+        The txt format encodes the whole batch with a single join/encode,
+        which is what makes millions of small records cheap.
+        
+        Args:
+            records: Text records
+            metadata: Optional per-record metadata (json/csv)
+        """
+        if not records:
+            return
+        
+        if self._encode_batch is not None:
+            metadata = metadata or [None] * len(records)
+            self._rows.extend(zip(records, metadata))
+            self.buffered_bytes += sum(map(len, records)) + 16 * len(records)
+            self.total_writes += len(records)
+            if self.buffered_bytes >= self.buffer_size:
+                self.flush()
+            return
+        
+        if self.format == 'txt':
+            encoded = ('\n'.join(records) + '\n').encode('utf-8')
+        else:
+            metadata = metadata or [None] * len(records)
+            parts = [self._encode(data, meta) for data, meta in zip(records, metadata)]
+            if self._index is not None:
+                offset = self._next_offset
+                for part in parts:
+                    self._offsets.append(offset)
+                    offset += len(part)
+                self._next_offset = offset
+            encoded = b''.join(parts)
+        
+        self.buffer.append(encoded)
+        self.buffered_bytes += len(encoded)
+        self.total_writes += len(records)
+        
+        if self.buffered_bytes >= self.buffer_size:
             self.flush()
     
     def flush(self):
         """Flush buffer to disk"""
+        timers = self.timers
+        if self._rows:
+            # One serializer call for the whole buffer
+            start = perf_counter_ns() if timers else 0
+            self.buffer.append(self._encode_batch(self._rows))
+            self._rows = []
+            if timers:
+                timers.add('serialize', perf_counter_ns() - start)
         if not self.buffer:
             return
+        if self._file is None:
+            raise ValueError(f"OutputWriter is closed: {self.output_file}")
         
         try:
-            with open(self.output_file, 'a', encoding='utf-8') as f:
-                for data, metadata in self.buffer:
-                    if self.format == 'txt':
-                        f.write(data + '\n')
-                    elif self.format == 'json':
-                        obj = {'text': data}
-                        if metadata:
-                            obj.update(metadata)
-                        f.write(json.dumps(obj, ensure_ascii=False) + '\n')
-                    elif self.format == 'csv':
-                        # Simple CSV: escape quotes
-                        escaped = data.replace('"', '""')
-                        f.write(f'"{escaped}"\n')
-                    
-                    self.total_writes += 1
-                    self.total_bytes_written += len(data.encode('utf-8'))
-            
+            start = perf_counter_ns() if timers else 0
+            data = b''.join(self.buffer)
+            index_data = None
+            if self._index is not None:
+                # The index write flushes the data file first; do it once per
+                # OS buffer of records, not on every flush
+                self._unindexed_bytes += len(data)
+                if self._unindexed_bytes >= self.os_buffer_size:
+                    index_data = self._take_index()
+            if self._background is not None:
+                # Blocks only when max_pending_buffers are already in flight;
+                # the index follows on the writer thread, after its records
+                self._background.submit(data, self._index_writer(index_data))
+                if timers:
+                    timers.add('write_wait', perf_counter_ns() - start)
+            else:
+                self._file.write(data)
+                if index_data:
+                    self._write_index(self._file, index_data)
+                if timers:
+                    timers.add('write', perf_counter_ns() - start)
+            self.total_bytes_written += len(data)
+            self.total_flushes += 1
             self.buffer = []
+            self.buffered_bytes = 0
             
         except Exception as e:
             logger.error(f"Write error: {e}")
             raise
     
+    @property
+    def pending_buffers(self) -> int:
+        """Buffers queued for the writer thread (async mode)"""
+        return self._background.pending if self._background is not None else 0
+    
+    def _take_index(self) -> bytes:
+        """Buffered record offsets as index bytes (uint64 LE)"""
+        offsets, self._offsets = self._offsets, array('Q')
+        self._unindexed_bytes = 0
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        return offsets.tobytes()
+    
+    def _index_writer(self, index_data: Optional[bytes]) -> Optional[Callable[[], None]]:
+        """Callback writing index_data on the writer thread (None if nothing to write)"""
+        if not index_data:
+            return None
+        sink = self._file
+        return lambda: self._write_index(sink, index_data)
+    
+    def _submit_index(self, index_data: bytes):
+        """Write index_data after every record handed over so far"""
+        if self._background is not None:
+            self._background.submit(b'', self._index_writer(index_data))
+        else:
+            self._write_index(self._file, index_data)
+    
+    def _write_index(self, sink: BinaryIO, index_data: bytes):
+        """
+        Append offsets to the index once their records are written
+        
+        The data file is flushed first, so after a crash the index never
+        points past the end of the data file. Called about once per
+        os_buffer_size of records and on close(), so the flush costs
+        little more than the OS buffer would anyway.
+        """
+        sink.flush()
+        self._index.write(index_data)
+    
     def close(self):
-        """Flush and close"""
-        self.flush()
+        """
+        Flush and close
+        
+        In async mode this waits for the writer thread and re-raises the
+        first write error it hit, so a failed write never goes unnoticed.
+        """
+        if self._file is None:
+            return
+        try:
+            self.flush()
+            if self._offsets:
+                # Offsets still waiting for their index write
+                self._submit_index(self._take_index())
+        finally:
+            background, self._background = self._background, None
+            sink, self._file = self._file, None
+            try:
+                if background is not None:
+                    background.close()  # Drains the queue (and index writes), closes the sink
+                else:
+                    sink.close()
+            finally:
+                if self._index is not None:
+                    self._index.close()
+                    self._index = None
         logger.info(f"Writer closed. Wrote {self.total_writes} items")
     
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def get_stats(self) -> Dict:
         """Get write statistics"""
         elapsed = (datetime.now() - self.start_time).total_seconds()
         throughput = self.total_bytes_written / elapsed / 1024 / 1024 if elapsed > 0 else 0
         
-        return {
+        if self._file is not None and self._background is None and not self.codec:
+            self._file.flush()
+        
+        stats = {
+            'format': self.format,
             'total_writes': self.total_writes,
             'total_bytes': self.total_bytes_written,
+            'total_flushes': self.total_flushes,
             'elapsed_seconds': elapsed,
             'throughput_mbps': throughput,
             'output_file': str(self.output_file),
             'output_size_mb': self.output_file.stat().st_size / 1024 / 1024 if self.output_file.exists() else 0
         }
+        
+        if self.index_file is not None:
+            # In async mode the writer thread owns the index until close()
+            if self._index is not None and self._background is None:
+                self._index.flush()
+            index_size = self.index_file.stat().st_size if self.index_file.exists() else 0
+            stats.update({
+                'index_file': str(self.index_file),
+                'index_size_mb': index_size / 1024 / 1024,
+                # Indexed records plus those whose offsets are not written yet
+                'total_records': max(0, index_size - len(INDEX_MAGIC)) // 8 + len(self._offsets)
+            })
+        
+        return stats
+
+
+# ============================================
+# BATCH SERIALIZERS
+# ============================================
+
+def encode_jsonl_batch(rows: List[Tuple[str, Optional[Dict]]]) -> bytes:
+    """
+    Serialize rows as JSON Lines ({"text": ..., **metadata})
+    
+    Uses orjson when installed; a batch holding types orjson rejects
+    (e.g. integers beyond 64 bits) falls back to the stdlib encoder.
+    
+    Args:
+        rows: (text, metadata) pairs
+        
+    Returns:
+        bytes: UTF-8 lines, each ending with a newline
+    """
+    if ORJSON_AVAILABLE:
+        # C extension: pylint cannot see its members
+        dumps = orjson.dumps  # pylint: disable=no-member
+        try:
+            return b''.join(
+                dumps({'text': data, **metadata} if metadata else {'text': data}) + b'\n'
+                for data, metadata in rows
+            )
+        except TypeError:
+            pass  # Types orjson rejects: fall back to the stdlib encoder
+    
+    encode_obj = _JSON_ENCODER.encode
+    lines = [
+        encode_obj({'text': data, **metadata}) if metadata
+        else '{"text":' + _encode_json_str(data) + '}'
+        for data, metadata in rows
+    ]
+    lines.append('')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def encode_csv_batch(
+    rows: List[Tuple[str, Optional[Dict]]],
+    columns: List[str],
+    header: bool = False
+) -> bytes:
+    """
+    Serialize rows with csv.writer: text column + metadata columns
+    
+    Args:
+        rows: (text, metadata) pairs
+        columns: Metadata keys written after 'text' (other keys are dropped)
+        header: Start with a header row
+        
+    Returns:
+        bytes: UTF-8 CSV rows
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    if header:
+        writer.writerow(['text'] + columns)
+    
+    if columns:
+        writer.writerows(
+            [data] + [metadata.get(column, '') for column in columns] if metadata
+            else [data] + [''] * len(columns)
+            for data, metadata in rows
+        )
+    else:
+        writer.writerows([data] for data, _ in rows)
+    
+    return out.getvalue().encode('utf-8')
+
+
+# ============================================
+# COMPRESSED OUTPUT
+# ============================================
+
+def output_codec(output_file: str) -> Optional[str]:
+    """
+    Pick the compression codec for an output file by its extension
+    
+    Args:
+        output_file: Path to output file
+        
+    Returns:
+        str: 'zstd', 'gzip' or None for plain output
+    """
+    return OUTPUT_CODECS.get(Path(output_file).suffix.lower())
+
+
+def resolve_compressed_output(output_file: str) -> Tuple[Path, Optional[str]]:
+    """
+    Resolve output path and codec, falling back to gzip without zstandard
+    
+    A '.zst' target is rewritten to '.gz' when zstandard is not installed,
+    so the file extension always matches its contents.
+    
+    Args:
+        output_file: Requested output path
+        
+    Returns:
+        tuple: (output_path, codec)
+    """
+    path = Path(output_file)
+    codec = output_codec(path)
+    
+    if codec == 'zstd' and not ZSTD_AVAILABLE:
+        fallback = path.with_suffix('.gz')
+        logger.warning(
+            f"zstandard not installed, writing gzip output instead: {fallback}"
+        )
+        return fallback, 'gzip'
+    
+    return path, codec
+
+
+def open_compressed_sink(
+    output_file: str,
+    codec: str,
+    level: int = 3,
+    append: bool = False
+) -> BinaryIO:
+    """
+    Open a binary stream that compresses everything written to it
+    
+    Appending adds a new zstd frame / gzip member, which both formats
+    decompress as one continuous stream.
+    
+    Args:
+        output_file: Path to output file
+        codec: 'zstd' or 'gzip'
+        level: Compression level (zstd: 1-22, gzip: 1-9)
+        append: Append to an existing file instead of truncating it
+        
+    Returns:
+        BinaryIO: Writable stream; closing it finishes the frame and file
+    """
+    mode = 'ab' if append else 'wb'
+    if codec == 'zstd':
+        raw = open(output_file, mode)
+        return zstd.ZstdCompressor(level=level).stream_writer(raw)
+    if codec == 'gzip':
+        return gzip.open(output_file, mode, compresslevel=max(1, min(9, level)))
+    raise ValueError(f"Unsupported output codec: {codec}")
+
+
+class BackgroundWriter:
+    """
+    Drains pre-encoded byte buffers into a binary sink on a dedicated thread
+    
+    The producer only hands over buffers; compression and disk I/O run on
+    the writer thread. At most `max_pending` buffers are queued, so memory
+    stays bounded and a sink slower than the producer applies backpressure
+    instead of growing the queue.
+    """
+    
+    _SENTINEL = None
+    
+    def __init__(
+        self,
+        sink: BinaryIO,
+        max_pending: int = 8,
+        name: str = 'output-writer',
+        timers: Optional[StageTimers] = None
+    ):
+        """
+        Initialize background writer and start its thread
+        
+        Args:
+            sink: Binary stream to write into (closed by close())
+            max_pending: Maximum number of queued buffers
+            name: Thread name
+            timers: Charge sink writes (compression + I/O) to stage 'sink_write'
+        """
+        self.sink = sink
+        self.timers = timers
+        self.bytes_written = 0
+        self.buffers_written = 0
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def submit(self, data: bytes, after: Optional[Callable[[], None]] = None):
+        """
+        Queue a buffer for writing
+        
+        Args:
+            data: Encoded bytes (may be empty when only after is needed)
+            after: Called on the writer thread once data is written
+        """
+        if self._error is not None:
+            raise IOError(f"Background writer failed: {self._error}") from self._error
+        if data or after is not None:
+            self._queue.put((data, after))
+    
+    @property
+    def pending(self) -> int:
+        """Buffers currently queued"""
+        return self._queue.qsize()
+    
+    def _run(self):
+        """Writer thread main loop"""
+        while True:
+            item = self._queue.get()
+            if item is self._SENTINEL:
+                break
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a dead writer
+                continue
+            data, after = item
+            try:
+                if data:
+                    start = perf_counter_ns()
+                    self.sink.write(data)
+                    if self.timers:
+                        self.timers.add('sink_write', perf_counter_ns() - start)
+                    self.bytes_written += len(data)
+                    self.buffers_written += 1
+                if after is not None:
+                    after()
+            except BaseException as e:  # surfaced from submit()/close()
+                logger.error(f"Background write error: {e}")
+                self._error = e
+    
+    def close(self):
+        """Drain pending buffers, close the sink and re-raise any write error"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+        
+        try:
+            self.sink.close()
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+        
+        if self._error is not None:
+            raise IOError(f"Background writer failed: {self._error}") from self._error
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 
 class Analytics:
@@ -130,11 +706,33 @@ class Analytics:
             'errors': 0,
             'processing_time_seconds': 0.0
         }
+        self.stages = StageTimers()
+        self.corpus: Optional[CorpusSketch] = None
     
     def update(self, **kwargs):
         """Update metrics"""
         self.metrics.update(kwargs)
     
+    def add_stage_timings(self, timers: StageTimers):
+        """
+        Merge per-stage timings (reader, reducer, processor, writer)
+        
+        Args:
+            timers: Timings collected during processing
+        """
+        self.stages.merge(timers)
+    
+    def add_corpus_stats(self, sketch: CorpusSketch):
+        """
+        Merge corpus statistics sketches (top tokens, distinct tokens, stop-words)
+        
+        Args:
+            sketch: Sketch built by the reducers of a run
+        """
+        if self.corpus is None:
+            self.corpus = sketch.empty_copy()
+        self.corpus.merge(sketch)
+    
     def finalize(self):
         """Calculate final metrics"""
         self.metrics['end_time'] = datetime.now()
@@ -179,7 +777,7 @@ class Analytics:
     
     def to_dict(self) -> Dict:
         """Export as dictionary"""
-        return {
+        data = {
             'name': self.name,
             'start_time': self.metrics['start_time'].isoformat(),
             'end_time': self.metrics['end_time'].isoformat() if self.metrics['end_time'] else None,
@@ -188,14 +786,42 @@ class Analytics:
             'total_chunks': self.metrics['total_chunks'],
             'reduction_percent': self.metrics['reduction_percent'],
             'errors': self.metrics['errors'],
-            'processing_time_seconds': self.metrics['processing_time_seconds']
+            'processing_time_seconds': self.metrics['processing_time_seconds'],
+            'stages': self.stages.to_dict()
         }
+        if self.corpus is not None:
+            data['corpus'] = self.corpus.to_dict()
+        return data
     
     def save_to_json(self, filepath: str):
         """Save metrics to JSON file"""
         with open(filepath, 'w') as f:
             json.dump(self.to_dict(), f, indent=2)
         logger.info(f"Analytics saved to: {filepath}")
+    
+    def to_prometheus(self) -> str:
+        """Export metrics and stage timings in Prometheus text format"""
+        return format_prometheus(
+            stages=self.stages.to_dict(),
+            gauges={
+                'input_bytes': self.metrics['total_input_bytes'],
+                'output_bytes': self.metrics['total_output_bytes'],
+                'chunks': self.metrics['total_chunks'],
+                'errors': self.metrics['errors'],
+                'reduction_percent': self.metrics['reduction_percent'],
+                'processing_seconds': self.metrics['processing_time_seconds']
+            },
+            labels={'job': self.name}
+        )
+    
+    def save_to_prometheus(self, filepath: str):
+        """Save metrics to a Prometheus text-format file (node_exporter textfile collector)"""
+        tmp = f"{filepath}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        # Atomic swap so a scraper never reads a partial file
+        os.replace(tmp, filepath)
+        logger.info(f"Prometheus metrics saved to: {filepath}")
 
 
 # ============================================
@@ -261,6 +887,130 @@ def print_comparison(input_file: str, output_file: str):
         logger.error(f"Comparison error: {e}")
 
 
+def benchmark_writer(
+    output_dir: str = '/tmp',
+    num_records: int = 2_000_000,
+    record: str = 'reduced sample record with a few tokens'
+) -> Dict:
+    """
+    Compare OutputWriter throughput with raw sequential disk writes
+    
+    Measures per-record write() and batched write_many() (10k records
+    per call) against writing the same bytes in 4MB blocks.
+    
+    Args:
+        output_dir: Directory for the benchmark files
+        num_records: Number of small records to write
+        record: Record text
+        
+    Returns:
+        dict: Raw and OutputWriter throughput in MB/s
+    """
+    raw_path = Path(output_dir) / 'bench_raw.txt'
+    writer_path = Path(output_dir) / 'bench_writer.txt'
+    line = (record + '\n').encode('utf-8')
+    total_mb = len(line) * num_records / 1024 / 1024
+    
+    def timed_writer(batch_size: int) -> float:
+        if writer_path.exists():
+            writer_path.unlink()
+        start = time.perf_counter()
+        writer = OutputWriter(str(writer_path))
+        if batch_size == 1:
+            for _ in range(num_records):
+                writer.write(record)
+        else:
+            batch = [record] * batch_size
+            for _ in range(num_records // batch_size):
+                writer.write_many(batch)
+        writer.close()
+        # fsync applies to the file, so a fresh descriptor syncs the writer's data
+        fd = os.open(writer_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return time.perf_counter() - start
+    
+    if raw_path.exists():
+        raw_path.unlink()
+    
+    # Baseline: same bytes in 4MB blocks, fsync included for both
+    block = line * max(1, (4 * 1024 * 1024) // len(line))
+    start = time.perf_counter()
+    with open(raw_path, 'wb') as f:
+        remaining = len(line) * num_records
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+        f.flush()
+        os.fsync(f.fileno())
+    raw_seconds = time.perf_counter() - start
+    
+    write_seconds = timed_writer(1)
+    batch_seconds = timed_writer(10_000)
+    
+    raw_path.unlink()
+    writer_path.unlink()
+    
+    return {
+        'records': num_records,
+        'size_mb': total_mb,
+        'raw_mbps': total_mb / raw_seconds,
+        'write_mbps': total_mb / write_seconds,
+        'write_records_per_sec': num_records / write_seconds,
+        'write_many_mbps': total_mb / batch_seconds,
+        'write_many_records_per_sec': num_records / batch_seconds
+    }
+
+
+def benchmark_serializers(num_records: int = 500_000) -> Dict:
+    """
+    Compare batched JSONL/CSV serialization with the previous per-record code
+    
+    Serializes in memory only, so the numbers isolate encoding cost.
+    
+    Args:
+        num_records: Records per format
+        
+    Returns:
+        dict: Records/second for legacy and batched serializers
+    """
+    rows = [
+        (f"reduced record {i} with şöme tokens", {'chunk': i, 'source': 'bench'})
+        for i in range(num_records)
+    ]
+    
+    def legacy_json(data, metadata):
+        obj = {'text': data}
+        if metadata:
+            obj.update(metadata)
+        return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+    
+    def legacy_csv(data, metadata):
+        # Previous hand-rolled quoting (metadata was dropped)
+        escaped = data.replace('"', '""')
+        return f'"{escaped}"\n'.encode('utf-8')
+    
+    def rate(fn) -> float:
+        start = time.perf_counter()
+        fn()
+        return num_records / (time.perf_counter() - start)
+    
+    columns = list(rows[0][1])
+    text_only = [(d, None) for d, _ in rows]
+    
+    return {
+        'records': num_records,
+        'orjson': ORJSON_AVAILABLE,
+        'json_legacy_rps': rate(lambda: b''.join(legacy_json(d, m) for d, m in rows)),
+        'json_batch_rps': rate(lambda: encode_jsonl_batch(rows)),
+        'csv_legacy_rps': rate(lambda: b''.join(legacy_csv(d, m) for d, m in rows)),
+        'csv_batch_rps': rate(lambda: encode_csv_batch(rows, columns)),
+        'csv_batch_text_only_rps': rate(lambda: encode_csv_batch(text_only, [])),
+    }
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     
@@ -294,3 +1044,8 @@ if __name__ == '__main__':
     )
     analytics.finalize()
     print(analytics.get_summary())
+    
+    # Benchmark: python writer.py bench
+    if 'bench' in sys.argv[1:]:
+        print(benchmark_writer())
+        print(benchmark_serializers())
@@ -0,0 +1,8 @@
+"""
+Shared fixtures for the Python utilities in src/utils
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
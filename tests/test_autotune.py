@@ -0,0 +1,84 @@
+"""
+Tests for calibration-based autotuning of workers and chunk size
+"""
+
+import importlib
+from multiprocessing import cpu_count
+
+import pytest
+
+from utils.autotune import autotune, default_worker_candidates
+from utils.processor import ParallelProcessor
+
+
+def _write_input(path, lines=400):
+    """Non-ASCII input, so characters and bytes differ"""
+    path.write_text(''.join(
+        f"Çok güzel satır {i}: the ünïcode line is here\n" for i in range(lines)
+    ), encoding='utf-8')
+    return path
+
+
+def _tune(tmp_path, **options):
+    """Calibrate one worker count on tmp_path/in.txt with a private cache"""
+    options.setdefault('worker_candidates', [1])
+    options.setdefault('chunk_candidates', [10, 50])
+    return autotune(
+        str(tmp_path / 'in.txt'), cache_file=str(tmp_path / 'autotune.json'), **options
+    )
+
+
+def test_default_worker_candidates():
+    """Candidates run from a quarter of the CPUs up to all of them"""
+    candidates = default_worker_candidates()
+    assert candidates == sorted(set(candidates))
+    assert candidates[0] == max(1, cpu_count() // 4) and candidates[-1] == cpu_count()
+    assert max(1, cpu_count() // 2) in candidates
+
+
+def test_sample_size_is_counted_in_bytes(tmp_path):
+    """Throughput uses UTF-8 bytes: a small input is sampled whole"""
+    source = _write_input(tmp_path / 'in.txt')
+    result = _tune(tmp_path, use_cache=False)
+
+    assert result['sample_mb'] * 1024 * 1024 == pytest.approx(source.stat().st_size)
+    assert len(result['trials']) == 2
+    assert result['max_lines_per_chunk'] in (10, 50) and result['num_workers'] == 1
+
+
+def test_cache_is_keyed_on_inputs(tmp_path):
+    """Same settings hit the cache; other candidates or budgets recalibrate"""
+    _write_input(tmp_path / 'in.txt')
+    first = _tune(tmp_path)
+    assert _tune(tmp_path)['tuned_at'] == first['tuned_at']
+    assert _tune(tmp_path, chunk_candidates=[20])['max_lines_per_chunk'] == 20
+
+    # Another budget is another cache entry
+    tight = _tune(tmp_path, memory_budget_mb=1)
+    assert tight['tuned_at'] != first['tuned_at']
+    assert not any(trial['within_budget'] for trial in tight['trials'])
+
+
+def test_explicit_settings_win(tmp_path, monkeypatch):
+    """Autotuning only fills values the caller did not pass"""
+    # utils.autotune is also the name of the re-exported function
+    module = importlib.import_module('utils.autotune')
+    monkeypatch.setattr(module, 'AUTOTUNE_CACHE_FILE', tmp_path / 'autotune.json')
+    source = _write_input(tmp_path / 'in.txt')
+
+    tuned = ParallelProcessor(str(source), str(tmp_path / 'a.txt'), autotune=True, verbose=False)
+    assert tuned.num_workers == tuned.autotune_result['num_workers']
+    assert tuned.max_lines_per_chunk == tuned.autotune_result['max_lines_per_chunk']
+
+    explicit = ParallelProcessor(
+        str(source), str(tmp_path / 'b.txt'), num_workers=3, max_lines_per_chunk=7,
+        autotune=True, verbose=False
+    )
+    assert (explicit.num_workers, explicit.max_lines_per_chunk) == (3, 7)
+
+    # None is an explicit value too (one line per chunk)
+    unchunked = ParallelProcessor(
+        str(source), str(tmp_path / 'c.txt'), max_lines_per_chunk=None,
+        autotune=True, verbose=False
+    )
+    assert unchunked.max_lines_per_chunk is None
@@ -0,0 +1,747 @@
+"""
+Round-trip tests for block-parallel compression, the seekable format,
+the incremental manifest and the adaptive level controller
+"""
+
+import builtins
+import gzip
+import io
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+zstd = pytest.importorskip('zstandard')
+
+from utils.compressor import (  # noqa: E402  pylint: disable=wrong-import-position
+    CompressionConfig,
+    CompressionManifest,
+    LevelController,
+    ParallelCompressor,
+    ParallelDecompressor,
+    SEEK_TABLE_FOOTER_SIZE,
+    STORE_LEVEL,
+    SeekableZstdReader,
+    StreamingCompressor,
+    decompress_file,
+    decompress_main,
+    file_record,
+    iter_files,
+    plan_tasks,
+    probe_compressibility,
+    read_seek_table,
+    scan_files,
+    write_seek_table,
+)
+
+KB = 1024
+
+
+def _write_text(path, size, seed=0):
+    """Compressible, non-repeating text of exactly size bytes"""
+    rng = random.Random(seed)
+    words = [
+        ''.join(rng.choice('abcdefghij') for _ in range(rng.randint(2, 8)))
+        for _ in range(500)
+    ]
+    parts, total = [], 0
+    while total < size:
+        line = ' '.join(rng.choice(words) for _ in range(12)) + '\n'
+        parts.append(line)
+        total += len(line)
+    data = ''.join(parts).encode('ascii')[:size]
+    path.write_bytes(data)
+    return data
+
+
+def _config(tmp_path, **overrides):
+    """Two workers, every file eligible, outputs and error log under tmp_path"""
+    options = {
+        'num_workers': 2,
+        'min_file_size': 1,
+        'output_dir': str(tmp_path / 'out'),
+        'error_log_file': str(tmp_path / 'errors.log'),
+    }
+    options.update(overrides)
+    return CompressionConfig(**options)
+
+
+def _result_for(report, path):
+    return next(r for r in report['results'] if r['input_file'] == str(path))
+
+
+# ============================================
+# Hash while compressing
+# ============================================
+
+@pytest.mark.parametrize('codec', ['zstd', 'gzip'])
+def test_original_is_hashed_while_compressing(tmp_path, monkeypatch, codec):
+    """The source is read once; its digest is verified and restores the file"""
+    xxhash = pytest.importorskip('xxhash')
+    source = tmp_path / 'app.log'
+    data = _write_text(source, 300 * KB)
+    compressor = StreamingCompressor(_config(tmp_path))
+    compressor.use_zstd = codec == 'zstd'
+    output = tmp_path / ('app.log.zst' if compressor.use_zstd else 'app.log.gz')
+
+    opened = []
+
+    def counting_open(file, *args, **kwargs):
+        opened.append(Path(file))
+        return builtins.open(file, *args, **kwargs)
+
+    monkeypatch.setattr('utils.compressor.open', counting_open, raising=False)
+    result = compressor.compress_file(source, output)
+    monkeypatch.undo()
+
+    assert result['success'] and result['checksum_verified']
+    assert opened.count(source) == 1
+    assert result['checksum_original'] == xxhash.xxh64(data).hexdigest()
+    if codec == 'gzip':
+        assert gzip.decompress(output.read_bytes()) == data
+    else:
+        with open(output, 'rb') as f:
+            assert zstd.ZstdDecompressor().stream_reader(f).read() == data
+
+    restored = decompress_file(output, tmp_path / 'restored.log', _config(tmp_path), result)
+    assert restored['success'] and restored['checksum_verified'] is True
+
+
+def test_stored_digest_detects_corrupt_output(tmp_path):
+    """A damaged archive fails against the digest taken while compressing"""
+    source = tmp_path / 'app.log'
+    _write_text(source, 300 * KB)
+    output = tmp_path / 'app.log.zst'
+    result = StreamingCompressor(_config(tmp_path)).compress_file(source, output)
+    assert result['success']
+
+    damaged = bytearray(output.read_bytes())
+    damaged[len(damaged) // 2] ^= 0xFF
+    output.write_bytes(bytes(damaged))
+    restored = decompress_file(output, tmp_path / 'restored.log', _config(tmp_path), result)
+    assert not restored['success'] and restored['checksum_verified'] is not True
+    assert not (tmp_path / 'restored.log').exists()
+
+
+# ============================================
+# plan_tasks
+# ============================================
+
+def test_plan_tasks_splits_files_above_fair_share(tmp_path):
+    """Files above their fair share become block tasks; small files stay whole"""
+    big, small = tmp_path / 'big', tmp_path / 'small'
+    tasks = plan_tasks([(big, 10 * KB + 1), (small, 3 * KB)], num_workers=2, block_size=4 * KB)
+
+    blocks = [task for task in tasks if task[0] == big]
+    assert [(offset, length) for _, offset, length, _ in sorted(blocks, key=lambda t: t[1])] == [
+        (0, 4 * KB), (4 * KB, 4 * KB), (8 * KB, 2 * KB + 1)
+    ]
+    assert {count for _, _, _, count in blocks} == {3}
+    assert [task for task in tasks if task[0] == small] == [(small, 0, 3 * KB, 0)]
+
+
+def test_plan_tasks_largest_first():
+    """Tasks are scheduled largest first and cover every byte"""
+    files = [('a', 5 * KB), ('b', 30 * KB), ('c', 9 * KB)]
+    tasks = plan_tasks(files, num_workers=4, block_size=4 * KB)
+    lengths = [length for _, _, length, _ in tasks]
+    assert lengths == sorted(lengths, reverse=True)
+    assert sum(lengths) == sum(size for _, size in files)
+
+
+@pytest.mark.parametrize('block_size', [0, 64 * KB])
+def test_plan_tasks_keeps_files_whole(block_size):
+    """Files stay whole when splitting is off (0) or they span fewer than two blocks"""
+    tasks = plan_tasks([('a', 100 * KB)], num_workers=8, block_size=block_size)
+    assert tasks == [('a', 0, 100 * KB, 0)]
+
+
+# ============================================
+# Directory scan
+# ============================================
+
+def _scan_tree(tmp_path):
+    """Tree of 3 levels with sized files of mixed extensions"""
+    root = tmp_path / 'tree'
+    sizes = {}
+    for depth, name in enumerate(['', 'a', 'a/b', 'c']):
+        directory = root / name
+        directory.mkdir(parents=True, exist_ok=True)
+        for i, ext in enumerate(['.log', '.LOG', '.txt', '.gz']):
+            path = directory / f'file{i}{ext}'
+            path.write_bytes(b'x' * (100 * (depth + 1) + i))
+            sizes[str(path)] = path.stat().st_size
+    return root, sizes
+
+
+@pytest.mark.parametrize('options, keep', [
+    ({}, lambda path, size: True),
+    ({'min_size': 200, 'max_size': 400}, lambda path, size: 200 <= size < 400),
+    ({'include_extensions': ['.log']}, lambda path, size: path.lower().endswith('.log')),
+])
+def test_scan_files_filters(tmp_path, options, keep):
+    """Extension and size filters match a plain walk; results come largest first"""
+    root, sizes = _scan_tree(tmp_path)
+    options.setdefault('exclude_extensions', ['.gz'])
+    records = scan_files(root, num_threads=3, **options)
+
+    expected = {
+        path for path, size in sizes.items() if keep(path, size) and not path.endswith('.gz')
+    }
+    assert {record.path for record in records} == expected
+    assert [record.size for record in records] == sorted(
+        (record.size for record in records), reverse=True
+    )
+    for record in records:
+        st = os.stat(record.path)
+        assert (record.size, record.mtime_ns, record.inode) == (
+            st.st_size, st.st_mtime_ns, st.st_ino
+        )
+
+
+def test_scan_does_not_follow_directory_symlinks(tmp_path):
+    """A symlink loop is listed once, like os.walk"""
+    root, sizes = _scan_tree(tmp_path)
+    (root / 'a' / 'loop').symlink_to(root, target_is_directory=True)
+    records = scan_files(root, exclude_extensions=[], num_threads=2)
+    assert sorted(record.path for record in records) == sorted(sizes)
+
+
+def test_iter_files_stops_early(tmp_path):
+    """Closing the generator cancels the rest of the scan and joins its threads"""
+    root, _ = _scan_tree(tmp_path)
+    for i in range(40):
+        (root / f'dir{i}').mkdir()
+        (root / f'dir{i}' / 'f.log').write_bytes(b'x')
+    files = iter_files(root, num_threads=2)
+    first = next(files)
+    files.close()
+
+    assert Path(first.path).is_file()
+    assert not any(t.name.startswith('ThreadPoolExecutor') for t in threading.enumerate())
+
+
+def _compressed_outputs(directory):
+    """Decompressed contents of every .zst file under directory, by relative path"""
+    outputs = {}
+    for path in directory.rglob('*.zst'):
+        with open(path, 'rb') as f:
+            reader = zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            outputs[str(path.relative_to(directory))] = reader.read()
+    return outputs
+
+
+def test_streaming_run_matches_listed_run(tmp_path):
+    """Compressing while scanning gives the outputs of a listed run, results via JSONL"""
+    source_dir = tmp_path / 'src'
+    (source_dir / 'nested').mkdir(parents=True)
+    originals = {'big.log': _write_text(source_dir / 'big.log', 200 * KB)}
+    for i in range(6):
+        name = f'nested/file-{i}.log'
+        originals[name] = _write_text(source_dir / name, (10 + i) * KB, seed=i)
+
+    listed = ParallelCompressor(
+        _config(tmp_path, output_dir=str(tmp_path / 'listed'), block_size=64 * KB)
+    ).compress_directory(str(source_dir))
+    results_file = tmp_path / 'results.jsonl'
+    streamed = ParallelCompressor(_config(
+        tmp_path, output_dir=str(tmp_path / 'streamed'), block_size=64 * KB,
+        streaming=True, results_file=str(results_file)
+    )).compress_directory(str(source_dir))
+
+    assert streamed['summary']['successful'] == listed['summary']['successful'] == 7
+    assert _compressed_outputs(tmp_path / 'streamed') == _compressed_outputs(tmp_path / 'listed')
+    assert sorted(_compressed_outputs(tmp_path / 'streamed').values()) == sorted(originals.values())
+
+    # Results went to the JSONL file, not into the report
+    assert not streamed['results'] and streamed['results_file'] == str(results_file)
+    lines = [json.loads(line) for line in results_file.read_text(encoding='utf-8').splitlines()]
+    assert sorted(Path(r['input_file']).name for r in lines) == sorted(
+        Path(name).name for name in originals
+    )
+    big = next(r for r in lines if r['input_file'].endswith('big.log'))
+    assert big['blocks'] == 4 and big['checksum_verified']
+
+
+# ============================================
+# Block assembly
+# ============================================
+
+def test_block_compression_round_trip(tmp_path):
+    """A block-compressed file restores with any zstd reader and with the decompressor"""
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    source = source_dir / 'big.log'
+    data = _write_text(source, 300 * KB + 17)
+
+    config = _config(tmp_path, block_size=64 * KB)
+    report = ParallelCompressor(config).compress_files([str(source)])
+    result = _result_for(report, source)
+
+    assert result['success'] and result['blocks'] == 5
+    assert result['checksum_verified']
+    assert result['checksum_blocks'] and 'checksum_original' not in result
+    # Blocks are independent frames: any zstd reader restores the file
+    with open(result['output_file'], 'rb') as f:
+        assert zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True).read() == data
+
+    report_file = tmp_path / 'report.json'
+    report_file.write_text(json.dumps(report))
+    restore_dir = tmp_path / 'restored'
+    restored = ParallelDecompressor(
+        _config(tmp_path, output_dir=str(restore_dir)), str(report_file)
+    ).decompress_files([result['output_file']])
+
+    entry = restored['results'][0]
+    assert entry['success'] and entry['checksum_verified'] is True
+    assert (restore_dir / 'big.log').read_bytes() == data
+
+
+def test_block_restore_detects_corruption(tmp_path):
+    """A wrong block checksum fails the restore and leaves no output"""
+    source = tmp_path / 'big.log'
+    _write_text(source, 200 * KB)
+    report = ParallelCompressor(_config(tmp_path, block_size=64 * KB)).compress_files([str(source)])
+    result = _result_for(report, source)
+
+    # Same sizes, different content: only the block checksum can tell
+    result['checksum_blocks'] = '0' * len(result['checksum_blocks'])
+    report_file = tmp_path / 'report.json'
+    report_file.write_text(json.dumps(report))
+    restored = ParallelDecompressor(
+        _config(tmp_path, output_dir=str(tmp_path / 'restored')), str(report_file)
+    ).decompress_files([result['output_file']])
+
+    entry = restored['results'][0]
+    assert not entry['success'] and entry['checksum_verified'] is False
+    assert not (tmp_path / 'restored' / 'big.log').exists()
+
+
+# ============================================
+# Dictionary compression
+# ============================================
+
+def test_small_files_dictionary_round_trip(tmp_path, monkeypatch):
+    """Dictionary-compressed small files restore, with or without a report"""
+    source_dir = tmp_path / 'small'
+    source_dir.mkdir()
+    originals = {}
+    for i in range(200):
+        path = source_dir / f'event-{i}.json'
+        path.write_text(json.dumps({'id': i, 'level': 'info', 'message': f'request {i} served'}))
+        originals[path.name] = path.read_bytes()
+
+    # Relative input, outputs next to the originals
+    monkeypatch.chdir(tmp_path)
+    config = _config(tmp_path, output_dir=None, min_file_size=64 * KB, dictionary_size=4 * KB)
+    report = ParallelCompressor(config).compress_small_files('small')
+    dictionary = Path(report['dictionary']['file'])
+    assert dictionary.is_absolute() and dictionary.parent == source_dir
+    assert report['summary']['successful'] == 200
+
+    # A second run does not take the saved dictionary for input
+    for output in source_dir.glob('*.zst'):
+        output.unlink()
+    report = ParallelCompressor(config).compress_small_files('small')
+    assert not any(r['input_file'].endswith('.dict') for r in report['results'])
+
+    # Moved archives without a report: found by the frame's dictionary ID
+    moved = tmp_path / 'moved'
+    moved.mkdir()
+    for path in list(source_dir.glob('*.zst')) + [Path(report['dictionary']['file'])]:
+        path.rename(moved / path.name)
+    restored = ParallelDecompressor(
+        _config(tmp_path, output_dir=str(tmp_path / 'restored'))
+    ).decompress_directory(str(moved))
+    assert restored['summary']['successful'] == 200
+    for name, data in originals.items():
+        assert (tmp_path / 'restored' / name).read_bytes() == data
+
+
+def test_dictionary_baseline_measured_by_workers(tmp_path):
+    """The dictionary-less baseline comes from the workers, before originals are deleted"""
+    source_dir = tmp_path / 'small'
+    source_dir.mkdir()
+    for i in range(600):
+        (source_dir / f'event-{i}.json').write_text(json.dumps(
+            {'id': i, 'level': 'info', 'service': 'api', 'message': f'request {i} served'}
+        ))
+
+    config = _config(
+        tmp_path, min_file_size=64 * KB, dictionary_size=4 * KB, delete_original=True
+    )
+    report = ParallelCompressor(config).compress_small_files(str(source_dir))
+    sample = [r for r in report['results'] if 'baseline_size' in r]
+    assert len(sample) == 500 and report['summary']['successful'] == 600
+    assert not list(source_dir.glob('*.json'))
+
+    stats = report['dictionary']
+    baseline = sum(r['baseline_size'] for r in sample)
+    assert stats['size_factor_sample'] == baseline / sum(r['compressed_size'] for r in sample)
+    assert stats['size_factor_sample'] > 1 and stats['ratio_gain_points'] > 0
+
+
+# ============================================
+# Seek table and SeekableZstdReader
+# ============================================
+
+@pytest.mark.parametrize('frames', [
+    [(10, 100, 1), (20, 200, 2), (30, 300, 0xFFFFFFFF)],
+    [(10, 100, None), (20, 200, None)],
+    [],
+])
+def test_seek_table_round_trip(frames):
+    """Seek tables read back as written, with or without frame checksums"""
+    buffer = io.BytesIO(b'frame data')
+    buffer.seek(0, os.SEEK_END)
+    write_seek_table(buffer, frames)
+    assert read_seek_table(buffer) == frames
+
+
+def test_seek_table_missing():
+    """Data without a seek table footer is rejected"""
+    with pytest.raises(ValueError):
+        read_seek_table(io.BytesIO(b'\0' * 64))
+
+
+def test_seekable_reader_random_access(tmp_path):
+    """Random reads match the original and decompress only the frames they touch"""
+    source = tmp_path / 'app.log'
+    data = _write_text(source, 200 * KB + 5)
+    config = _config(tmp_path, seekable=True, seekable_frame_size=16 * KB, block_size=64 * KB)
+    result = _result_for(ParallelCompressor(config).compress_files([str(source)]), source)
+    assert result['success'] and result['seekable_frames'] == 13
+
+    with SeekableZstdReader(result['output_file']) as f:
+        assert f.size == len(data)
+        rng = random.Random(1)
+        for _ in range(50):
+            start = rng.randrange(len(data))
+            length = rng.randrange(40 * KB)
+            f.seek(start)
+            assert f.read(length) == data[start:start + length]
+
+        f.seek(-100, os.SEEK_END)
+        before = f.frames_decompressed
+        assert f.read() == data[-100:]
+        assert f.frames_decompressed - before <= 1
+
+        f.seek(0)
+        assert f.read() == data
+
+
+def test_seekable_reader_rejects_plain_zstd(tmp_path):
+    """A regular zstd file is not mistaken for the seekable format"""
+    path = tmp_path / 'plain.zst'
+    path.write_bytes(zstd.ZstdCompressor().compress(b'x' * 1000))
+    with pytest.raises(ValueError):
+        SeekableZstdReader(str(path))
+
+
+def test_seekable_single_stream_line_access(tmp_path):
+    """A seekable file from compress_file reads as text from any offset"""
+    source = tmp_path / 'app.log'
+    data = _write_text(source, 100 * KB)
+    output = tmp_path / 'app.log.zst'
+    config = _config(tmp_path, seekable=True, seekable_frame_size=8 * KB)
+    result = StreamingCompressor(config).compress_file(source, output)
+    assert result['success'] and result['checksum_verified']
+    assert result['seekable_frames'] == 13
+
+    middle = data.index(b'\n', 50 * KB) + 1
+    with SeekableZstdReader(str(output)) as raw:
+        raw.seek(middle)
+        lines = io.TextIOWrapper(io.BufferedReader(raw), encoding='ascii')
+        assert lines.readline() == data[middle:data.index(b'\n', middle) + 1].decode('ascii')
+
+
+def test_seekable_frame_checksum_mismatch(tmp_path):
+    """A frame that does not match its seek table checksum is not returned"""
+    source = tmp_path / 'app.log'
+    data = _write_text(source, 40 * KB)
+    output = tmp_path / 'app.log.zst'
+    config = _config(tmp_path, seekable=True, seekable_frame_size=16 * KB)
+    StreamingCompressor(config).compress_file(source, output)
+
+    with open(output, 'rb') as f:
+        frames = read_seek_table(f)
+    assert all(checksum is not None for _, _, checksum in frames)
+    body = output.read_bytes()
+    # Skippable frame header, one 12-byte entry per frame, footer
+    body = body[:len(body) - 8 - len(frames) * 12 - SEEK_TABLE_FOOTER_SIZE]
+    frames[1] = (frames[1][0], frames[1][1], frames[1][2] ^ 1)
+    with open(output, 'wb') as f:
+        f.write(body)
+        write_seek_table(f, frames)
+
+    with SeekableZstdReader(str(output)) as f:
+        assert f.read(16 * KB) == data[:16 * KB]
+        with pytest.raises(IOError):
+            f.read(1)
+    with SeekableZstdReader(str(output), verify_checksums=False) as f:
+        assert f.read() == data
+
+
+# ============================================
+# ParallelDecompressor
+# ============================================
+
+def _compressed_tree(tmp_path):
+    """Directory of .zst files from a compression run, one .gz file and the report"""
+    tree = tmp_path / 'tree'
+    (tree / 'nested').mkdir(parents=True)
+    originals = {}
+    for i, name in enumerate(['a.log', 'b.log', 'nested/c.log']):
+        originals[name] = _write_text(tree / name, (20 + 10 * i) * KB, seed=i)
+    compressor = ParallelCompressor(_config(tmp_path, output_dir=None, delete_original=True))
+    report = compressor.compress_directory(str(tree))
+    assert report['summary']['successful'] == 3 and not (tree / 'a.log').exists()
+
+    originals['d.txt'] = b'gzip member\n' * 1000
+    (tree / 'd.txt.gz').write_bytes(gzip.compress(originals['d.txt']))
+    report_file = tmp_path / 'report.json'
+    report_file.write_text(json.dumps(report))
+    return tree, originals, report_file
+
+
+def test_decompress_directory_verifies_report(tmp_path):
+    """Archives restore in place, checked against the report where it has them"""
+    tree, originals, report_file = _compressed_tree(tmp_path)
+    config = _config(tmp_path, output_dir=None, delete_original=True)
+    report = ParallelDecompressor(config, str(report_file)).decompress_directory(str(tree))
+
+    summary = report['summary']
+    assert summary['successful'] == 4 and summary['failed'] == 0
+    assert summary['verified'] == 3 and summary['unverified'] == 1
+    for name, data in originals.items():
+        assert (tree / name).read_bytes() == data
+    assert not list(tree.rglob('*.zst')) and not list(tree.rglob('*.gz'))
+
+
+def test_decompress_cli_reports_failures(tmp_path):
+    """The decompress subcommand exits non-zero and keeps no partial output on errors"""
+    tree, originals, report_file = _compressed_tree(tmp_path)
+    damaged = tree / 'b.log.zst'
+    damaged.write_bytes(damaged.read_bytes()[:-100])
+    restored = tmp_path / 'restored'
+
+    with pytest.raises(SystemExit) as exit_info:
+        decompress_main([
+            str(tree), '--report', str(report_file), '--output-dir', str(restored),
+            '--workers', '2', '--error-log', str(tmp_path / 'errors.log'),
+            '--json-report', str(tmp_path / 'restore.json')
+        ])
+    assert exit_info.value.code == 1
+
+    summary = json.loads((tmp_path / 'restore.json').read_text(encoding='utf-8'))['summary']
+    assert summary['successful'] == 3 and summary['failed'] == 1
+    assert sorted(path.name for path in restored.iterdir()) == ['a.log', 'c.log', 'd.txt']
+    assert (restored / 'c.log').read_bytes() == originals['nested/c.log']
+    assert 'b.log.zst' in (tmp_path / 'errors.log').read_text(encoding='utf-8')
+    assert damaged.exists()
+
+
+# ============================================
+# Manifest classification
+# ============================================
+
+@pytest.mark.parametrize('block_size', [0, 8 * KB])
+def test_manifest_classification(tmp_path, block_size):
+    """Manifest rows classify new, unchanged, touched, stale and modified files"""
+    source = tmp_path / 'data.log'
+    _write_text(source, 20 * KB)
+    manifest = CompressionManifest(str(tmp_path / 'manifest.sqlite'))
+
+    record = file_record(source)
+    assert manifest.classify(record) == 'new'
+    compressor = ParallelCompressor(_config(tmp_path, block_size=block_size))
+    report = compressor.compress_files([str(source)])
+    result = _result_for(report, source)
+    assert bool(result.get('blocks')) == bool(block_size)
+    manifest.record(result, record)
+    assert manifest.classify(file_record(source)) == 'unchanged'
+
+    # Rows are keyed by resolved path; outputs must be where this run writes them
+    link = tmp_path / 'link.log'
+    link.symlink_to(source)
+    assert manifest.classify(file_record(link), result['output_file']) == 'unchanged'
+    elsewhere = tmp_path / 'elsewhere' / 'data.log.zst'
+    assert manifest.classify(file_record(source), elsewhere) == 'stale_outputs'
+    link.unlink()
+
+    # Same content, new mtime: the checksum decides, then the stat is refreshed
+    os.utime(source, ns=(record.mtime_ns + 10**9, record.mtime_ns + 10**9))
+    assert manifest.classify(file_record(source)) == 'touched'
+    assert manifest.classify(file_record(source)) == 'unchanged'
+
+    # Output resized or gone
+    output = Path(result['output_file'])
+    compressed = output.read_bytes()
+    output.write_bytes(b'x')
+    assert manifest.classify(file_record(source)) == 'stale_outputs'
+    output.unlink()
+    assert manifest.classify(file_record(source)) == 'stale_outputs'
+    output.write_bytes(compressed)
+
+    # Same size, different content
+    data = bytearray(source.read_bytes())
+    data[0] ^= 1
+    source.write_bytes(bytes(data))
+    assert manifest.classify(file_record(source)) == 'modified'
+
+    source.write_bytes(bytes(data) + b'more')
+    assert manifest.classify(file_record(source)) == 'modified'
+    assert manifest.stats['new'] == 1 and manifest.stats['touched'] == 1
+    manifest.close()
+
+
+# ============================================
+# Compressibility probe
+# ============================================
+
+def _random_bytes(size, seed=0):
+    """Incompressible bytes (random.randbytes needs Python 3.9)"""
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, 'little')
+
+
+@pytest.mark.parametrize('kind, fast_ratio, decision, level', [
+    ('random', 0.80, 'skip', None),
+    ('text', 0.80, 'compress', 7),
+    ('text', 0.01, 'compress', 1),
+])
+def test_probe_decisions(tmp_path, kind, fast_ratio, decision, level):
+    """Random data is skipped; text compresses at level 1 above probe_fast_ratio"""
+    source = tmp_path / 'data.bin'
+    if kind == 'random':
+        source.write_bytes(_random_bytes(512 * KB))
+    else:
+        _write_text(source, 512 * KB)
+    config = _config(tmp_path, probe=True, compression_level=7, probe_fast_ratio=fast_ratio)
+    probe = probe_compressibility(source, 512 * KB, config)
+    assert (probe['decision'], probe['level']) == (decision, level)
+    assert probe['sampled_bytes'] == config.probe_blocks * config.probe_block_size
+
+
+def test_probe_skip_leaves_file_alone(tmp_path):
+    """A skipped file produces no output and counts at its original size"""
+    source = tmp_path / 'random.bin'
+    source.write_bytes(_random_bytes(256 * KB, seed=3))
+    result = StreamingCompressor(_config(tmp_path, probe=True)).compress_file(
+        source, tmp_path / 'random.bin.zst'
+    )
+    assert result['success'] and result['skipped'] and result['output_file'] is None
+    assert result['compressed_size'] == result['original_size'] == 256 * KB
+    assert not (tmp_path / 'random.bin.zst').exists()
+
+
+def test_probe_store_round_trip(tmp_path):
+    """Stored files use STORE_LEVEL, stay near their size and restore exactly"""
+    source = tmp_path / 'random.bin'
+    data = _random_bytes(256 * KB, seed=4)
+    source.write_bytes(data)
+    # Nothing is skipped: incompressible data takes the store path
+    config = _config(tmp_path, probe=True, probe_skip_ratio=2.0)
+    output = tmp_path / 'random.bin.zst'
+    result = StreamingCompressor(config).compress_file(source, output)
+
+    assert result['success'] and result['checksum_verified']
+    assert result['probe']['decision'] == 'store'
+    assert result['compression_level'] == STORE_LEVEL
+    assert len(data) <= output.stat().st_size <= len(data) + KB
+    with open(output, 'rb') as f:
+        assert zstd.ZstdDecompressor().stream_reader(f).read() == data
+
+
+# ============================================
+# LevelController
+# ============================================
+
+def _simulate(controller, base_mbps, tasks=200, task_mb=4):
+    """Feed tasks whose rate drops by RATE_STEP per level"""
+    for _ in range(tasks):
+        level = controller.next_level()
+        rate = base_mbps / LevelController.RATE_STEP ** (level - 1)
+        controller.observe(task_mb * 1024 * 1024, task_mb / rate, level)
+
+
+@pytest.mark.parametrize('start_level', [1, 3, 19])
+def test_level_controller_converges(start_level):
+    """From any start level the controller settles where the target rate is met"""
+    controller = LevelController(
+        num_workers=1, level=start_level, target_mbps=100,
+        sample_bytes=8 * 1024 * 1024
+    )
+    _simulate(controller, base_mbps=400)
+
+    # 400 / 1.3^(L-1) = 100  ->  L = 1 + log(4) / log(1.3) ~ 6.3
+    assert controller.level in (6, 7)
+    settled = [change for change in controller.changes if change['bytes_done'] > 400 * 1024 * 1024]
+    assert not settled
+
+
+def test_level_controller_respects_bounds():
+    """Unreachable targets pin the level to min_level / max_level"""
+    controller = LevelController(
+        num_workers=4, level=3, target_mbps=10_000, min_level=2, max_level=9,
+        sample_bytes=1024 * 1024
+    )
+    _simulate(controller, base_mbps=50, tasks=50)
+    assert controller.level == 2
+
+    controller = LevelController(
+        num_workers=4, level=3, target_mbps=1, min_level=2, max_level=9,
+        sample_bytes=1024 * 1024
+    )
+    _simulate(controller, base_mbps=500, tasks=50)
+    assert controller.level == 9
+
+
+def test_level_controller_needs_a_target():
+    """A controller without a throughput target or time budget is rejected"""
+    with pytest.raises(ValueError):
+        LevelController(num_workers=1, level=3)
+
+
+def test_level_controller_meets_time_budget(monkeypatch):
+    """With a time budget the level follows the rate still needed and the run fits it"""
+    clock = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+    total_mb = 800
+    controller = LevelController(
+        num_workers=1, level=1, time_budget_seconds=8, total_bytes=total_mb * 1024 * 1024,
+        sample_bytes=8 * 1024 * 1024
+    )
+    for _ in range(total_mb // 4):
+        level = controller.next_level()
+        seconds = 4 / (400 / LevelController.RATE_STEP ** (level - 1))
+        clock[0] += seconds
+        controller.observe(4 * 1024 * 1024, seconds, level)
+
+    # 800MB in 8s needs 100 MB/s: the level rises from 1 instead of idling
+    assert controller.level > 1 and controller.changes
+    assert clock[0] - 1000.0 <= 8 * 1.05
+
+
+def test_adaptive_level_in_report(tmp_path):
+    """A run with a throughput target reports the levels it used and still restores"""
+    source_dir = tmp_path / 'src'
+    source_dir.mkdir()
+    originals = {
+        f'file-{i}.log': _write_text(source_dir / f'file-{i}.log', 64 * KB, seed=i)
+        for i in range(8)
+    }
+    config = _config(tmp_path, target_mbps=10_000, block_size=0)
+    report = ParallelCompressor(config).compress_directory(str(source_dir))
+
+    adaptive = report['adaptive']
+    assert adaptive['target_mbps'] == 10_000
+    assert sum(adaptive['tasks_per_level'].values()) == len(originals)
+    for result in report['results']:
+        assert result['success'] and result['compression_level'] in adaptive['tasks_per_level']
+        with open(result['output_file'], 'rb') as f:
+            data = zstd.ZstdDecompressor().stream_reader(f).read()
+        assert data == originals[Path(result['input_file']).name]
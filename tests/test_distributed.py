@@ -0,0 +1,113 @@
+"""
+Tests for the multi-node coordinator / agent mode on a local cluster
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+from utils.distributed import RangeCoordinator, WorkerAgent, run_local_cluster
+from utils.processor import ParallelProcessor
+
+RANGE_SIZE = 16 * 1024
+
+
+@pytest.fixture(name='source')
+def source_fixture(tmp_path):
+    """Input of ~17 ranges whose lines are not multiples of a chunk apart"""
+    path = tmp_path / 'in.txt'
+    path.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i} and visits https://x.com\n"
+        for i in range(3000)
+    ), encoding='utf-8')
+    return path
+
+
+@pytest.fixture(name='local_tokens')
+def local_tokens_fixture(tmp_path, source):
+    """Tokens of a single-worker local run (one worker keeps input order)"""
+    output = tmp_path / 'local.txt'
+    ParallelProcessor(str(source), str(output), num_workers=1, verbose=False).process()
+    return output.read_text(encoding='utf-8').split()
+
+
+def _coordinator(tmp_path, source, **options):
+    """Started coordinator on a free localhost port"""
+    coordinator = RangeCoordinator(
+        str(source), str(tmp_path / 'out.txt'), port=0, range_size=RANGE_SIZE, **options
+    )
+    coordinator.start()
+    return coordinator
+
+
+def _output_tokens(coordinator):
+    """Tokens of the committed output"""
+    return coordinator.output_file.read_text(encoding='utf-8').split()
+
+
+class _KilledAgent(WorkerAgent):  # pylint: disable=too-few-public-methods
+    """Agent whose process is killed while it holds its first range"""
+
+    def _reduce_range(self, pool, reader, config, task, payload):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+class _SlowAgent(WorkerAgent):  # pylint: disable=too-few-public-methods
+    """Agent that holds its first range past the coordinator's task_timeout"""
+
+    delay = 1.5
+
+    def _reduce_range(self, pool, reader, config, task, payload):
+        time.sleep(self.delay)
+        return super()._reduce_range(pool, reader, config, task, payload)
+
+
+def _run_killed_agent(host, port):
+    """Process entry point of a _KilledAgent"""
+    _KilledAgent(host, port, num_workers=1, name='killed').run()
+
+
+def test_local_cluster_matches_local_run(tmp_path, source, local_tokens):
+    """Ranges are committed in input order, so the output equals a local run"""
+    output = tmp_path / 'cluster.txt'
+    stats = run_local_cluster(
+        str(source), str(output), num_agents=2, workers_per_agent=1, range_size=RANGE_SIZE
+    )
+
+    assert stats['ranges_committed'] == stats['total_ranges'] > 10
+    assert stats['retries'] == 0 and stats['errors'] == 0
+    assert output.read_text(encoding='utf-8').split() == local_tokens
+
+
+def test_killed_agent_range_is_requeued(tmp_path, source, local_tokens):
+    """The range of an agent that dies is handed to the next agent"""
+    coordinator = _coordinator(tmp_path, source)
+    killed = multiprocessing.Process(
+        target=_run_killed_agent, args=(coordinator.host, coordinator.port)
+    )
+    killed.start()
+    killed.join(timeout=30)
+    assert killed.exitcode == -signal.SIGKILL
+
+    WorkerAgent(coordinator.host, coordinator.port, num_workers=1, name='survivor').run()
+    stats = coordinator.wait(timeout=60)
+
+    assert stats['retries'] == 1
+    assert stats['agents'] == {'survivor': stats['total_ranges']}
+    assert _output_tokens(coordinator) == local_tokens
+
+
+def test_slow_agent_is_dropped_and_exits_cleanly(tmp_path, source, local_tokens):
+    """An agent past task_timeout loses its range and returns without raising"""
+    coordinator = _coordinator(tmp_path, source, task_timeout=0.5)
+    slow = _SlowAgent(coordinator.host, coordinator.port, num_workers=1, name='slow').run()
+    assert slow['disconnected'] and slow['ranges'] == 1
+
+    WorkerAgent(coordinator.host, coordinator.port, num_workers=1, name='fast').run()
+    stats = coordinator.wait(timeout=60)
+
+    assert stats['retries'] == 1 and 'slow' not in stats['agents']
+    assert _output_tokens(coordinator) == local_tokens
@@ -0,0 +1,107 @@
+"""
+Tests for stage timers, Prometheus export and live job metrics
+"""
+
+import json
+import pickle
+
+from utils.metrics import StageTimers, format_prometheus
+from utils.processor import ParallelProcessor
+
+
+def _write_input(path, lines=2000):
+    """Small text corpus with stop-words and a unique number per line"""
+    path.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i}\n" for i in range(lines)
+    ), encoding='utf-8')
+    return path
+
+
+def _prometheus_samples(text):
+    """Sample lines of an exposition text as {'name{labels}': value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+# ============================================
+# Stage timers
+# ============================================
+
+def test_timers_accumulate_calls_total_and_max():
+    """add() sums calls and time and keeps the slowest call"""
+    timers = StageTimers()
+    timers.add('read', 100)
+    timers.add('read', 300)
+    timers.add('write', 50, calls=5)
+
+    assert timers.stages == {'read': [2, 400, 300], 'write': [5, 50, 50]}
+    exported = timers.to_dict()
+    assert list(exported) == ['read', 'write']
+    assert exported['read']['mean_ms'] == 200 / 1e6
+    assert exported['read']['share_percent'] + exported['write']['share_percent'] == 100
+
+
+def test_drained_timings_merge_into_parent():
+    """Worker timings survive drain -> pickle -> add_many, and drain resets"""
+    worker, other, parent = StageTimers(), StageTimers(), StageTimers()
+    worker.add('clean', 10)
+    worker.add('clean', 30)
+    other.add('clean', 20)
+    other.add('tokenize', 5)
+
+    parent.add_many(pickle.loads(pickle.dumps(worker.drain())))
+    parent.merge(other)
+    assert not worker.stages
+    assert parent.stages == {'clean': [3, 60, 30], 'tokenize': [1, 5, 5]}
+
+
+def test_timed_iter_charges_each_item():
+    """timed_iter yields every item and counts one call per item"""
+    timers = StageTimers()
+    assert list(timers.timed_iter(iter('abc'), 'read')) == ['a', 'b', 'c']
+    assert timers.stages['read'][0] == 3
+
+
+def test_prometheus_format():
+    """Gauges, stage series and labels follow the exposition format"""
+    timers = StageTimers()
+    timers.add('read', 2_000_000_000)
+    text = format_prometheus(
+        stages=timers.to_dict(), gauges={'chunks': 4, 'skipped': None},
+        labels={'job': 'a "quoted" job'}
+    )
+
+    assert text.endswith('\n') and '# TYPE nexai_stage_seconds_total counter' in text
+    assert _prometheus_samples(text) == {
+        'nexai_chunks{job="a \\"quoted\\" job"}': 4.0,
+        'nexai_stage_seconds_total{job="a \\"quoted\\" job",stage="read"}': 2.0,
+        'nexai_stage_calls_total{job="a \\"quoted\\" job",stage="read"}': 1.0,
+        'nexai_stage_max_seconds{job="a \\"quoted\\" job",stage="read"}': 2.0,
+    }
+
+
+def test_run_saves_stage_timings(tmp_path):
+    """metrics_file saves JSON and Prometheus files that agree with the run stats"""
+    source = _write_input(tmp_path / 'in.txt')
+    stats = ParallelProcessor(
+        str(source), str(tmp_path / 'out.txt'), num_workers=2,
+        metrics_file=str(tmp_path / 'metrics.json'), verbose=False
+    ).process()
+
+    stages = stats['stages']
+    # The default background writer splits 'write' into a wait and the sink write
+    assert {'read', 'clean', 'tokenize', 'result_wait', 'write_wait', 'sink_write'} <= set(stages)
+    assert stages['clean']['calls'] == stats['total_chunks']
+
+    saved = json.loads((tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+    assert saved['total_chunks'] == stats['total_chunks']
+    assert set(saved['stages']) == set(stages)
+
+    samples = _prometheus_samples((tmp_path / 'metrics.prom').read_text(encoding='utf-8'))
+    assert samples['nexai_chunks{job="parallel_processor"}'] == stats['total_chunks']
+    assert samples['nexai_stage_calls_total{job="parallel_processor",stage="clean"}'] == \
+        stats['total_chunks']
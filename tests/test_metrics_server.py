@@ -0,0 +1,98 @@
+"""
+Tests for the live metrics HTTP endpoint and worker tracking
+"""
+
+import json
+import multiprocessing
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.metrics import MetricsServer, WorkerRegistry, report_worker, worker_status
+from utils.processor import ParallelProcessor
+
+
+def _get(server, path):
+    """Body of a GET request to a running MetricsServer"""
+    url = f"http://{server.host}:{server.port}{path}"
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode('utf-8')
+
+
+class _ScrapedProcessor(ParallelProcessor):
+    """Processor that scrapes its own endpoint once the pool is about to start"""
+
+    scraped = None
+
+    def _process_with_pool(self, chunks_generator):
+        self.scraped = (
+            json.loads(_get(self.metrics_server, '/metrics.json')),
+            _get(self.metrics_server, '/metrics')
+        )
+        return super()._process_with_pool(chunks_generator)
+
+
+def test_server_renders_snapshot():
+    """JSON and Prometheus views of the same snapshot; unknown paths are 404"""
+    snapshot = {
+        'state': 'running', 'chunks_done': 3, 'percent_done': None,
+        'workers': {'42': {'alive': 1, 'rss_mb': 12.5}}
+    }
+    with MetricsServer(lambda: snapshot, job='test') as server:
+        assert server.port != 0
+        assert json.loads(_get(server, '/metrics.json')) == snapshot
+        assert json.loads(_get(server, '/')) == snapshot
+
+        text = _get(server, '/metrics')
+        assert 'nexai_chunks_done{job="test"} 3.0' in text
+        assert 'nexai_worker_rss_mb{job="test",worker="42"} 12.5' in text
+        assert 'percent_done' not in text and 'state' not in text
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _get(server, '/other')
+        assert error.value.code == 404
+
+
+def _pid(_):
+    """Pid of the pool worker running this task"""
+    return os.getpid()
+
+
+def test_registry_lists_pool_workers():
+    """Workers report their own pids through the pool initializer"""
+    registry = WorkerRegistry()
+    with multiprocessing.Pool(2, initializer=report_worker, initargs=(registry.queue,)) as pool:
+        worker_pids = set(pool.map(_pid, range(20)))
+        pids = registry.pids()
+        status = worker_status(registry)
+
+    assert worker_pids <= set(pids) and len(pids) == 2
+    assert all(entry['alive'] == 1 and entry['rss_mb'] > 0 for entry in status.values())
+    registry.reset()
+    assert not registry.pids()
+
+
+def test_processor_serves_live_metrics(tmp_path):
+    """The endpoint is up during the run and stopped afterwards"""
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i}\n" for i in range(2000)
+    ), encoding='utf-8')
+    processor = _ScrapedProcessor(
+        str(source), str(tmp_path / 'out.txt'), num_workers=2, metrics_port=0,
+        stage_timings=True, verbose=False
+    )
+    stats = processor.process()
+
+    snapshot, text = processor.scraped
+    assert snapshot['state'] == 'running' and snapshot['bytes_total'] == source.stat().st_size
+    assert 'nexai_bytes_total{job="parallel_processor"}' in text
+
+    final = processor.live_metrics()
+    assert final['state'] == 'finished' and final['chunks_done'] == stats['total_chunks']
+    assert final['percent_done'] == pytest.approx(100, abs=5)
+    assert len(final['workers']) == 2
+    with pytest.raises(OSError):
+        _get(processor.metrics_server, '/metrics')
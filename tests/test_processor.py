@@ -0,0 +1,156 @@
+"""
+End-to-end tests for ParallelProcessor runs and their output modes
+"""
+
+import gzip
+import io
+import json
+import pickle
+from pathlib import Path
+
+import pytest
+
+from utils.processor import ChunkResult, ParallelProcessor, _worker_reduce
+
+
+def _write_input(path, lines=3000):
+    """Small text corpus with stop-words, URLs and a unique number per line"""
+    path.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i} and visits https://x.com\n"
+        for i in range(lines)
+    ), encoding='utf-8')
+    return path
+
+
+def _run(tmp_path, output_name, **options):
+    """Process tmp_path/in.txt into output_name with two quiet workers"""
+    source = tmp_path / 'in.txt'
+    if not source.exists():
+        _write_input(source)
+    options.setdefault('num_workers', 2)
+    processor = ParallelProcessor(
+        str(source), str(tmp_path / output_name), verbose=False, **options
+    )
+    return processor, processor.process()
+
+
+def _sorted_lines(data):
+    """Output lines in a fixed order (workers complete chunks in any order)"""
+    return sorted(data.decode('utf-8').splitlines())
+
+
+def _decompress(path):
+    """Contents of a plain, '.gz' or '.zst' output file"""
+    data = path.read_bytes()
+    if path.suffix == '.gz':
+        return gzip.decompress(data)
+    if path.suffix == '.zst':
+        zstd = pytest.importorskip('zstandard')
+        reader = zstd.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return reader.read()
+    return data
+
+
+# ============================================
+# Compressed output
+# ============================================
+
+@pytest.mark.parametrize('suffix', ['.gz', '.zst'])
+def test_compressed_output_matches_plain_text(tmp_path, suffix):
+    """A '.gz' / '.zst' output decompresses to the plain-text result"""
+    if suffix == '.zst':
+        pytest.importorskip('zstandard')
+    _, plain_stats = _run(tmp_path, 'plain.txt')
+    processor, stats = _run(tmp_path, 'out.txt' + suffix, compression_level=5)
+
+    plain = (tmp_path / 'plain.txt').read_bytes()
+    assert processor.output_file.suffix == suffix
+    assert _sorted_lines(_decompress(processor.output_file)) == _sorted_lines(plain)
+    assert stats['bytes_uncompressed'] == len(plain) == plain_stats['bytes_uncompressed']
+    assert processor.output_file.stat().st_size < len(plain)
+
+
+# ============================================
+# Sharded output
+# ============================================
+
+@pytest.mark.parametrize('output_name', ['merged.txt', 'merged.txt.gz'])
+def test_merged_shards_match_plain_output(tmp_path, output_name):
+    """Worker shards merge into the same lines a parent-written run produces"""
+    _run(tmp_path, 'plain.txt')
+    processor, stats = _run(tmp_path, output_name, shard_output=True)
+
+    plain = (tmp_path / 'plain.txt').read_bytes()
+    assert _sorted_lines(_decompress(processor.output_file)) == _sorted_lines(plain)
+    assert stats['total_bytes_out'] == len(plain)
+    assert not processor.shard_dir.exists()
+
+
+def test_unmerged_shards_are_listed_in_manifest(tmp_path):
+    """Without merging, the manifest lists every shard with its size"""
+    _run(tmp_path, 'plain.txt')
+    processor, _ = _run(tmp_path, 'out.txt', shard_output=True, merge_shards=False)
+
+    manifest = json.loads((tmp_path / 'out.txt.manifest.json').read_text(encoding='utf-8'))
+    shards = [Path(entry['path']) for entry in manifest['shards']]
+    assert 1 <= len(shards) <= processor.num_workers
+    assert all(entry['size_bytes'] == Path(entry['path']).stat().st_size
+               for entry in manifest['shards'])
+    data = b''.join(shard.read_bytes() for shard in shards)
+    assert _sorted_lines(data) == _sorted_lines((tmp_path / 'plain.txt').read_bytes())
+
+
+# ============================================
+# Per-chunk records and run statistics
+# ============================================
+
+class _FailingReducer:  # pylint: disable=too-few-public-methods
+    """Stands in for the warm worker reducer and always raises"""
+
+    stats = {'errors': 0}
+
+    def reduce(self, chunk):
+        """Fail on every chunk"""
+        raise RuntimeError(f"cannot reduce {len(chunk)} chars")
+
+
+def test_worker_record_counts_utf8_bytes():
+    """Record sizes are UTF-8 bytes, and the record pickles as a plain tuple"""
+    chunk = "Şöyle bir gün the cat sat on the mat"
+    record = _worker_reduce(chunk)
+
+    assert isinstance(record, ChunkResult) and record.error is None
+    assert record.bytes_in == len(chunk.encode('utf-8')) > len(chunk)
+    assert record.bytes_out == len(record.text.encode('utf-8')) + 1
+    assert pickle.loads(pickle.dumps(record)) == record
+
+    empty = _worker_reduce('   \n')
+    assert empty.text is None and empty.bytes_out == 0 and empty.bytes_in == 4
+
+
+def test_worker_error_is_returned(monkeypatch):
+    """A failing chunk comes back as an error record instead of raising"""
+    monkeypatch.setattr('utils.processor._WORKER_REDUCER', _FailingReducer())
+    record = _worker_reduce('some text')
+    assert record.text is None and record.bytes_in == 9
+    assert record.error == 'RuntimeError: cannot reduce 9 chars'
+
+
+def test_run_stats_account_for_bytes(tmp_path):
+    """Input/output bytes, reduction, throughput and latency come from the records"""
+    (tmp_path / 'in.txt').write_text(''.join(
+        f"Çok güzel satır {i}: the ünïcode line is here\n" for i in range(2000)
+    ), encoding='utf-8')
+    processor, stats = _run(tmp_path, 'out.txt')
+
+    # Chunks are handed to workers without their final newline
+    size_in = processor.input_file.stat().st_size - stats['total_chunks']
+    size_out = processor.output_file.stat().st_size
+    assert stats['total_chunks'] == 40 and stats['errors'] == 0
+    assert stats['total_bytes_in'] == size_in
+    assert stats['total_bytes_out'] == size_out
+    assert stats['reduction_percent'] == pytest.approx((size_in - size_out) / size_in * 100)
+    assert stats['throughput_mbps'] > 0
+
+    latency = stats['latency_ms']
+    assert 0 < latency['p50'] <= latency['p90'] <= latency['p99'] <= latency['p100']
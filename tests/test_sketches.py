@@ -0,0 +1,92 @@
+"""
+Tests for the mergeable corpus statistics sketches
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from utils.processor import ParallelProcessor
+from utils.sketches import CorpusSketch, CountMinSketch, HyperLogLog, hash64
+
+
+def _tokens(n, vocabulary=5000, seed=0):
+    """Zipf-like token stream: a few frequent tokens and a long tail"""
+    rng = random.Random(seed)
+    return [f"tok{int(vocabulary ** rng.random()) - 1}" for _ in range(n)]
+
+
+def test_count_min_merge_equals_union():
+    """Merged halves give the same counters as one sketch over all tokens"""
+    tokens = _tokens(20000)
+    whole, left, right = CountMinSketch(), CountMinSketch(), CountMinSketch()
+    for i, token in enumerate(tokens):
+        whole.add(hash64(token))
+        (left if i % 2 else right).add(hash64(token))
+    left.merge(right)
+
+    assert left.counts == whole.counts
+    exact = Counter(tokens)
+    assert all(whole.query(hash64(token)) >= count for token, count in exact.items())
+    with pytest.raises(ValueError):
+        left.merge(CountMinSketch(width=16))
+
+
+def test_hyperloglog_merge_equals_union():
+    """Merged counters equal one counter over the union and estimate it closely"""
+    tokens = [f"word{i}" for i in range(30000)]
+    whole, left, right = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i, token in enumerate(tokens):
+        whole.add(hash64(token))
+        # Overlapping halves: the shared tokens count once
+        (left if i < 20000 else right).add(hash64(token))
+        if 10000 <= i < 20000:
+            right.add(hash64(token))
+    left.merge(right)
+
+    assert left.registers == whole.registers
+    assert whole.count() == pytest.approx(len(tokens), rel=0.05)
+    assert whole.memory_bytes == len(whole.registers)
+
+
+def test_corpus_sketch_merge_matches_single_sketch():
+    """Worker sketches merge into the totals and top tokens of one sketch"""
+    tokens = _tokens(50000)
+    options = {'top_k': 10, 'buffer_keys': 500}
+    whole = CorpusSketch(**options)
+    parts = [CorpusSketch(**options) for _ in range(3)]
+    for start in range(0, len(tokens), 1000):
+        whole.add_tokens(tokens[start:start + 1000])
+        parts[start // 1000 % 3].add_tokens(tokens[start:start + 1000])
+    merged = parts[0].empty_copy()
+    for part in parts:
+        merged.merge(part)
+    whole.fold()
+
+    assert merged.cms.counts == whole.cms.counts
+    assert merged.hll.registers == whole.hll.registers
+    assert merged.total_tokens == whole.total_tokens == len(tokens)
+    exact_top = [token for token, _ in Counter(tokens).most_common(5)]
+    assert [token for token, _ in merged.top_tokens(5)] == exact_top
+    assert set(exact_top) <= merged.candidates()
+
+
+def test_processor_reports_corpus_stats(tmp_path):
+    """corpus_stats counts the output tokens and removed stop-words of a run"""
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(
+        f"The quick brown fox jumps over the lazy dog number{i % 50}\n" for i in range(2000)
+    ), encoding='utf-8')
+    stats = ParallelProcessor(
+        str(source), str(tmp_path / 'out.txt'), num_workers=2, corpus_stats=True,
+        verbose=False
+    ).process()
+
+    output = (tmp_path / 'out.txt').read_text(encoding='utf-8').split()
+    corpus = stats['corpus']
+    assert corpus['total_tokens'] == len(output)
+    assert corpus['distinct_tokens_estimate'] == pytest.approx(len(set(output)), abs=2)
+    top = corpus['top_tokens'][0]
+    assert top['count_estimate'] >= Counter(output)[top['token']] == 2000
+    assert corpus['stop_words_removed']['the'] == 4000
@@ -0,0 +1,141 @@
+"""
+Round-trip tests for integer token streams and the shared vocabulary
+"""
+
+import json
+
+import pytest
+
+from utils.processor import ParallelProcessor
+from utils.tokens import (
+    EOS_ID,
+    EOS_TOKEN,
+    PROVISIONAL_BIT,
+    TokenStreamWriter,
+    Vocabulary,
+    VocabularySnapshot,
+    encode_tokens,
+    read_token_stream,
+)
+
+
+def _decode(token_file, vocab_file):
+    """Chunk texts of a token stream, split at EOS"""
+    tokens = Vocabulary(str(vocab_file)).tokens
+    chunks, current = [], []
+    for token_id in read_token_stream(str(token_file)):
+        if token_id == EOS_ID:
+            chunks.append(' '.join(current))
+            current = []
+        else:
+            current.append(tokens[token_id])
+    assert not current, 'stream must end with EOS'
+    return chunks
+
+
+def _ids(data):
+    """uint32 LE bytes as integers"""
+    return [int.from_bytes(data[i:i + 4], 'little') for i in range(0, len(data), 4)]
+
+
+def test_encode_marks_new_tokens_provisional():
+    """Known tokens keep their IDs; new ones index the returned tuple"""
+    data, new_tokens = encode_tokens('cat dog cat bird', {'cat': 5})
+    ids = _ids(data)
+    assert new_tokens == ('dog', 'bird')
+    assert ids == [5, PROVISIONAL_BIT | 0, 5, PROVISIONAL_BIT | 1, EOS_ID]
+
+
+def test_stream_round_trip(tmp_path):
+    """Writer remaps provisional IDs; read_token_stream + vocab restore the text"""
+    texts = ['the quick brown fox', 'brown dog', 'şöyle bir gün', 'fox fox fox', 'new words here']
+    vocab = Vocabulary(str(tmp_path / 'out.vocab'))
+    snapshot = dict(vocab.ids)
+
+    writer = TokenStreamWriter(str(tmp_path / 'out.bin'), vocab, buffer_size=16)
+    for text in texts:
+        # Each chunk is encoded against a stale snapshot, as in a worker
+        writer.write(*encode_tokens(text, snapshot))
+    meta = writer.close()
+
+    assert _decode(tmp_path / 'out.bin', tmp_path / 'out.vocab') == texts
+    assert meta['num_chunks'] == len(texts)
+    assert meta['num_tokens'] == sum(len(text.split()) + 1 for text in texts)
+    assert meta['vocab_size'] == len(set(' '.join(texts).split())) + 1
+    saved = json.loads((tmp_path / 'out.bin.meta.json').read_text(encoding='utf-8'))
+    assert saved == meta
+
+
+def test_vocabulary_ids_are_stable(tmp_path):
+    """Saved IDs are reloaded unchanged and new tokens are appended"""
+    path = tmp_path / 'vocab.txt'
+    vocab = Vocabulary(str(path))
+    ids = [vocab.add(token) for token in ('a', 'b', 'c')]
+    vocab.save()
+    assert ids == [1, 2, 3] and vocab.tokens[EOS_ID] == EOS_TOKEN
+
+    reloaded = Vocabulary(str(path))
+    assert reloaded.ids == vocab.ids
+    assert reloaded.add('d') == 4 and reloaded.add('a') == 1
+    reloaded.save()
+    assert path.read_text(encoding='utf-8').split('\n')[:-1] == [EOS_TOKEN, 'a', 'b', 'c', 'd']
+
+
+def test_vocabulary_must_start_with_eos(tmp_path):
+    """A vocab file from elsewhere is rejected instead of shifting IDs"""
+    path = tmp_path / 'vocab.txt'
+    path.write_text('a\nb\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        Vocabulary(str(path))
+
+
+def test_snapshot_reads_complete_lines_only(tmp_path):
+    """Workers pick up appended tokens; a half-written line waits"""
+    path = tmp_path / 'vocab.txt'
+    vocab = Vocabulary(str(path))
+    vocab.add('a')
+    vocab.save()
+    snapshot = VocabularySnapshot(str(path), refresh_seconds=3600)
+    assert snapshot.ids == {EOS_TOKEN: 0, 'a': 1}
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('b\nc')
+    assert snapshot.refresh() == 0  # Within refresh_seconds
+    assert snapshot.refresh(force=True) == 1 and 'c' not in snapshot.ids
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert snapshot.refresh(force=True) == 1
+    assert snapshot.ids == Vocabulary(str(path)).ids
+
+
+def _tokens_run(tmp_path, output_name, vocab_file=None):
+    """Token output of tmp_path/in.txt"""
+    processor = ParallelProcessor(
+        str(tmp_path / 'in.txt'), str(tmp_path / output_name), num_workers=2,
+        output_format='tokens', vocab_file=vocab_file, verbose=False
+    )
+    return processor.process()
+
+
+def test_processor_tokens_match_text_output(tmp_path):
+    """A token run decodes to the chunks of a text run; a reused vocab gives the same IDs"""
+    (tmp_path / 'in.txt').write_text(''.join(
+        f"Line {i}: the quick brown fox {i % 97} jumps over word{i % 211}\n" for i in range(3000)
+    ), encoding='utf-8')
+    ParallelProcessor(
+        str(tmp_path / 'in.txt'), str(tmp_path / 'plain.txt'), num_workers=2, verbose=False
+    ).process()
+    stats = _tokens_run(tmp_path, 'out.bin')
+
+    vocab_file = tmp_path / 'out.bin.vocab'
+    chunks = _decode(tmp_path / 'out.bin', vocab_file)
+    plain = (tmp_path / 'plain.txt').read_text(encoding='utf-8').splitlines()
+    assert sorted(chunks) == sorted(' '.join(line.split()) for line in plain)
+    assert stats['token_stream']['num_chunks'] == len(chunks)
+
+    # With the vocabulary reused, no token is new and the IDs are reproducible
+    before = vocab_file.read_bytes()
+    _tokens_run(tmp_path, 'again.bin', vocab_file=str(vocab_file))
+    assert vocab_file.read_bytes() == before
+    assert sorted(_decode(tmp_path / 'again.bin', vocab_file)) == sorted(chunks)
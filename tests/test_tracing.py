@@ -0,0 +1,88 @@
+"""
+Tests for the Chrome trace / Perfetto timeline export
+"""
+
+import json
+from collections import Counter
+from functools import partial
+
+from utils.processor import ChunkResult, ParallelProcessor
+from utils.tracing import EVENTS_PER_CHUNK, TraceRecorder, traced_call
+
+
+def _upper(chunk):
+    """Worker stand-in returning a ChunkResult"""
+    return ChunkResult(chunk.upper(), len(chunk), len(chunk) + 1, 0.0)
+
+
+def _record_run(recorder, chunks):
+    """Drive a recorder the way ParallelProcessor does, in a single process"""
+    worker_fn = partial(traced_call, _upper)
+    return [record.text for record in recorder.trace_results(
+        map(worker_fn, recorder.trace_chunks(chunks))
+    )]
+
+
+def _load(path):
+    """Trace JSON and its chunk events grouped by sequence number"""
+    trace = json.loads(path.read_text(encoding='utf-8'))
+    by_seq = {}
+    for event in trace['traceEvents']:
+        if event.get('cat') == 'chunk':
+            by_seq.setdefault(event['args']['seq'], []).append(event)
+    return trace, by_seq
+
+
+def test_every_chunk_gets_its_spans(tmp_path):
+    """Each sampled chunk has read, queue, reduce, result queue and write events"""
+    recorder = TraceRecorder(str(tmp_path / 'trace.json'))
+    chunks = [f"chunk {i}" for i in range(10)]
+    assert _record_run(recorder, chunks) == [chunk.upper() for chunk in chunks]
+
+    trace, by_seq = _load(recorder.save())
+    assert sorted(by_seq) == list(range(10))
+    for events in by_seq.values():
+        assert len(events) == EVENTS_PER_CHUNK
+        assert Counter((e['name'], e['ph']) for e in events) == Counter([
+            ('read', 'X'), ('queued', 'b'), ('queued', 'e'), ('reduce', 'X'),
+            ('result_queue', 'b'), ('result_queue', 'e'), ('write', 'X')
+        ])
+    assert trace['otherData']['sampled_chunks'] == 10
+
+
+def test_full_buffer_downsamples_uniformly(tmp_path):
+    """A full buffer doubles the interval and keeps only still-sampled chunks"""
+    recorder = TraceRecorder(str(tmp_path / 'trace.json'), max_events=EVENTS_PER_CHUNK * 8)
+    _record_run(recorder, [f"chunk {i}" for i in range(64)])
+
+    assert recorder.sample_every > 1 and len(recorder.events) <= recorder.max_events
+    _, by_seq = _load(recorder.save())
+    assert by_seq and all(seq % recorder.sample_every == 0 for seq in by_seq)
+    # The trace still reaches the end of the run
+    assert max(by_seq) >= 64 - recorder.sample_every
+
+
+def test_processor_writes_loadable_trace(tmp_path):
+    """A traced run produces the same output and a valid Chrome trace"""
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i}\n" for i in range(1000)
+    ), encoding='utf-8')
+    ParallelProcessor(
+        str(source), str(tmp_path / 'plain.txt'), num_workers=2, verbose=False
+    ).process()
+    stats = ParallelProcessor(
+        str(source), str(tmp_path / 'out.txt'), num_workers=2,
+        trace_file=str(tmp_path / 'trace.json'), verbose=False
+    ).process()
+
+    plain = (tmp_path / 'plain.txt').read_text(encoding='utf-8').splitlines()
+    traced = (tmp_path / 'out.txt').read_text(encoding='utf-8').splitlines()
+    assert sorted(traced) == sorted(plain)
+
+    trace, by_seq = _load(tmp_path / 'trace.json')
+    assert stats['trace_file'] == str(tmp_path / 'trace.json')
+    assert len(by_seq) == stats['total_chunks']
+    workers = {e['pid'] for events in by_seq.values() for e in events if e['name'] == 'reduce'}
+    names = {e['args']['name'] for e in trace['traceEvents'] if e.get('ph') == 'M'}
+    assert all(f'worker {pid}' in names for pid in workers)
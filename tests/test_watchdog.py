@@ -0,0 +1,108 @@
+"""
+Tests for in-flight throttling and the memory watchdog
+"""
+
+import importlib
+import threading
+import time
+
+from utils.processor import ParallelProcessor
+from utils.watchdog import InFlightGate, MemoryWatchdog
+
+
+def _consume(gate, source, taken):
+    """Start a thread that pulls everything the gate lets through"""
+    thread = threading.Thread(target=lambda: taken.extend(gate.feed(source)), daemon=True)
+    thread.start()
+    return thread
+
+
+def _settle(taken, expected, timeout=5.0):
+    """Wait until the consumer holds `expected` items (or timeout)"""
+    deadline = time.monotonic() + timeout
+    while len(taken) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)  # Give an unbounded feed the chance to overshoot
+    return len(taken)
+
+
+def test_gate_bounds_items_in_flight():
+    """feed() stops at the limit until results are released"""
+    gate, source, taken = InFlightGate(3), iter(range(100)), []
+    thread = _consume(gate, source, taken)
+    assert _settle(taken, 3) == 3 and gate.in_flight == 3
+
+    gate.release()
+    assert _settle(taken, 4) == 4
+    gate.set_limit(6)
+    assert _settle(taken, 7) == 7 and gate.in_flight == gate.limit
+
+    gate.stop()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and not gate.exhausted
+
+    # The source keeps its position for the next feed
+    gate.reopen()
+    gate.set_limit(1000)
+    assert list(gate.feed(source)) == list(range(7, 100)) and gate.exhausted
+
+
+def _fake_rss(monkeypatch, rss):
+    """Make the watchdog read RSS values from a {pid: mb} dict (parent under 0)"""
+    module = importlib.import_module('utils.watchdog')
+    monkeypatch.setattr(module, 'process_rss_mb', lambda pid=None: rss.get(pid or 0, 0.0))
+
+
+def test_bloat_is_measured_from_fresh_workers(monkeypatch):
+    """Workers that are all bloated by the first check are still recycled"""
+    rss = {0: 10.0, 1: 20.0, 2: 22.0}
+    _fake_rss(monkeypatch, rss)
+    watchdog = MemoryWatchdog(budget_mb=100, window=4, check_every=10)
+    assert watchdog.record_baseline([1, 2]) == 22.0
+
+    rss.update({1: 60.0, 2: 61.0})
+    assert watchdog.check([1, 2]) == ['recycle_workers']
+    assert watchdog.get_stats()['actions'] == {'recycle_workers': 1}
+
+
+def test_soft_limit_shrinks_before_recycling(monkeypatch):
+    """Between the soft and hard limit: window, then chunks, then recycle"""
+    rss = {0: 10.0, 1: 20.0}
+    _fake_rss(monkeypatch, rss)
+    watchdog = MemoryWatchdog(budget_mb=100, window=2, chunk_units=2, check_every=1)
+    watchdog.record_baseline([1])
+
+    rss[1] = 75.0
+    actions = [watchdog.on_result([1]) for _ in range(3)]
+    assert actions == [['shrink_window'], ['shrink_chunks'], ['recycle_workers']]
+
+    rss[1] = 20.0
+    assert watchdog.check([1]) == ['grow_chunks']
+    assert watchdog.check([1]) == ['grow_window']
+
+
+def test_processor_recycles_workers(tmp_path):
+    """A forced recycle replaces the pool and the output stays complete"""
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(
+        f"Line {i}: The quick brown fox jumps over the lazy dog {i}\n" for i in range(3000)
+    ), encoding='utf-8')
+    ParallelProcessor(
+        str(source), str(tmp_path / 'plain.txt'), num_workers=2, verbose=False
+    ).process()
+
+    processor = ParallelProcessor(
+        str(source), str(tmp_path / 'out.txt'), num_workers=2, memory_watchdog=True,
+        memory_budget_mb=1, verbose=False
+    )
+    # Over budget at every check, and any worker counts as bloated
+    processor.watchdog.recycle_factor = 0.5
+    stats = processor.process()
+
+    watchdog = stats['watchdog']
+    assert watchdog['worker_baseline_mb'] > 0
+    # A recycle after the last chunk ends the run instead of starting a pool
+    assert 2 <= watchdog['pool_generations'] <= watchdog['actions']['recycle_workers'] + 1
+    plain = (tmp_path / 'plain.txt').read_text(encoding='utf-8').splitlines()
+    output = (tmp_path / 'out.txt').read_text(encoding='utf-8').splitlines()
+    assert sorted(output) == sorted(plain)
@@ -0,0 +1,354 @@
+"""
+Round-trip tests for OutputWriter, its compressed sinks and output formats
+"""
+
+import csv
+import gzip
+import io
+import json
+import threading
+
+import pytest
+
+from utils.writer import (
+    BackgroundWriter,
+    OutputWriter,
+    encode_csv_batch,
+    encode_jsonl_batch,
+    open_compressed_sink,
+    resolve_compressed_output,
+)
+from utils.reader import RecordReader
+
+
+# ============================================
+# Compressed sinks
+# ============================================
+
+def test_gzip_sink_appends_a_member(tmp_path):
+    """Appending adds a gzip member; both decompress as one stream"""
+    path = tmp_path / 'out.gz'
+    for part in (b'first\n', b'second\n'):
+        sink = open_compressed_sink(str(path), 'gzip', level=6, append=True)
+        sink.write(part)
+        sink.close()
+    assert gzip.decompress(path.read_bytes()) == b'first\nsecond\n'
+
+
+def test_zstd_sink_appends_a_frame(tmp_path):
+    """Appending adds a zstd frame; both decompress as one stream"""
+    zstd = pytest.importorskip('zstandard')
+    path = tmp_path / 'out.zst'
+    for part in (b'first\n', b'second\n'):
+        sink = open_compressed_sink(str(path), 'zstd', level=3, append=True)
+        sink.write(part)
+        sink.close()
+    reader = zstd.ZstdDecompressor().stream_reader(
+        io.BytesIO(path.read_bytes()), read_across_frames=True
+    )
+    assert reader.read() == b'first\nsecond\n'
+
+
+@pytest.mark.parametrize('name, codec', [
+    ('out.txt', None), ('out.gz', 'gzip'), ('out.GZ', 'gzip'), ('out.zstd', 'zstd')
+])
+def test_output_codec_by_extension(tmp_path, name, codec):
+    """The output extension picks the codec"""
+    pytest.importorskip('zstandard')
+    path, resolved = resolve_compressed_output(str(tmp_path / name))
+    assert resolved == codec and path == tmp_path / name
+
+
+def test_unknown_codec_is_rejected(tmp_path):
+    """Only zstd and gzip sinks exist"""
+    with pytest.raises(ValueError):
+        open_compressed_sink(str(tmp_path / 'out.bz2'), 'bzip2')
+
+
+# ============================================
+# Buffering and the file handle
+# ============================================
+
+def test_txt_write_and_write_many_round_trip(tmp_path):
+    """write() and write_many() produce one line per record, in order"""
+    path = tmp_path / 'out.txt'
+    with OutputWriter(str(path), append=False) as writer:
+        writer.write('first')
+        writer.write_many(['second', 'şüç'])
+        writer.write_many([])
+        writer.write('last')
+    assert path.read_text(encoding='utf-8') == 'first\nsecond\nşüç\nlast\n'
+    assert writer.total_writes == 4
+    assert writer.total_bytes_written == path.stat().st_size
+
+
+def test_flushes_by_buffered_bytes(tmp_path):
+    """A full buffer is written through the open handle before close()"""
+    path = tmp_path / 'out.txt'
+    writer = OutputWriter(str(path), buffer_size=100, os_buffer_size=0, append=False)
+    for i in range(30):
+        writer.write(f"record {i:04d}")
+
+    # 12 bytes per record: a flush after every 9th record
+    assert writer.total_flushes == 3 and writer.buffered_bytes == 3 * 12
+    assert path.stat().st_size == 27 * 12
+    writer.close()
+    assert path.stat().st_size == 30 * 12
+
+
+def test_append_and_truncate(tmp_path):
+    """append=True keeps existing lines, append=False starts over"""
+    path = tmp_path / 'out.txt'
+    for text in ('one', 'two'):
+        with OutputWriter(str(path)) as writer:
+            writer.write(text)
+    assert path.read_text(encoding='utf-8') == 'one\ntwo\n'
+
+    with OutputWriter(str(path), append=False) as writer:
+        writer.write('three')
+    assert path.read_text(encoding='utf-8') == 'three\n'
+
+
+def test_closed_writer_rejects_writes(tmp_path):
+    """Data written after close() is an error; closing twice is not"""
+    writer = OutputWriter(str(tmp_path / 'out.txt'))
+    writer.close()
+    writer.close()
+    writer.write('late')
+    with pytest.raises(ValueError):
+        writer.flush()
+
+
+def test_rejects_unknown_format(tmp_path):
+    """Only txt, json, csv and records are supported"""
+    with pytest.raises(ValueError):
+        OutputWriter(str(tmp_path / 'out.xml'), format='xml')
+
+
+# ============================================
+# Background writer
+# ============================================
+
+class _GatedSink(io.BytesIO):
+    """In-memory sink whose writes wait for a gate (a stalled disk)"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.closed_data = b''
+
+    def write(self, data):
+        self.gate.wait(10)
+        return super().write(data)
+
+    def close(self):
+        self.closed_data = self.getvalue()
+        super().close()
+
+
+class _FailingSink(io.BytesIO):
+    """Sink that fails on its first write"""
+
+    def write(self, data):
+        raise OSError('disk full')
+
+
+def test_background_writer_keeps_order():
+    """Buffers are written in submit order; callbacks run after their buffer"""
+    sink = _GatedSink()
+    sink.gate.set()
+    seen = []
+    with BackgroundWriter(sink, max_pending=2) as writer:
+        for i in range(50):
+            writer.submit(f"{i}\n".encode(), lambda i=i: seen.append((i, len(sink.getvalue()))))
+        writer.submit(b'')
+    assert sink.closed_data == ''.join(f"{i}\n" for i in range(50)).encode()
+    assert [i for i, _ in seen] == list(range(50))
+    assert all(size == len(''.join(f"{j}\n" for j in range(i + 1))) for i, size in seen)
+    assert writer.buffers_written == 50 and writer.bytes_written == len(sink.closed_data)
+
+
+def test_background_writer_applies_backpressure():
+    """At most max_pending buffers queue up behind a stalled sink"""
+    sink = _GatedSink()
+    writer = BackgroundWriter(sink, max_pending=2)
+    for _ in range(3):
+        writer.submit(b'x')  # One in the stalled write, two queued
+
+    blocked = threading.Thread(target=writer.submit, args=(b'y',))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive() and writer.pending == 2
+
+    sink.gate.set()
+    blocked.join(10)
+    writer.close()
+    assert sink.closed_data == b'xxxy'
+
+
+def test_background_writer_surfaces_errors():
+    """A failed write is raised by the next submit() and by close()"""
+    writer = BackgroundWriter(_FailingSink(), max_pending=1)
+    writer.submit(b'lost')
+    with pytest.raises(IOError):
+        for _ in range(100):
+            writer.submit(b'more')
+    with pytest.raises(IOError, match='disk full'):
+        writer.close()
+
+
+@pytest.mark.parametrize('name', ['out.txt', 'out.txt.gz'])
+def test_async_writer_matches_sync_writer(tmp_path, name):
+    """async_write only moves the writes to a thread; the output is identical"""
+    outputs = []
+    for mode in ('sync', 'async'):
+        path = tmp_path / mode / name
+        path.parent.mkdir()
+        with OutputWriter(str(path), buffer_size=256, async_write=mode == 'async') as writer:
+            for i in range(2000):
+                writer.write(f"line {i}")
+        data = path.read_bytes()
+        outputs.append(gzip.decompress(data) if name.endswith('.gz') else data)
+    assert outputs[0] == outputs[1] == ''.join(f"line {i}\n" for i in range(2000)).encode()
+
+
+# ============================================
+# Indexed records
+# ============================================
+
+def _records(count, start=0):
+    """Records of varying length, some empty and some non-ASCII"""
+    return [('ü' * (i % 7)) + f"record {i}" * (i % 3) for i in range(start, start + count)]
+
+
+@pytest.mark.parametrize('async_write', [False, True])
+def test_records_round_trip(tmp_path, async_write):
+    """Every record is read back by index, by slice and by iteration"""
+    path = tmp_path / 'out.rec'
+    records = _records(3000)
+    with OutputWriter(str(path), format='records', buffer_size=512,
+                      os_buffer_size=4096, async_write=async_write, append=False) as writer:
+        for record in records[:1000]:
+            writer.write(record)
+        writer.write_many(records[1000:])
+    assert writer.get_stats()['total_records'] == 3000
+
+    with RecordReader(str(path)) as reader:
+        assert len(reader) == 3000
+        assert [reader.text(i) for i in (0, 1, 1500, -1)] == [
+            records[0], records[1], records[1500], records[-1]
+        ]
+        assert [bytes(view).decode('utf-8') for view in reader[10:20]] == records[10:20]
+        assert [bytes(view).decode('utf-8') for view in reader] == records
+        with pytest.raises(IndexError):
+            reader.record(3000)
+
+
+def test_records_append_extends_index(tmp_path):
+    """Appending continues the data file and its index"""
+    path = tmp_path / 'out.rec'
+    for start in (0, 100):
+        with OutputWriter(str(path), format='records') as writer:
+            writer.write_many(_records(100, start))
+
+    with RecordReader(str(path)) as reader:
+        assert [reader.text(i) for i in range(len(reader))] == _records(200)
+
+
+def test_records_index_is_written_per_os_buffer(tmp_path, monkeypatch):
+    """Index writes (each flushing the data file) follow the OS buffer, not every flush"""
+    index_writes = []
+    write_index = OutputWriter._write_index  # pylint: disable=protected-access
+
+    def counting_write_index(self, sink, index_data):
+        index_writes.append(len(index_data))
+        write_index(self, sink, index_data)
+
+    monkeypatch.setattr(OutputWriter, '_write_index', counting_write_index)
+    path = tmp_path / 'out.rec'
+    with OutputWriter(str(path), format='records', buffer_size=256,
+                      os_buffer_size=64 * 1024, append=False) as writer:
+        for i in range(20000):
+            writer.write(f"record {i:06d}")
+
+    # 18 bytes per record: ~5.5 OS buffers, but over a thousand flushes
+    assert writer.total_flushes > 1000
+    assert len(index_writes) == 6
+    assert sum(index_writes) == 20000 * 8
+    with RecordReader(str(path)) as reader:
+        assert reader.text(12345) == 'record 012345'
+
+
+def test_records_need_an_uncompressed_output(tmp_path):
+    """Random access needs a plain data file"""
+    with pytest.raises(ValueError):
+        OutputWriter(str(tmp_path / 'out.rec.gz'), format='records')
+
+
+# ============================================
+# JSONL and CSV
+# ============================================
+
+ROWS = [
+    ('plain text', None),
+    ('şöyle "quoted", with comma', {'chunk': 1, 'source': 'a.txt'}),
+    ('multi\nline', {'chunk': 2, 'extra': [1, 2]}),
+    ('', {'source': 'b.txt'}),
+]
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_jsonl_round_trip(monkeypatch, use_orjson):
+    """Each row is one JSON object: text plus its metadata"""
+    if use_orjson:
+        pytest.importorskip('orjson')
+    monkeypatch.setattr('utils.writer.ORJSON_AVAILABLE', use_orjson)
+    lines = encode_jsonl_batch(ROWS).decode('utf-8').split('\n')
+    assert lines[-1] == ''
+    assert [json.loads(line) for line in lines[:-1]] == [
+        {'text': text, **(metadata or {})} for text, metadata in ROWS
+    ]
+
+
+def test_jsonl_falls_back_for_types_orjson_rejects():
+    """Integers beyond 64 bits still serialize (stdlib encoder)"""
+    data = encode_jsonl_batch([('big', {'n': 2 ** 70})])
+    assert json.loads(data) == {'text': 'big', 'n': 2 ** 70}
+
+
+def test_csv_round_trip():
+    """csv.writer quoting survives commas, quotes and newlines"""
+    data = encode_csv_batch(ROWS, ['chunk', 'source'], header=True)
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8'))))
+    assert rows == [
+        ['text', 'chunk', 'source'],
+        ['plain text', '', ''],
+        ['şöyle "quoted", with comma', '1', 'a.txt'],
+        ['multi\nline', '2', ''],
+        ['', '', 'b.txt'],
+    ]
+
+
+@pytest.mark.parametrize('fmt, suffix', [('json', '.jsonl'), ('csv', '.csv')])
+def test_writer_batches_rows_until_flush(tmp_path, fmt, suffix):
+    """json/csv rows wait for the flush and are serialized as one batch"""
+    path = tmp_path / ('out' + suffix)
+    with OutputWriter(str(path), format=fmt, buffer_size=64) as writer:
+        writer.write(*ROWS[0])
+        writer.write_many([text for text, _ in ROWS[1:]], [meta for _, meta in ROWS[1:]])
+    assert writer.total_flushes == 1
+
+    if fmt == 'json':
+        assert path.read_bytes() == encode_jsonl_batch(ROWS)
+    else:
+        # Columns come from the first metadata of the first flushed batch
+        assert path.read_bytes() == encode_csv_batch(ROWS, ['chunk', 'source'], header=True)
+
+
+def test_csv_header_is_written_once(tmp_path):
+    """Appending to a CSV file keeps its header and columns"""
+    path = tmp_path / 'out.csv'
+    for chunk in (1, 2):
+        with OutputWriter(str(path), format='csv', csv_columns=['chunk']) as writer:
+            writer.write(f"row {chunk}", {'chunk': chunk, 'dropped': True})
+    assert path.read_text(encoding='utf-8') == 'text,chunk\nrow 1,1\nrow 2,2\n'